@@ -0,0 +1,44 @@
+"""add user search trigram indexes
+
+Revision ID: 3f7c2a9d1b6e
+Revises: 45d925bb5a4c
+Create Date: 2026-03-01 10:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f7c2a9d1b6e"
+down_revision: str | None = "45d925bb5a4c"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # pg_trgm lets GIN indexes serve ILIKE '%q%' and similarity() on users.email / users.name
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_users_email_trgm",
+        "users",
+        ["email"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"email": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_users_name_trgm",
+        "users",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_name_trgm", table_name="users")
+    op.drop_index("ix_users_email_trgm", table_name="users")
+    # The extension is left installed: other objects may depend on it.
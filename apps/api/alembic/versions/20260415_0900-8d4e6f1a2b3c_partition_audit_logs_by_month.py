@@ -0,0 +1,138 @@
+"""partition audit logs by month
+
+Revision ID: 8d4e6f1a2b3c
+Revises: 3f7c2a9d1b6e
+Create Date: 2026-04-15 09:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+from datetime import UTC, date, datetime
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8d4e6f1a2b3c"
+down_revision: str | None = "3f7c2a9d1b6e"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# Months created ahead of the current one; afterwards app.core.audit_partitions keeps the
+# window filled (startup + maintenance job).
+PREMAKE_MONTHS = 3
+
+COLUMNS = (
+    "id, actor_user_id, action, target_type, target_id, payload, request_id, ip, user_agent, "
+    "created_at"
+)
+
+# Secondary indexes, defined on the parent so every partition gets them.
+INDEXES = {
+    "ix_audit_logs_action": ["action"],
+    "ix_audit_logs_actor_user_id": ["actor_user_id"],
+    "ix_audit_logs_created_at": ["created_at"],
+    "ix_audit_logs_id": ["id"],
+    "ix_audit_logs_request_id": ["request_id"],
+    "ix_audit_logs_target": ["target_type", "target_id"],
+    "ix_audit_logs_target_id": ["target_id"],
+    "ix_audit_logs_target_type": ["target_type"],
+}
+
+
+def _month_start(day: date, months: int = 0) -> datetime:
+    index = day.year * 12 + day.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=UTC)
+
+
+def _create_indexes(table: str) -> None:
+    for name, columns in INDEXES.items():
+        op.create_index(name, table, columns, unique=False)
+
+
+def _drop_indexes(table: str) -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name=table)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # Keep the old table (and its id sequence) aside while the partitioned one is built.
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_legacy")
+    op.execute("ALTER INDEX audit_logs_pkey RENAME TO audit_logs_legacy_pkey")
+    op.execute("ALTER TABLE audit_logs_legacy DROP CONSTRAINT audit_logs_actor_user_id_fkey")
+    _drop_indexes("audit_logs_legacy")
+
+    # The partition key must be part of the primary key; id stays unique via the sequence.
+    op.execute(
+        """
+        CREATE TABLE audit_logs (
+            id INTEGER NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+            actor_user_id INTEGER REFERENCES users (id) ON DELETE SET NULL,
+            action VARCHAR(128) NOT NULL,
+            target_type VARCHAR(64) NOT NULL,
+            target_id INTEGER,
+            payload JSONB,
+            request_id VARCHAR(128),
+            ip VARCHAR(64),
+            user_agent VARCHAR(256),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT audit_logs_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("COMMENT ON TABLE audit_logs IS 'Audit logs (DB + structlog)'")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+    _create_indexes("audit_logs")
+
+    # One partition per month from the oldest existing row up to PREMAKE_MONTHS ahead, plus a
+    # default partition so an insert outside every range is never rejected.
+    today = datetime.now(UTC).date()
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM audit_logs_legacy")).scalar()
+    first = _month_start(oldest.astimezone(UTC).date() if oldest else today)
+    last = _month_start(today, PREMAKE_MONTHS)
+    month = first
+    while month <= last:
+        upper = _month_start(month.date(), 1)
+        op.execute(
+            f"CREATE TABLE audit_logs_p{month:%Y_%m} PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+    op.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+
+    op.execute(f"INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM audit_logs_legacy")
+    op.execute("DROP TABLE audit_logs_legacy")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_partitioned")
+    op.execute("ALTER INDEX audit_logs_pkey RENAME TO audit_logs_partitioned_pkey")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE")
+    _drop_indexes("audit_logs_partitioned")
+
+    op.execute(
+        """
+        CREATE TABLE audit_logs (
+            id INTEGER NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+            actor_user_id INTEGER REFERENCES users (id) ON DELETE SET NULL,
+            action VARCHAR(128) NOT NULL,
+            target_type VARCHAR(64) NOT NULL,
+            target_id INTEGER,
+            payload JSONB,
+            request_id VARCHAR(128),
+            ip VARCHAR(64),
+            user_agent VARCHAR(256),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT audit_logs_pkey PRIMARY KEY (id)
+        )
+        """
+    )
+    op.execute("COMMENT ON TABLE audit_logs IS 'Audit logs (DB + structlog)'")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+    op.execute(f"INSERT INTO audit_logs ({COLUMNS}) SELECT {COLUMNS} FROM audit_logs_partitioned")
+    # Drops every attached partition with it; archived (detached and dropped) months are gone.
+    op.execute("DROP TABLE audit_logs_partitioned")
+    _create_indexes("audit_logs")
@@ -0,0 +1,59 @@
+"""audit logs composite indexes
+
+Revision ID: c5a9e2d7f0b1
+Revises: 8d4e6f1a2b3c
+Create Date: 2026-04-20 09:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c5a9e2d7f0b1"
+down_revision: str | None = "8d4e6f1a2b3c"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# filter column(s) + the listing sort (created_at DESC, id DESC)
+COMPOSITE_INDEXES = {
+    "ix_audit_logs_created_at_id": [],
+    "ix_audit_logs_actor_created": ["actor_user_id"],
+    "ix_audit_logs_action_created": ["action"],
+    "ix_audit_logs_target_created": ["target_type", "target_id"],
+}
+
+# Superseded by the composite indexes (same leading columns) or by the (id, created_at)
+# primary key. ix_audit_logs_request_id stays, and so does ix_audit_logs_target_id: the API
+# filters on target_id without target_type, which the target composite cannot serve.
+REDUNDANT_INDEXES = {
+    "ix_audit_logs_action": ["action"],
+    "ix_audit_logs_actor_user_id": ["actor_user_id"],
+    "ix_audit_logs_created_at": ["created_at"],
+    "ix_audit_logs_id": ["id"],
+    "ix_audit_logs_target": ["target_type", "target_id"],
+    "ix_audit_logs_target_type": ["target_type"],
+}
+
+
+def upgrade() -> None:
+    # Created on the partitioned parent: every existing and future partition gets its own copy.
+    for name, columns in COMPOSITE_INDEXES.items():
+        op.create_index(
+            name,
+            "audit_logs",
+            [*columns, sa.text("created_at DESC"), sa.text("id DESC")],
+            unique=False,
+        )
+    for name in REDUNDANT_INDEXES:
+        op.drop_index(name, table_name="audit_logs")
+
+
+def downgrade() -> None:
+    for name, columns in REDUNDANT_INDEXES.items():
+        op.create_index(name, "audit_logs", columns, unique=False)
+    for name in COMPOSITE_INDEXES:
+        op.drop_index(name, table_name="audit_logs")
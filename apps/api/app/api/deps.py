@@ -11,22 +11,57 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.core.exceptions import InactiveUserError, PermissionDeniedError, TokenError
-from app.core.security import decode_token
+from app.core.permissions import permission_registry
+from app.core.principal_cache import (
+    cache_principal,
+    get_cached_principal,
+    principal_generation,
+)
+from app.core.security import verify_token
 from app.database import get_db
 from app.models.auth_identity import AuthIdentity
 from app.models.rbac import Role
 from app.models.user import User
+from app.schemas.rbac import RoleResponse
+from app.schemas.user import CurrentUserResponse
+
+
+def _collect_permission_codes(user: User) -> list[str]:
+    codes: set[str] = set()
+    for role in user.roles:
+        for perm in role.permissions:
+            codes.add(perm.code)
+    return sorted(codes)
+
+
+def build_current_user_response(user: User) -> CurrentUserResponse:
+    """Build the RBAC-flattened principal snapshot from a User with roles/permissions loaded."""
+    principal = CurrentUserResponse(
+        id=user.id,
+        email=user.email,
+        name=user.name,
+        is_active=user.is_active,
+        created_at=user.created_at,
+        updated_at=user.updated_at,
+        roles=[RoleResponse.model_validate(r) for r in user.roles],
+        permissions=_collect_permission_codes(user),
+    )
+    return permission_registry.compile(principal)
 
 
 async def get_current_user(
     access_token: Annotated[str | None, Cookie()] = None,
     db: Annotated[AsyncSession, Depends(get_db)] = None,  # type: ignore[assignment]
-) -> User:
+) -> CurrentUserResponse:
     """
     Get current authenticated user from access token cookie.
 
-    Loads RBAC relations (roles -> permissions) from DB so that role/permission changes
-    take effect immediately.
+    Returns a snapshot of the user with RBAC relations (roles -> permissions) flattened.
+    Snapshots are served from the principal cache keyed by (user_id, token_version);
+    on a miss they are loaded from DB. Mutations that change roles/permissions/profile
+    invalidate the cache, so role/permission changes take effect immediately. The cache
+    generation is read before the DB load, so a snapshot that an invalidation overtakes is
+    not stored.
     """
     credentials_exception = TokenError("Could not validate credentials")
 
@@ -34,57 +69,58 @@ async def get_current_user(
         raise credentials_exception
 
     try:
-        payload = decode_token(access_token)
-        user_id_str: str | None = payload.get("sub")  # type: ignore[assignment]
-        token_type: str | None = payload.get("type")  # type: ignore[assignment]
-        token_version: int | None = payload.get("ver")  # type: ignore[assignment]
-
-        if user_id_str is None or token_type != "access" or token_version is None:
-            raise credentials_exception
-
-        user_id = int(user_id_str)
-    except (JWTError, ValueError):
+        token = verify_token(access_token)
+    except JWTError:
         raise credentials_exception from None
-
-    stmt = (
-        select(User, AuthIdentity)
-        .join(AuthIdentity, User.id == AuthIdentity.user_id)
-        .options(selectinload(User.roles).selectinload(Role.permissions))
-        .where(User.id == user_id)
-        .where(AuthIdentity.provider == "password")
-    )
-    row = (await db.execute(stmt)).first()
-
-    if row is None:
+    if token.type != "access":
         raise credentials_exception
+    user_id, token_version = token.user_id, token.ver
+
+    principal = await get_cached_principal(user_id, token_version)
+    if principal is None:
+        generation = await principal_generation(user_id)
+        stmt = (
+            select(User, AuthIdentity)
+            .join(AuthIdentity, User.id == AuthIdentity.user_id)
+            .options(selectinload(User.roles).selectinload(Role.permissions))
+            .where(User.id == user_id)
+            .where(AuthIdentity.provider == "password")
+        )
+        row = (await db.execute(stmt)).first()
+
+        if row is None:
+            raise credentials_exception
 
-    user, auth_identity = row
-
-    # token revocation (logout increments token_version)
-    if auth_identity.token_version != token_version:
-        raise credentials_exception
+        user, auth_identity = row
 
-    if not user.is_active:
-        raise InactiveUserError()
+        # token revocation (logout increments token_version)
+        if auth_identity.token_version != token_version:
+            raise credentials_exception
 
-    return user
+        principal = build_current_user_response(user)
+        await cache_principal(user_id, token_version, principal, generation)
 
+    if not principal.is_active:
+        raise InactiveUserError()
 
-def _get_user_permission_codes(user: User) -> set[str]:
-    codes: set[str] = set()
-    for role in getattr(user, "roles", []) or []:
-        for perm in getattr(role, "permissions", []) or []:
-            codes.add(perm.code)
-    return codes
+    return principal
 
 
 def require_permissions(*required: str):
-    """Require user to have all specified permission codes."""
+    """
+    Require user to have all specified permission codes.
 
-    async def _dep(user: Annotated[User, Depends(get_current_user)]) -> User:
-        user_codes = _get_user_permission_codes(user)
-        missing = [code for code in required if code not in user_codes]
-        if missing:
+    The required codes are compiled into a bitmask once, at decoration time; each request
+    does a single AND against the mask compiled into the (cached) principal.
+    """
+    required_mask = permission_registry.mask(required)
+
+    async def _dep(
+        user: Annotated[CurrentUserResponse, Depends(get_current_user)],
+    ) -> CurrentUserResponse:
+        user_mask = user.permission_mask
+        if user_mask & required_mask != required_mask:
+            missing = [c for c in required if not user_mask & permission_registry.bit(c)]
             raise PermissionDeniedError(f"Missing permissions: {', '.join(missing)}")
         return user
 
@@ -1,35 +1,35 @@
 """Audit log query endpoints."""
 
+from datetime import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
 
 from app.api.deps import require_permissions
-from app.database import get_db
+from app.core.export import ExportFormat, export_response
+from app.core.pagination import TotalMode, count_total, decode_cursor, encode_cursor
+from app.core.responses import TypedJSONResponse
+from app.database import get_read_db
 from app.models.audit_log import AuditLog
-from app.models.user import User
 from app.schemas.audit import AuditLogResponse
-from app.schemas.pagination import PaginatedResponse
+from app.schemas.pagination import CursorPaginatedResponse, PaginatedResponse
+from app.schemas.user import CurrentUserResponse
 
 router = APIRouter(prefix="/audit", tags=["audit"])
 
 
-@router.get("/logs", response_model=PaginatedResponse[AuditLogResponse])
-async def list_audit_logs(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permissions("rbac:read"))],
-    skip: int = 0,
-    limit: int = 50,
-    actor_user_id: int | None = None,
-    action: str | None = None,
-    target_type: str | None = None,
-    target_id: int | None = None,
-    request_id: str | None = None,
-) -> PaginatedResponse[AuditLogResponse]:
-    """List audit logs with pagination and optional filters."""
-    filters = []
+def _audit_filters(
+    actor_user_id: int | None,
+    action: str | None,
+    target_type: str | None,
+    target_id: int | None,
+    request_id: str | None,
+) -> list[ColumnElement[bool]]:
+    filters: list[ColumnElement[bool]] = []
     if actor_user_id is not None:
         filters.append(AuditLog.actor_user_id == actor_user_id)
     if action:
@@ -40,6 +40,23 @@ async def list_audit_logs(
         filters.append(AuditLog.target_id == target_id)
     if request_id:
         filters.append(AuditLog.request_id == request_id.strip())
+    return filters
+
+
+@router.get("/logs", response_model=PaginatedResponse[AuditLogResponse])
+async def list_audit_logs(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:read"))],
+    skip: int = 0,
+    limit: int = 50,
+    actor_user_id: int | None = None,
+    action: str | None = None,
+    target_type: str | None = None,
+    target_id: int | None = None,
+    request_id: str | None = None,
+) -> Response:
+    """List audit logs with pagination and optional filters."""
+    filters = _audit_filters(actor_user_id, action, target_type, target_id, request_id)
 
     total_stmt = select(func.count()).select_from(AuditLog)
     if filters:
@@ -58,18 +75,95 @@ async def list_audit_logs(
     result = await db.execute(items_stmt)
     logs = result.scalars().all()
     items = [AuditLogResponse.model_validate(log) for log in logs]
-    return PaginatedResponse[AuditLogResponse].create(
-        items=items, total=total, skip=skip, limit=limit
+    return TypedJSONResponse(
+        PaginatedResponse[AuditLogResponse].create(items=items, total=total, skip=skip, limit=limit)
+    )
+
+
+# 注意：/logs/cursor 必须在 /logs/{log_id} 之前定义
+@router.get("/logs/cursor", response_model=CursorPaginatedResponse[AuditLogResponse])
+async def list_audit_logs_cursor(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:read"))],
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 50,
+    actor_user_id: int | None = None,
+    action: str | None = None,
+    target_type: str | None = None,
+    target_id: int | None = None,
+    request_id: str | None = None,
+    total: TotalMode = "none",
+) -> Response:
+    """
+    List audit logs with keyset pagination (newest first, by created_at then id).
+
+    Pass the returned ``next_cursor`` to fetch the following page; cost is constant per page.
+    ``total`` is skipped by default (``none``); use ``estimate`` or ``exact`` to include it.
+    """
+    filters = _audit_filters(actor_user_id, action, target_type, target_id, request_id)
+    count, is_estimate = await count_total(db, AuditLog, filters, total)
+
+    items_stmt = (
+        select(AuditLog).order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit + 1)
     )
+    if cursor is not None:
+        after = decode_cursor(cursor, created_at=datetime.fromisoformat, id=int)
+        items_stmt = items_stmt.where(
+            tuple_(AuditLog.created_at, AuditLog.id) < tuple_(after["created_at"], after["id"])
+        )
+    if filters:
+        items_stmt = items_stmt.where(*filters)
+
+    logs = list((await db.execute(items_stmt)).scalars().all())
+    has_more = len(logs) > limit
+    logs = logs[:limit]
+    next_cursor = None
+    if has_more:
+        last = logs[-1]
+        next_cursor = encode_cursor({"created_at": last.created_at.isoformat(), "id": last.id})
+    return TypedJSONResponse(
+        CursorPaginatedResponse[AuditLogResponse](
+            items=[AuditLogResponse.model_validate(log) for log in logs],
+            limit=limit,
+            next_cursor=next_cursor,
+            has_more=has_more,
+            total=count,
+            total_is_estimate=is_estimate,
+        )
+    )
+
+
+# 注意：/logs/export 必须在 /logs/{log_id} 之前定义
+@router.get("/logs/export")
+async def export_audit_logs(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:read"))],
+    format: ExportFormat = "ndjson",
+    actor_user_id: int | None = None,
+    action: str | None = None,
+    target_type: str | None = None,
+    target_id: int | None = None,
+    request_id: str | None = None,
+) -> StreamingResponse:
+    """
+    Stream all audit logs matching the filters as NDJSON or CSV (newest first).
+
+    Replaces paging through ``/logs``, where every page re-counts and scans a deeper offset.
+    """
+    stmt = select(AuditLog).order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+    filters = _audit_filters(actor_user_id, action, target_type, target_id, request_id)
+    if filters:
+        stmt = stmt.where(*filters)
+    return export_response(db, stmt, AuditLogResponse, format, "audit-logs")
 
 
 @router.get("/logs/{log_id}", response_model=AuditLogResponse)
 async def get_audit_log(
     log_id: int,
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permissions("rbac:read"))],
-) -> AuditLogResponse:
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:read"))],
+) -> Response:
     log = await db.get(AuditLog, log_id)
     if log is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Audit log not found")
-    return AuditLogResponse.model_validate(log)
+    return TypedJSONResponse(AuditLogResponse.model_validate(log))
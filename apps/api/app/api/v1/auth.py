@@ -3,13 +3,13 @@
 from datetime import UTC, datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Cookie, Depends, Response, status
+from fastapi import APIRouter, BackgroundTasks, Cookie, Depends, Request, Response, status
 from jose import JWTError
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
-from app.api.deps import get_current_user
+from app.api.deps import build_current_user_response, get_current_user
 from app.config import settings
 from app.core.exceptions import (
     EmailAlreadyExistsError,
@@ -18,19 +18,25 @@ from app.core.exceptions import (
     InvalidPasswordError,
     TokenError,
 )
+from app.core.last_login import last_login_writer
+from app.core.login_throttle import login_throttle
+from app.core.password_rehash import rehash_password
+from app.core.principal_cache import invalidate_principal
+from app.core.rbac_cache import bump_rbac_generation
 from app.core.security import (
     create_access_token,
     create_refresh_token,
-    decode_token,
-    hash_password,
-    verify_password,
+    hash_password_async,
+    needs_rehash,
+    verify_dummy_password,
+    verify_password_async,
+    verify_token,
 )
 from app.database import get_db
 from app.models.auth_identity import AuthIdentity
 from app.models.rbac import Permission, Role
 from app.models.user import User
 from app.schemas.auth import ChangePasswordRequest, LoginRequest, RegisterRequest
-from app.schemas.rbac import RoleResponse
 from app.schemas.user import CurrentUserResponse, UserResponse
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -43,29 +49,13 @@ DEFAULT_PERMISSIONS: list[tuple[str, str]] = [
 ]
 
 
-def _collect_permission_codes(user: User) -> list[str]:
-    codes: set[str] = set()
-    for role in user.roles:
-        for perm in role.permissions:
-            codes.add(perm.code)
-    return sorted(codes)
-
-
-def _build_current_user_response(user: User) -> CurrentUserResponse:
-    return CurrentUserResponse(
-        id=user.id,
-        email=user.email,
-        name=user.name,
-        is_active=user.is_active,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-        roles=[RoleResponse.model_validate(r) for r in user.roles],
-        permissions=_collect_permission_codes(user),
-    )
-
+async def _ensure_default_rbac(db: AsyncSession) -> tuple[Role, Role, bool]:
+    """
+    Ensure default roles and permissions exist (for dev/tests without migration seed).
 
-async def _ensure_default_rbac(db: AsyncSession) -> tuple[Role, Role]:
-    """Ensure default roles and permissions exist (for dev/tests without migration seed)."""
+    Returns ``(admin, user, changed)``; ``changed`` is True when anything was created.
+    """
+    changed = False
     role_admin = (
         await db.execute(
             select(Role).options(selectinload(Role.permissions)).where(Role.name == "admin")
@@ -79,6 +69,7 @@ async def _ensure_default_rbac(db: AsyncSession) -> tuple[Role, Role]:
         # Avoid async lazy-load in SQLAlchemy async by initializing the collection explicitly
         role_admin.permissions = []
         db.add(role_admin)
+        changed = True
 
     role_user = (await db.execute(select(Role).where(Role.name == "user"))).scalar_one_or_none()
     if role_user is None:
@@ -87,6 +78,7 @@ async def _ensure_default_rbac(db: AsyncSession) -> tuple[Role, Role]:
         role_user.exclusive_group = "account"
         role_user.priority = 10
         db.add(role_user)
+        changed = True
 
     # ensure permissions exist
     existing = (await db.execute(select(Permission))).scalars().all()
@@ -97,6 +89,7 @@ async def _ensure_default_rbac(db: AsyncSession) -> tuple[Role, Role]:
         if perm is None:
             perm = Permission(code=code, description=desc)
             db.add(perm)
+            changed = True
         perms.append(perm)
 
     await db.flush()
@@ -106,9 +99,10 @@ async def _ensure_default_rbac(db: AsyncSession) -> tuple[Role, Role]:
     for perm in perms:
         if perm.code not in existing_codes:
             role_admin.permissions.append(perm)
+            changed = True
     await db.flush()
 
-    return role_admin, role_user
+    return role_admin, role_user, changed
 
 
 def set_auth_cookies(response: Response, access_token: str, refresh_token: str) -> None:
@@ -162,7 +156,7 @@ async def register(
     if result.scalar_one_or_none():
         raise EmailAlreadyExistsError(request.email)
 
-    role_admin, role_user = await _ensure_default_rbac(db)
+    role_admin, role_user, rbac_seeded = await _ensure_default_rbac(db)
 
     # 创建用户
     user = User(email=request.email, name=request.name, is_active=True)
@@ -180,12 +174,14 @@ async def register(
         user_id=user.id,
         provider="password",
         identifier=request.email,
-        hashed_password=hash_password(request.password),
+        hashed_password=await hash_password_async(request.password),
         token_version=0,
     )
     db.add(auth_identity)
 
     await db.commit()
+    if rbac_seeded:
+        await bump_rbac_generation()
     await db.refresh(user)
 
     return UserResponse.model_validate(user)
@@ -196,43 +192,74 @@ async def login(
     request: LoginRequest,
     response: Response,
     db: Annotated[AsyncSession, Depends(get_db)],
+    http_request: Request,
+    background_tasks: BackgroundTasks,
 ) -> UserResponse:
     """
     Login with email and password.
 
-    Sets access_token and refresh_token cookies on success.
+    Sets access_token and refresh_token cookies on success. Repeated failures lock the email
+    and the client IP with exponential backoff (429 before any DB or bcrypt work). A hash with
+    an outdated bcrypt cost is re-hashed in-process after the response is sent.
     """
-    # 查询认证身份
-    result = await db.execute(
-        select(AuthIdentity)
-        .where(AuthIdentity.provider == "password")
-        .where(AuthIdentity.identifier == request.email)
+    client_ip = http_request.client.host if http_request.client else None
+    await login_throttle.check(request.email, client_ip)
+
+    # 一条 JOIN 查询取回认证身份、用户及其角色（不加载角色权限）
+    row = (
+        (
+            await db.execute(
+                select(AuthIdentity, User)
+                .join(User, User.id == AuthIdentity.user_id)
+                .where(AuthIdentity.provider == "password")
+                .where(AuthIdentity.identifier == request.email)
+                .options(joinedload(User.roles).noload(Role.permissions))
+            )
+        )
+        .unique()
+        .one_or_none()
     )
-    auth_identity = result.scalar_one_or_none()
 
-    if not auth_identity or not auth_identity.hashed_password:
+    if row is None or not row[0].hashed_password:
+        # 未知邮箱也执行一次 bcrypt，避免通过响应时间枚举已注册邮箱
+        await verify_dummy_password(request.password)
+        await login_throttle.record_failure(request.email, client_ip)
         raise InvalidCredentialsError()
+    auth_identity, user = row
+    stored_hash = auth_identity.hashed_password
 
     # 验证密码
-    if not verify_password(request.password, auth_identity.hashed_password):
-        raise InvalidCredentialsError()
-
-    # 查询用户
-    user = await db.get(User, auth_identity.user_id)
-    if not user:
+    if not await verify_password_async(request.password, stored_hash):
+        await login_throttle.record_failure(request.email, client_ip)
         raise InvalidCredentialsError()
+    await login_throttle.reset(request.email)
 
     if not user.is_active:
         raise InactiveUserError()
 
-    # 更新最后登录时间
-    auth_identity.last_login_at = datetime.now(UTC)
-    await db.commit()
-    await db.refresh(user)
+    # bcrypt cost 已调整：响应发送后在密码哈希线程池上重新哈希（明文不出进程）
+    if settings.password_rehash_on_login and needs_rehash(stored_hash):
+        background_tasks.add_task(rehash_password, auth_identity.id, stored_hash, request.password)
+
+    # 更新最后登录时间：写缓冲运行时只记入内存，由后台批量写回（此时 token_version 取自上面的查询）
+    now = datetime.now(UTC)
+    token_version = auth_identity.token_version
+    if not last_login_writer.record(auth_identity.id, now):
+        # 直接写：RETURNING 取写入时的 token_version（并发的全端登出在此之后生效）
+        token_version = (
+            await db.execute(
+                update(AuthIdentity)
+                .where(AuthIdentity.id == auth_identity.id)
+                .values(last_login_at=now)
+                .returning(AuthIdentity.token_version),
+                execution_options={"synchronize_session": False},
+            )
+        ).scalar_one()
+        await db.commit()
 
     # 生成 token
-    access_token = create_access_token(user.id, auth_identity.token_version)
-    refresh_token = create_refresh_token(user.id, auth_identity.token_version)
+    access_token = create_access_token(user.id, token_version)
+    refresh_token = create_refresh_token(user.id, token_version)
 
     # 设置 cookie
     set_auth_cookies(response, access_token, refresh_token)
@@ -242,10 +269,10 @@ async def login(
 
 @router.get("/me", response_model=CurrentUserResponse)
 async def get_me(
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[CurrentUserResponse, Depends(get_current_user)],
 ) -> CurrentUserResponse:
     """Get current authenticated user."""
-    return _build_current_user_response(current_user)
+    return current_user
 
 
 @router.post("/refresh", response_model=CurrentUserResponse)
@@ -265,17 +292,12 @@ async def refresh_token(
         raise credentials_exception
 
     try:
-        payload = decode_token(refresh_token)
-        user_id_str: str | None = payload.get("sub")  # type: ignore[assignment]
-        token_type: str | None = payload.get("type")  # type: ignore[assignment]
-        token_version: int | None = payload.get("ver")  # type: ignore[assignment]
-
-        if user_id_str is None or token_type != "refresh" or token_version is None:
-            raise credentials_exception
-
-        user_id = int(user_id_str)
-    except (JWTError, ValueError):
+        token = verify_token(refresh_token)
+    except JWTError:
         raise credentials_exception from None
+    if token.type != "refresh":
+        raise credentials_exception
+    user_id, token_version = token.user_id, token.ver
 
     # 查询用户及认证身份
     result = await db.execute(
@@ -306,13 +328,13 @@ async def refresh_token(
     # 设置新 cookie
     set_auth_cookies(response, new_access_token, new_refresh_token)
 
-    return _build_current_user_response(user)
+    return build_current_user_response(user)
 
 
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
 async def logout(
     response: Response,
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[CurrentUserResponse, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
 ) -> None:
     """
@@ -332,6 +354,7 @@ async def logout(
         # 递增 token_version，使所有现有 token 失效
         auth_identity.token_version += 1
         await db.commit()
+        await invalidate_principal(current_user.id)
 
     # 清除 cookie
     clear_auth_cookies(response)
@@ -340,7 +363,7 @@ async def logout(
 @router.post("/change-password", status_code=status.HTTP_204_NO_CONTENT)
 async def change_password(
     request: ChangePasswordRequest,
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[CurrentUserResponse, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
 ) -> None:
     """
@@ -360,12 +383,13 @@ async def change_password(
         raise InvalidCredentialsError()
 
     # 验证当前密码
-    if not verify_password(request.current_password, auth_identity.hashed_password):
+    if not await verify_password_async(request.current_password, auth_identity.hashed_password):
         raise InvalidPasswordError("Current password is incorrect")
 
     # 更新密码
-    auth_identity.hashed_password = hash_password(request.new_password)
+    auth_identity.hashed_password = await hash_password_async(request.new_password)
     # 递增 token_version，使所有现有 token 失效（安全措施）
     auth_identity.token_version += 1
 
     await db.commit()
+    await invalidate_principal(current_user.id)
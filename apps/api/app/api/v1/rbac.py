@@ -1,8 +1,9 @@
 """RBAC (roles & permissions) management endpoints."""
 
+from functools import partial
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Request, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -10,6 +11,7 @@ from sqlalchemy.orm import selectinload
 from app.api.deps import require_permissions
 from app.core.audit import audit_event
 from app.core.exceptions import (
+    PermissionIdNotFoundError,
     PermissionNotFoundError,
     RoleAlreadyExistsError,
     RoleInUseError,
@@ -18,18 +20,28 @@ from app.core.exceptions import (
     SystemRoleImmutableError,
     UserNotFoundError,
 )
-from app.database import get_db
-from app.models.rbac import Permission, Role, user_roles
+from app.core.pagination import TotalMode, count_total, decode_cursor, encode_cursor
+from app.core.principal_cache import invalidate_all_principals, invalidate_principal
+from app.core.rbac_cache import (
+    bump_rbac_generation,
+    cached_rbac_response,
+    render_permissions,
+    render_roles,
+)
+from app.database import get_db, get_read_db
+from app.models.rbac import Permission, Role, role_permissions, user_roles
 from app.models.user import User
+from app.schemas.pagination import CursorPaginatedResponse
 from app.schemas.rbac import (
     PermissionResponse,
     RoleCreate,
     RolePermissionsUpdate,
+    RoleRefResponse,
     RoleResponse,
     RoleUpdate,
     UserRolesUpdate,
 )
-from app.schemas.user import UserResponse
+from app.schemas.user import CurrentUserResponse, UserResponse
 
 router = APIRouter(tags=["rbac"])
 
@@ -37,20 +49,20 @@ router = APIRouter(tags=["rbac"])
 @router.get("/roles", response_model=list[RoleResponse])
 async def list_roles(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permissions("rbac:read"))],
-) -> list[RoleResponse]:
-    result = await db.execute(
-        select(Role).options(selectinload(Role.permissions)).order_by(Role.id)
-    )
-    roles = result.scalars().all()
-    return [RoleResponse.model_validate(r) for r in roles]
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:read"))],
+    request: Request,
+) -> Response:
+    """List roles (served from the versioned RBAC cache; supports If-None-Match)."""
+    # Rendered from the primary: a lagging replica would cache stale bodies under the new
+    # generation until the next bump.
+    return await cached_rbac_response(request, "roles", partial(render_roles, db))
 
 
 @router.post("/roles", response_model=RoleResponse, status_code=status.HTTP_201_CREATED)
 async def create_role(
     payload: RoleCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    actor: Annotated[User, Depends(require_permissions("rbac:write"))],
+    actor: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:write"))],
     request: Request,
 ) -> RoleResponse:
     existing = (
@@ -85,6 +97,7 @@ async def create_role(
         user_agent=request.headers.get("user-agent"),
     )
     await db.commit()
+    await bump_rbac_generation()
     await db.refresh(role)
     return RoleResponse.model_validate(role)
 
@@ -94,7 +107,7 @@ async def update_role(
     role_id: int,
     payload: RoleUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    actor: Annotated[User, Depends(require_permissions("rbac:write"))],
+    actor: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:write"))],
     request: Request,
 ) -> RoleResponse:
     role = await db.get(Role, role_id)
@@ -138,6 +151,8 @@ async def update_role(
         user_agent=request.headers.get("user-agent"),
     )
     await db.commit()
+    await invalidate_all_principals()
+    await bump_rbac_generation()
     await db.refresh(role)
     return RoleResponse.model_validate(role)
 
@@ -146,7 +161,7 @@ async def update_role(
 async def delete_role(
     role_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
-    actor: Annotated[User, Depends(require_permissions("rbac:write"))],
+    actor: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:write"))],
     request: Request,
 ) -> None:
     role = await db.get(Role, role_id)
@@ -175,16 +190,102 @@ async def delete_role(
     )
     await db.delete(role)
     await db.commit()
+    await bump_rbac_generation()
+
+
+@router.get("/roles/{role_id}/members", response_model=CursorPaginatedResponse[UserResponse])
+async def list_role_members(
+    role_id: int,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:read", "users:read"))],
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 20,
+    total: TotalMode = "none",
+) -> CursorPaginatedResponse[UserResponse]:
+    """
+    List users holding a role (keyset pagination ordered by user id).
+
+    Role.users is never loaded implicitly; this is the way to enumerate members.
+    """
+    if await db.get(Role, role_id) is None:
+        raise RoleNotFoundError(role_id)
+
+    count, is_estimate = await count_total(db, user_roles, [user_roles.c.role_id == role_id], total)
+    items_stmt = (
+        select(User)
+        .join(user_roles, user_roles.c.user_id == User.id)
+        .where(user_roles.c.role_id == role_id)
+        .options(selectinload(User.roles))
+        .order_by(User.id)
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        items_stmt = items_stmt.where(User.id > decode_cursor(cursor, id=int)["id"])
+
+    users = list((await db.execute(items_stmt)).scalars().all())
+    has_more = len(users) > limit
+    users = users[:limit]
+    return CursorPaginatedResponse[UserResponse](
+        items=[UserResponse.model_validate(u) for u in users],
+        limit=limit,
+        next_cursor=encode_cursor({"id": users[-1].id}) if has_more else None,
+        has_more=has_more,
+        total=count,
+        total_is_estimate=is_estimate,
+    )
 
 
 @router.get("/permissions", response_model=list[PermissionResponse])
 async def list_permissions(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permissions("rbac:read"))],
-) -> list[PermissionResponse]:
-    result = await db.execute(select(Permission).order_by(Permission.id))
-    permissions = result.scalars().all()
-    return [PermissionResponse.model_validate(p) for p in permissions]
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:read"))],
+    request: Request,
+) -> Response:
+    """List permissions (served from the versioned RBAC cache; supports If-None-Match)."""
+    return await cached_rbac_response(request, "permissions", partial(render_permissions, db))
+
+
+@router.get(
+    "/permissions/{permission_id}/roles",
+    response_model=CursorPaginatedResponse[RoleRefResponse],
+)
+async def list_permission_roles(
+    permission_id: int,
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:read"))],
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 20,
+    total: TotalMode = "none",
+) -> CursorPaginatedResponse[RoleRefResponse]:
+    """List roles granting a permission (keyset pagination ordered by role id)."""
+    if await db.get(Permission, permission_id) is None:
+        raise PermissionIdNotFoundError(permission_id)
+
+    count, is_estimate = await count_total(
+        db, role_permissions, [role_permissions.c.permission_id == permission_id], total
+    )
+    # Only the columns RoleRefResponse needs: no Role.permissions selectin per page
+    items_stmt = (
+        select(Role.id, Role.name, Role.description)
+        .join(role_permissions, role_permissions.c.role_id == Role.id)
+        .where(role_permissions.c.permission_id == permission_id)
+        .order_by(Role.id)
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        items_stmt = items_stmt.where(Role.id > decode_cursor(cursor, id=int)["id"])
+
+    rows = list((await db.execute(items_stmt)).all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return CursorPaginatedResponse[RoleRefResponse](
+        items=[RoleRefResponse.model_validate(r) for r in rows],
+        limit=limit,
+        next_cursor=encode_cursor({"id": rows[-1].id}) if has_more else None,
+        has_more=has_more,
+        total=count,
+        total_is_estimate=is_estimate,
+    )
 
 
 @router.put("/roles/{role_id}/permissions", response_model=RoleResponse)
@@ -192,7 +293,7 @@ async def set_role_permissions(
     role_id: int,
     payload: RolePermissionsUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    actor: Annotated[User, Depends(require_permissions("rbac:write"))],
+    actor: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:write"))],
     request: Request,
 ) -> RoleResponse:
     role = (
@@ -217,8 +318,11 @@ async def set_role_permissions(
             request_id=request.headers.get("x-request-id"),
             ip=(request.client.host if request.client else None),
             user_agent=request.headers.get("user-agent"),
+            strict=True,
         )
         await db.commit()
+        await invalidate_all_principals()
+        await bump_rbac_generation()
         await db.refresh(role)
         return RoleResponse.model_validate(role)
 
@@ -240,8 +344,11 @@ async def set_role_permissions(
         request_id=request.headers.get("x-request-id"),
         ip=(request.client.host if request.client else None),
         user_agent=request.headers.get("user-agent"),
+        strict=True,
     )
     await db.commit()
+    await invalidate_all_principals()
+    await bump_rbac_generation()
     await db.refresh(role)
     return RoleResponse.model_validate(role)
 
@@ -251,7 +358,7 @@ async def set_user_roles(
     user_id: int,
     payload: UserRolesUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    actor: Annotated[User, Depends(require_permissions("rbac:write"))],
+    actor: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:write"))],
     request: Request,
 ) -> UserResponse:
     user = (
@@ -274,8 +381,10 @@ async def set_user_roles(
             request_id=request.headers.get("x-request-id"),
             ip=(request.client.host if request.client else None),
             user_agent=request.headers.get("user-agent"),
+            strict=True,
         )
         await db.commit()
+        await invalidate_principal(user.id)
         await db.refresh(user)
         return UserResponse.model_validate(user)
 
@@ -311,7 +420,9 @@ async def set_user_roles(
         request_id=request.headers.get("x-request-id"),
         ip=(request.client.host if request.client else None),
         user_agent=request.headers.get("user-agent"),
+        strict=True,
     )
     await db.commit()
+    await invalidate_principal(user.id)
     await db.refresh(user)
     return UserResponse.model_validate(user)
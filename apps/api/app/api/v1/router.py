@@ -2,7 +2,7 @@
 
 from fastapi import APIRouter
 
-from app.api.v1 import audit, auth, rbac, users
+from app.api.v1 import audit, auth, rbac, system, users
 
 api_router = APIRouter(prefix="/v1")
 
@@ -10,3 +10,4 @@ api_router.include_router(auth.router)
 api_router.include_router(rbac.router)
 api_router.include_router(users.router)
 api_router.include_router(audit.router)
+api_router.include_router(system.router)
@@ -0,0 +1,24 @@
+"""System diagnostics endpoints (per-worker runtime state)."""
+
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+
+from app.api.deps import require_permissions
+from app.database import pool_stats
+from app.schemas.system import DatabasePoolStats
+from app.schemas.user import CurrentUserResponse
+
+router = APIRouter(prefix="/system", tags=["system"])
+
+
+@router.get("/db-pool", response_model=DatabasePoolStats)
+async def get_db_pool_stats(
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("rbac:read"))],
+) -> DatabasePoolStats:
+    """
+    Connection pool statistics of the worker serving this request.
+
+    Each uvicorn worker has its own pool; use the db_pool_* Prometheus gauges for totals.
+    """
+    return DatabasePoolStats(**pool_stats())
@@ -1,19 +1,40 @@
 """User API endpoints."""
 
-from typing import Annotated
+import asyncio
+from typing import Annotated, Any, Literal
 
-from fastapi import APIRouter, Depends, Request, status
-from sqlalchemy import func, or_, select
+from celery import states
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.sql.elements import ColumnElement
 
 from app.api.deps import get_current_user, require_permissions
+from app.config import settings
 from app.core.audit import audit_event
+from app.core.bulk_users import bulk_job_owner, import_users, read_bulk_rows, stash_bulk_job
 from app.core.exceptions import EmailAlreadyExistsError, UserNotFoundError
-from app.database import get_db
+from app.core.export import ExportFormat, export_response
+from app.core.pagination import TotalMode, count_total, decode_cursor, encode_cursor
+from app.core.principal_cache import invalidate_principal, invalidate_principals
+from app.core.responses import TypedJSONResponse
+from app.database import get_db, get_read_db
 from app.models.user import User
-from app.schemas.pagination import PaginatedResponse
-from app.schemas.user import UserCreate, UserResponse, UserUpdate
+from app.schemas.pagination import CursorPaginatedResponse, PaginatedResponse
+from app.schemas.user import (
+    BulkImportJobResponse,
+    BulkImportResponse,
+    BulkUserUpdate,
+    BulkUserUpdateResponse,
+    CurrentUserResponse,
+    UserCreate,
+    UserResponse,
+    UserUpdate,
+)
+from app.worker import celery_app
+from app.worker.tasks import bulk_import_users as bulk_import_task
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -21,16 +42,16 @@ router = APIRouter(prefix="/users", tags=["users"])
 # 注意：/me 路由必须在 /{user_id} 之前定义，否则 FastAPI 会将 "me" 匹配为 user_id
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_profile(
-    current_user: Annotated[User, Depends(get_current_user)],
-) -> UserResponse:
+    current_user: Annotated[CurrentUserResponse, Depends(get_current_user)],
+) -> Response:
     """Get current authenticated user's profile."""
-    return UserResponse.model_validate(current_user)
+    return TypedJSONResponse(UserResponse.model_validate(current_user))
 
 
 @router.patch("/me", response_model=UserResponse)
 async def update_current_user_profile(
     user_update: UserUpdate,
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[CurrentUserResponse, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
 ) -> UserResponse:
     """Update current authenticated user's profile."""
@@ -40,12 +61,18 @@ async def update_current_user_profile(
         if result.scalar_one_or_none():
             raise EmailAlreadyExistsError(user_update.email)
 
+    # current_user 是缓存的快照，需要加载 ORM 对象再更新
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise UserNotFoundError(current_user.id)
+
     # 更新字段
     update_data = user_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
-        setattr(current_user, field, value)
+        setattr(user, field, value)
 
     await db.commit()
+    await invalidate_principal(current_user.id)
     refreshed = (
         await db.execute(
             select(User).options(selectinload(User.roles)).where(User.id == current_user.id)
@@ -58,7 +85,7 @@ async def update_current_user_profile(
 async def create_user(
     user: UserCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    actor: Annotated[User, Depends(require_permissions("users:write"))],
+    actor: Annotated[CurrentUserResponse, Depends(require_permissions("users:write"))],
     request: Request,
 ) -> UserResponse:
     """Create a new user."""
@@ -87,17 +114,131 @@ async def create_user(
     return UserResponse.model_validate(db_user)
 
 
-@router.get("/page", response_model=PaginatedResponse[UserResponse])
-async def list_users_page(
+_BULK_IMPORT_OPENAPI: dict[str, Any] = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"type": "array", "items": {"$ref": "#/components/schemas/UserCreate"}}
+            },
+            "text/csv": {
+                "schema": {"type": "string"},
+                "example": "email,name\nalice@example.com,Alice\n",
+            },
+        },
+    }
+}
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkImportResponse,
+    responses={status.HTTP_202_ACCEPTED: {"model": BulkImportJobResponse}},
+    openapi_extra=_BULK_IMPORT_OPENAPI,
+)
+async def bulk_import(
+    request: Request,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permissions("users:read"))],
-    skip: int = 0,
-    limit: int = 20,
-    q: str | None = None,
-    is_active: bool | None = None,
-) -> PaginatedResponse[UserResponse]:
-    """List users with server-side pagination, optional search, and status filter."""
-    filters = []
+    actor: Annotated[CurrentUserResponse, Depends(require_permissions("users:write"))],
+) -> Response:
+    """
+    Import users from a JSON array or a CSV body (``Content-Type: text/csv``, header line).
+
+    Existing emails are skipped and invalid rows reported by index; valid rows get the default
+    role. Payloads above ``bulk_import_sync_max_rows`` are handed to a background job and
+    answered with 202; the caller polls ``/users/bulk/jobs/{job_id}`` for the result.
+    """
+    rows = await read_bulk_rows(request)
+    request_id = request.headers.get("x-request-id")
+
+    if len(rows) > settings.bulk_import_sync_max_rows:
+        # The message carries only the job id; the worker loads the stashed rows
+        job_id = await stash_bulk_job(rows, owner_id=actor.id)
+        # Publishing talks to the broker synchronously; keep it off the event loop
+        job = await asyncio.to_thread(
+            bulk_import_task.apply_async, (job_id, actor.id, request_id), task_id=job_id
+        )
+        return TypedJSONResponse(
+            BulkImportJobResponse(job_id=job.id, status=states.PENDING),
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Location": f"{request.url.path.rstrip('/')}/jobs/{job.id}"},
+        )
+
+    result = await import_users(
+        db,
+        rows,
+        actor_user_id=actor.id,
+        request_id=request_id,
+        ip=(request.client.host if request.client else None),
+        user_agent=request.headers.get("user-agent"),
+    )
+    return TypedJSONResponse(result)
+
+
+def _bulk_job_status(job_id: str) -> tuple[str, Any]:
+    # Resolve via the app: a task's own backend is bound per thread and is unset in to_thread
+    job = celery_app.AsyncResult(job_id)
+    state = job.state
+    return state, (job.result if state == states.SUCCESS else None)
+
+
+@router.get("/bulk/jobs/{job_id}", response_model=BulkImportJobResponse)
+async def get_bulk_import_job(
+    job_id: str,
+    actor: Annotated[CurrentUserResponse, Depends(require_permissions("users:write"))],
+) -> BulkImportJobResponse:
+    """
+    Status of a background bulk import started by the caller.
+
+    Other users' jobs report ``PENDING`` with no result, exactly like unknown or expired IDs.
+    """
+    if await bulk_job_owner(job_id) != actor.id:
+        return BulkImportJobResponse(job_id=job_id, status=states.PENDING)
+    state, result = await asyncio.to_thread(_bulk_job_status, job_id)
+    return BulkImportJobResponse(
+        job_id=job_id,
+        status=state,
+        result=BulkImportResponse.model_validate(result) if result is not None else None,
+    )
+
+
+@router.patch("/bulk", response_model=BulkUserUpdateResponse)
+async def bulk_update_users(
+    body: BulkUserUpdate,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    actor: Annotated[CurrentUserResponse, Depends(require_permissions("users:write"))],
+    request: Request,
+) -> BulkUserUpdateResponse:
+    """Activate or deactivate many users with one UPDATE and one audit event."""
+    ids = sorted(set(body.ids))
+    result = await db.execute(
+        update(User)
+        .where(User.id.in_(ids))
+        .values(is_active=body.is_active)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    updated = sorted(result.scalars())
+    if updated:
+        audit_event(
+            db,
+            actor_user_id=actor.id,
+            action="users.bulk_update",
+            target_type="user",
+            target_id=None,
+            payload={"user_ids": updated, "after": {"is_active": body.is_active}},
+            request_id=request.headers.get("x-request-id"),
+            ip=(request.client.host if request.client else None),
+            user_agent=request.headers.get("user-agent"),
+        )
+    await db.commit()
+    await invalidate_principals(updated)
+    found = set(updated)
+    return BulkUserUpdateResponse(updated=updated, missing=[i for i in ids if i not in found])
+
+
+def _user_filters(q: str | None, is_active: bool | None) -> list[ColumnElement[bool]]:
+    filters: list[ColumnElement[bool]] = []
 
     if is_active is not None:
         filters.append(User.is_active.is_(is_active))
@@ -107,13 +248,67 @@ async def list_users_page(
         like = f"%{query}%"
         filters.append(or_(User.email.ilike(like), User.name.ilike(like)))
 
+    return filters
+
+
+def _search_order(query: str, dialect: str) -> list[ColumnElement[Any]]:
+    """
+    Relevance ordering for ``search=ranked``.
+
+    Prefix matches (email, or any word of the name) come first. On PostgreSQL the rest is
+    ordered by pg_trgm ``similarity()`` (the ILIKE filter itself is served by the
+    ix_users_*_trgm GIN indexes); other dialects (SQLite in tests) order prefix-then-id.
+    """
+    prefix = f"{query}%"
+    word_prefix = f"% {query}%"
+    matches_prefix: ColumnElement[bool] = or_(
+        User.email.ilike(prefix),
+        User.name.ilike(prefix),
+        User.name.ilike(word_prefix),
+    )
+    is_prefix: ColumnElement[int] = case((matches_prefix, 1), else_=0)
+    order: list[ColumnElement[Any]] = [is_prefix.desc()]
+    if dialect == "postgresql":
+        similarity: ColumnElement[float] = func.greatest(
+            func.similarity(User.email, query),
+            func.coalesce(func.similarity(User.name, query), 0),
+        )
+        order.append(similarity.desc())
+    order.append(User.id.asc())
+    return order
+
+
+@router.get("/page", response_model=PaginatedResponse[UserResponse])
+async def list_users_page(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("users:read"))],
+    skip: int = 0,
+    limit: int = 20,
+    q: str | None = None,
+    is_active: bool | None = None,
+    search: Literal["contains", "ranked"] = "contains",
+) -> Response:
+    """
+    List users with server-side pagination, optional search, and status filter.
+
+    ``q`` matches email/name substrings. With ``search=ranked`` results are ordered by
+    relevance (prefix matches first, then trigram similarity on PostgreSQL) instead of id.
+    """
+    filters = _user_filters(q, is_active)
+
     total_stmt = select(func.count()).select_from(User)
     if filters:
         total_stmt = total_stmt.where(*filters)
     total = (await db.execute(total_stmt)).scalar_one()
 
+    query = (q or "").strip()
+    if search == "ranked" and query:
+        order_by = _search_order(query, db.get_bind().dialect.name)
+    else:
+        order_by = [User.id.asc()]
+
     items_stmt = (
-        select(User).options(selectinload(User.roles)).order_by(User.id).offset(skip).limit(limit)
+        select(User).options(selectinload(User.roles)).order_by(*order_by).offset(skip).limit(limit)
     )
     if filters:
         items_stmt = items_stmt.where(*filters)
@@ -121,38 +316,102 @@ async def list_users_page(
     result = await db.execute(items_stmt)
     users = result.scalars().all()
     items = [UserResponse.model_validate(u) for u in users]
-    return PaginatedResponse[UserResponse].create(items=items, total=total, skip=skip, limit=limit)
+    return TypedJSONResponse(
+        PaginatedResponse[UserResponse].create(items=items, total=total, skip=skip, limit=limit)
+    )
+
+
+@router.get("/cursor", response_model=CursorPaginatedResponse[UserResponse])
+async def list_users_cursor(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("users:read"))],
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 20,
+    q: str | None = None,
+    is_active: bool | None = None,
+    total: TotalMode = "none",
+) -> Response:
+    """
+    List users with keyset pagination (ordered by id).
+
+    Pass the returned ``next_cursor`` to fetch the following page; cost is constant per page.
+    ``total`` is skipped by default (``none``); use ``estimate`` or ``exact`` to include it.
+    """
+    filters = _user_filters(q, is_active)
+    count, is_estimate = await count_total(db, User, filters, total)
+
+    items_stmt = select(User).options(selectinload(User.roles)).order_by(User.id).limit(limit + 1)
+    if cursor is not None:
+        items_stmt = items_stmt.where(User.id > decode_cursor(cursor, id=int)["id"])
+    if filters:
+        items_stmt = items_stmt.where(*filters)
+
+    users = list((await db.execute(items_stmt)).scalars().all())
+    has_more = len(users) > limit
+    users = users[:limit]
+    return TypedJSONResponse(
+        CursorPaginatedResponse[UserResponse](
+            items=[UserResponse.model_validate(u) for u in users],
+            limit=limit,
+            next_cursor=encode_cursor({"id": users[-1].id}) if has_more else None,
+            has_more=has_more,
+            total=count,
+            total_is_estimate=is_estimate,
+        )
+    )
+
+
+@router.get("/export")
+async def export_users(
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("users:read"))],
+    format: ExportFormat = "ndjson",
+    q: str | None = None,
+    is_active: bool | None = None,
+) -> StreamingResponse:
+    """
+    Stream all users matching the filters as NDJSON or CSV (ordered by id).
+
+    Rows are read through a server-side cursor in ``export_batch_size`` batches, so one
+    request replaces paging through the listing with growing offsets.
+    """
+    stmt = select(User).options(selectinload(User.roles)).order_by(User.id)
+    filters = _user_filters(q, is_active)
+    if filters:
+        stmt = stmt.where(*filters)
+    return export_response(db, stmt, UserResponse, format, "users")
 
 
 @router.get("/", response_model=list[UserResponse])
 async def list_users(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permissions("users:read"))],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("users:read"))],
     skip: int = 0,
     limit: int = 100,
-) -> list[UserResponse]:
+) -> Response:
     """List all users."""
     result = await db.execute(
         select(User).options(selectinload(User.roles)).offset(skip).limit(limit)
     )
     users = result.scalars().all()
-    return [UserResponse.model_validate(user) for user in users]
+    return TypedJSONResponse([UserResponse.model_validate(user) for user in users])
 
 
-# 注意：/{user_id} 路由必须在 /page 和 / 之后定义，否则 FastAPI 会将 "page" 或空字符串匹配为 user_id
+# 注意：/{user_id} 路由必须在 /bulk、/page、/cursor、/export 和 / 之后定义，
+# 否则 FastAPI 会将 "page" 或空字符串匹配为 user_id
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(require_permissions("users:read"))],
-) -> UserResponse:
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    _: Annotated[CurrentUserResponse, Depends(require_permissions("users:read"))],
+) -> Response:
     """Get a user by ID."""
     user = (
         await db.execute(select(User).options(selectinload(User.roles)).where(User.id == user_id))
     ).scalar_one_or_none()
     if user is None:
         raise UserNotFoundError(user_id)
-    return UserResponse.model_validate(user)
+    return TypedJSONResponse(UserResponse.model_validate(user))
 
 
 @router.patch("/{user_id}", response_model=UserResponse)
@@ -160,7 +419,7 @@ async def update_user(
     user_id: int,
     user_update: UserUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    actor: Annotated[User, Depends(require_permissions("users:write"))],
+    actor: Annotated[CurrentUserResponse, Depends(require_permissions("users:write"))],
     request: Request,
 ) -> UserResponse:
     """Update a user."""
@@ -190,17 +449,17 @@ async def update_user(
         user_agent=request.headers.get("user-agent"),
     )
     await db.commit()
-    refreshed = (
-        await db.execute(select(User).options(selectinload(User.roles)).where(User.id == user_id))
-    ).scalar_one()
-    return UserResponse.model_validate(refreshed)
+    await invalidate_principal(user_id)
+    # roles are still loaded (expire_on_commit=False); only the onupdate column needs a reload
+    await db.refresh(user, ["updated_at"])
+    return UserResponse.model_validate(user)
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
-    actor: Annotated[User, Depends(require_permissions("users:write"))],
+    actor: Annotated[CurrentUserResponse, Depends(require_permissions("users:write"))],
     request: Request,
 ) -> None:
     """Delete a user."""
@@ -221,3 +480,4 @@ async def delete_user(
     )
     await db.delete(user)
     await db.commit()
+    await invalidate_principal(user_id)
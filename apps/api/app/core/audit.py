@@ -2,13 +2,136 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import event, insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.core.logging import get_logger
+from app.database import async_session
 from app.models.audit_log import AuditLog
 
 logger = get_logger(__name__)
 
+# Key in Session.info holding events waiting for the caller's transaction to commit.
+_PENDING_KEY = "audit_pending"
+
+
+class AuditWriter:
+    """
+    Background writer that buffers audit rows and inserts them in bulk.
+
+    Rows are flushed with a single multi-row INSERT when ``batch_size`` rows are buffered
+    or ``flush_interval`` seconds have passed. ``stop()`` drains the buffer.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        *,
+        batch_size: int,
+        flush_interval: float,
+        max_pending: int,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._buffer: list[dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def has_capacity(self, count: int = 1) -> bool:
+        return len(self._buffer) + count <= self.max_pending
+
+    def submit(self, rows: list[dict[str, Any]]) -> None:
+        """Queue committed rows for the next bulk insert."""
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if not self.running:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="audit-writer")
+
+    async def stop(self) -> None:
+        """Stop the background loop and flush everything still buffered."""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        if self._buffer and not await self._drain():
+            logger.error("audit_writer_drain_failed", dropped=len(self._buffer))
+            self._buffer.clear()
+
+    async def flush(self) -> bool:
+        """Insert up to ``batch_size`` buffered rows; returns False if the insert failed."""
+        if not self._buffer:
+            return True
+        batch = self._buffer[: self.batch_size]
+        del self._buffer[: self.batch_size]
+        try:
+            async with self.session_factory() as session:
+                await session.execute(insert(AuditLog), batch)
+                await session.commit()
+        except Exception as e:
+            # Put the batch back in front so ordering is preserved for the retry.
+            self._buffer[:0] = batch
+            logger.error("audit_writer_flush_failed", rows=len(batch), error=str(e))
+            return False
+        return True
+
+    async def _drain(self) -> bool:
+        while self._buffer:
+            if not await self.flush():
+                return False
+        return True
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            self._wakeup.clear()
+            await self._drain()
+
+
+audit_writer = AuditWriter(
+    async_session,
+    batch_size=settings.audit_batch_size,
+    flush_interval=settings.audit_flush_interval_seconds,
+    max_pending=settings.audit_max_pending,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _hand_off_committed_events(session: Session) -> None:
+    rows = session.info.pop(_PENDING_KEY, None)
+    if rows:
+        audit_writer.submit(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_events(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
 
 def audit_event(
     db: AsyncSession,
@@ -21,34 +144,38 @@ def audit_event(
     request_id: str | None = None,
     ip: str | None = None,
     user_agent: str | None = None,
+    strict: bool = False,
 ) -> None:
     """
-    Add an audit log record to the current DB session and write a structured log.
+    Record an audit event and write a structured log.
 
     Notes:
     - This function does NOT commit. Callers should commit/rollback as part of their transaction.
+    - When the async writer is running and ``strict`` is False, the row is handed to the
+      writer only after the caller's transaction commits (and discarded on rollback), then
+      bulk-inserted in a separate transaction.
+    - With ``strict=True``, the writer disabled, or the writer's buffer full (backpressure),
+      the row is added to ``db`` and lands in the caller's transaction.
     """
-    db.add(
-        AuditLog(
-            actor_user_id=actor_user_id,
-            action=action,
-            target_type=target_type,
-            target_id=target_id,
-            payload=payload,
-            request_id=request_id,
-            ip=ip,
-            user_agent=user_agent,
-        )
-    )
-
-    logger.info(
-        "audit",
-        actor_user_id=actor_user_id,
-        action=action,
-        target_type=target_type,
-        target_id=target_id,
-        payload=payload,
-        request_id=request_id,
-        ip=ip,
-        user_agent=user_agent,
-    )
+    row = {
+        "actor_user_id": actor_user_id,
+        "action": action,
+        "target_type": target_type,
+        "target_id": target_id,
+        "payload": payload,
+        "request_id": request_id,
+        "ip": ip,
+        "user_agent": user_agent,
+    }
+
+    deferred = False
+    if not strict and audit_writer.running:
+        pending: list[dict[str, Any]] = db.info.setdefault(_PENDING_KEY, [])
+        if audit_writer.has_capacity(len(pending) + 1):
+            pending.append({**row, "created_at": datetime.now(UTC)})
+            deferred = True
+
+    if not deferred:
+        db.add(AuditLog(**row))
+
+    logger.info("audit", **row)
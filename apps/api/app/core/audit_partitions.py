@@ -0,0 +1,263 @@
+"""Monthly range partitions of audit_logs (PostgreSQL): pre-creation and archival.
+
+The ``audit_logs`` table is partitioned by ``created_at`` (see the partitioning migration).
+Each month lives in ``audit_logs_pYYYY_MM`` and a ``audit_logs_default`` partition catches
+rows outside every range. Month boundaries are UTC.
+
+- ``ensure_audit_partitions`` creates the current month and ``months_ahead`` future months.
+  It runs at startup and from the maintenance job, so inserts never land in the default
+  partition.
+- ``archive_audit_partitions`` detaches the months older than the retention window. It
+  writes each one to ``<archive_dir>/<partition>.ndjson.gz`` and then drops it. Dropping a
+  whole partition is cheap compared with ``DELETE``, and the indexes stay one month wide.
+  Retention is off by default. It refuses to run unless the archive directory is durable
+  (absolute, on a mounted volume), and a partition is only dropped after its archive was
+  synced to disk and read back with the partition's row count.
+
+Other dialects (SQLite in tests) have no partitions; both functions do nothing there.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import os
+import re
+from dataclasses import dataclass
+from datetime import UTC, date, datetime
+from pathlib import Path
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+PARENT_TABLE = "audit_logs"
+_PARTITION_RE = re.compile(r"^audit_logs_p(\d{4})_(\d{2})$")
+
+_LIST_PARTITIONS = text(
+    """
+    SELECT c.relname, i.inhrelid IS NOT NULL AS attached
+    FROM pg_class c
+    LEFT JOIN pg_inherits i
+        ON i.inhrelid = c.oid AND i.inhparent = to_regclass(:parent)
+    WHERE c.relkind = 'r'
+      AND c.relnamespace = current_schema()::regnamespace
+      AND c.relname ~ '^audit_logs_p[0-9]{4}_[0-9]{2}$'
+    """
+)
+
+
+@dataclass(frozen=True, slots=True, order=True)
+class AuditPartition:
+    """One monthly partition: rows with ``start <= created_at < end``."""
+
+    month: date
+
+    @property
+    def name(self) -> str:
+        return f"{PARENT_TABLE}_p{self.month:%Y_%m}"
+
+    @property
+    def start(self) -> datetime:
+        return datetime(self.month.year, self.month.month, 1, tzinfo=UTC)
+
+    @property
+    def end(self) -> datetime:
+        return AuditPartition(add_months(self.month, 1)).start
+
+    @classmethod
+    def from_name(cls, name: str) -> AuditPartition | None:
+        match = _PARTITION_RE.match(name)
+        if match is None:
+            return None
+        return cls(date(int(match[1]), int(match[2]), 1))
+
+
+def add_months(day: date, months: int) -> date:
+    """First day of the month ``months`` after (or before, if negative) ``day``'s month."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _today() -> date:
+    return datetime.now(UTC).date()
+
+
+async def _list_partitions(conn: AsyncConnection) -> dict[str, bool]:
+    """Existing monthly partition tables -> whether they are still attached."""
+    rows = await conn.execute(_LIST_PARTITIONS, {"parent": PARENT_TABLE})
+    return dict(rows.tuples().all())
+
+
+async def ensure_audit_partitions(
+    conn: AsyncConnection, *, months_ahead: int, today: date | None = None
+) -> list[str]:
+    """
+    Create any missing partition from the current month to ``months_ahead`` months ahead.
+
+    Run inside a transaction. Each CREATE runs in its own savepoint, so one failure cannot
+    block the others. A failure can come from a concurrent worker creating the same table,
+    or from the default partition already holding rows for that month. Returns the names
+    of the partitions created.
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+
+    existing = await _list_partitions(conn)
+    current = today or _today()
+    created: list[str] = []
+    for offset in range(months_ahead + 1):
+        partition = AuditPartition(add_months(current, offset))
+        if partition.name in existing:
+            continue
+        ddl = (
+            f'CREATE TABLE IF NOT EXISTS "{partition.name}" PARTITION OF {PARENT_TABLE} '
+            f"FOR VALUES FROM ('{partition.start.isoformat()}') TO ('{partition.end.isoformat()}')"
+        )
+        try:
+            async with conn.begin_nested():
+                await conn.execute(text(ddl))
+        except DBAPIError as e:
+            logger.warning("audit_partition_create_failed", partition=partition.name, error=str(e))
+            continue
+        created.append(partition.name)
+
+    if created:
+        logger.info("audit_partitions_created", partitions=created)
+    return created
+
+
+def archive_target_error(archive_dir: Path | None) -> str | None:
+    """Why ``archive_dir`` may not receive archives (partitions are dropped after); None if ok."""
+    if archive_dir is None or not str(archive_dir):
+        return "AUDIT_ARCHIVE_DIR is not set"
+    if not archive_dir.is_absolute():
+        return "AUDIT_ARCHIVE_DIR must be an absolute path"
+    if settings.audit_archive_require_mount:
+        # The nearest existing ancestor decides which filesystem the files land on
+        path = archive_dir
+        while not path.exists() and path != path.parent:
+            path = path.parent
+        while not os.path.ismount(path):
+            path = path.parent
+        if path == Path(path.anchor):
+            # A container's root filesystem is discarded with the container
+            return "AUDIT_ARCHIVE_DIR is not on a mounted volume"
+    return None
+
+
+def _sync_and_count(path: Path) -> int:
+    """fsync the archive and its directory, then read it back; returns the number of rows."""
+    with path.open("rb") as fh:
+        os.fsync(fh.fileno())
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    with gzip.open(path, "rb") as fh:
+        return sum(1 for _ in fh)
+
+
+async def _export_partition(engine: AsyncEngine, name: str, path: Path) -> int:
+    """Write every row of ``name`` to a gzip NDJSON file; returns the row count."""
+    tmp = path.with_name(path.name + ".tmp")
+    rows = 0
+    fh = await asyncio.to_thread(gzip.open, tmp, "wb")
+    try:
+        async with engine.connect() as conn:
+            result = await conn.stream(
+                text(f'SELECT * FROM "{name}" ORDER BY id').execution_options(
+                    yield_per=settings.export_batch_size
+                )
+            )
+            async for partition in result.mappings().partitions():
+                chunk = b"".join(orjson.dumps(dict(row)) + b"\n" for row in partition)
+                await asyncio.to_thread(fh.write, chunk)
+                rows += len(partition)
+    finally:
+        await asyncio.to_thread(fh.close)
+    # Only a complete file gets the final name, so the partition is dropped only after it.
+    await asyncio.to_thread(tmp.replace, path)
+    return rows
+
+
+async def archive_audit_partitions(
+    engine: AsyncEngine,
+    *,
+    retention_months: int,
+    archive_dir: Path | None,
+    today: date | None = None,
+) -> list[Path]:
+    """
+    Detach, archive and drop every monthly partition older than ``retention_months``.
+
+    Each step commits on its own. A run that fails part way leaves the partition detached
+    but intact, and the next run picks it up again. Nothing is touched when the archive
+    target is not durable (see ``archive_target_error``), and a partition whose archive does
+    not read back with its row count is kept. Returns the archive files written.
+    """
+    if engine.dialect.name != "postgresql" or retention_months <= 0:
+        return []
+    error = archive_target_error(archive_dir)
+    if archive_dir is None or error is not None:
+        logger.error("audit_archive_target_not_durable", archive_dir=str(archive_dir), error=error)
+        return []
+
+    cutoff = add_months(today or _today(), -retention_months)
+    async with engine.connect() as conn:
+        tables = await _list_partitions(conn)
+    expired = sorted(
+        (partition, attached)
+        for name, attached in tables.items()
+        if (partition := AuditPartition.from_name(name)) is not None and partition.month < cutoff
+    )
+
+    await asyncio.to_thread(archive_dir.mkdir, parents=True, exist_ok=True)
+    archived: list[Path] = []
+    for partition, attached in expired:
+        if attached:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{partition.name}"')
+                )
+        path = archive_dir / f"{partition.name}.ndjson.gz"
+        rows = await _export_partition(engine, partition.name, path)
+        async with engine.begin() as conn:
+            # Detached: no rows can arrive between the export and this check
+            count = await conn.execute(text(f'SELECT count(*) FROM "{partition.name}"'))
+            expected = count.scalar_one()
+            written = await asyncio.to_thread(_sync_and_count, path)
+            if written != rows or written != expected:
+                logger.error(
+                    "audit_partition_archive_mismatch",
+                    partition=partition.name,
+                    expected=expected,
+                    written=written,
+                    path=str(path),
+                )
+                continue
+            await conn.execute(text(f'DROP TABLE "{partition.name}"'))
+        logger.info("audit_partition_archived", partition=partition.name, rows=rows, path=str(path))
+        archived.append(path)
+    return archived
+
+
+async def maintain_audit_partitions(engine: AsyncEngine) -> tuple[list[str], list[Path]]:
+    """Create upcoming partitions and archive expired ones with the configured windows."""
+    async with engine.begin() as conn:
+        created = await ensure_audit_partitions(
+            conn, months_ahead=settings.audit_partition_premake_months
+        )
+    archived = await archive_audit_partitions(
+        engine,
+        retention_months=settings.audit_retention_months,
+        archive_dir=Path(settings.audit_archive_dir) if settings.audit_archive_dir else None,
+    )
+    return created, archived
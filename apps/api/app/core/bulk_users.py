@@ -0,0 +1,271 @@
+"""Set-based bulk user import shared by ``POST /users/bulk`` and the ``users.bulk_import`` task.
+
+Imports too large to run inline are stashed in Redis under a job id (the creator and the
+parsed rows), so the Celery message carries only that reference and status polling can be
+limited to the creator. Without Redis (tests) the stash is per process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import tempfile
+from collections.abc import Iterable, Sequence
+from typing import IO, Any, cast
+from uuid import uuid4
+
+import orjson
+from fastapi import Request
+from pydantic import ValidationError
+from redis.typing import EncodableT, FieldT
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.audit import audit_event
+from app.core.cache import TTLCache, get_redis
+from app.core.exceptions import BulkPayloadTooLargeError, InvalidBulkPayloadError
+from app.core.logging import get_logger
+from app.models.rbac import Role, user_roles
+from app.models.user import User
+from app.schemas.user import BulkImportResponse, BulkRowError, BulkUserRow, UserCreate
+
+logger = get_logger(__name__)
+
+# Request bodies above this size are spooled to a temporary file while they are received.
+_SPOOL_MAX_BYTES = 1024 * 1024
+
+JOB_KEY_PREFIX = "bulk:job:"
+
+# One raw input row (JSON object or CSV record), validated later as ``UserCreate``
+BulkRow = dict[str, object]
+
+_local_jobs: TTLCache[str, dict[str, str]] = TTLCache(
+    maxsize=64, ttl=settings.bulk_import_job_ttl_seconds
+)
+
+
+async def read_bulk_rows(request: Request) -> list[BulkRow]:
+    """
+    Parse the request body into raw rows: a JSON array of objects, or CSV with a header line.
+
+    Both formats are spooled (to disk past 1 MiB) instead of being buffered in memory, and
+    bodies over ``bulk_import_max_bytes`` are rejected while they are received. CSV is parsed
+    from the spool line by line with empty cells treated as missing; JSON is parsed in one
+    piece. Parsing runs in a worker thread so a large upload does not stall the event loop.
+    Raises when the body has more than ``bulk_import_max_rows``.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        parse = _parse_csv
+    elif content_type in ("", "application/json"):
+        parse = _parse_json
+    else:
+        raise InvalidBulkPayloadError(f"Unsupported content type {content_type!r}")
+
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES) as spool:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > settings.bulk_import_max_bytes:
+                raise BulkPayloadTooLargeError(f"{settings.bulk_import_max_bytes} bytes")
+            spool.write(chunk)
+        spool.seek(0)
+        rows = await asyncio.to_thread(parse, spool)
+
+    if len(rows) > settings.bulk_import_max_rows:
+        raise BulkPayloadTooLargeError(f"{settings.bulk_import_max_rows} rows")
+    return rows
+
+
+def _parse_json(spool: IO[bytes]) -> list[BulkRow]:
+    try:
+        data = orjson.loads(spool.read())
+    except orjson.JSONDecodeError as e:
+        raise InvalidBulkPayloadError(f"Invalid JSON: {e}") from e
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise InvalidBulkPayloadError("Expected a JSON array of objects")
+    rows: list[BulkRow] = data
+    return rows
+
+
+def _parse_csv(spool: IO[bytes]) -> list[BulkRow]:
+    # utf-8-sig: spreadsheet exports often start with a BOM
+    text = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+    rows: list[BulkRow] = []
+    try:
+        for record in csv.DictReader(text):
+            if len(rows) >= settings.bulk_import_max_rows:
+                raise BulkPayloadTooLargeError(f"{settings.bulk_import_max_rows} rows")
+            rows.append({k: v for k, v in record.items() if k is not None and v != ""})
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise InvalidBulkPayloadError(f"Invalid CSV: {e}") from e
+    finally:
+        text.detach()
+    return rows
+
+
+async def stash_bulk_job(rows: Sequence[BulkRow], owner_id: int | None) -> str:
+    """Store ``rows`` for a background import; returns the job id to enqueue and poll."""
+    job_id = str(uuid4())
+    owner = str(owner_id or "")
+    payload = await asyncio.to_thread(orjson.dumps, rows)
+    redis = get_redis()
+    if redis is None:
+        _local_jobs.set(job_id, {"owner": owner, "rows": payload.decode("utf-8")})
+        return job_id
+    fields: dict[FieldT, EncodableT] = {"owner": owner, "rows": payload}
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hset(f"{JOB_KEY_PREFIX}{job_id}", mapping=fields)
+        pipe.expire(f"{JOB_KEY_PREFIX}{job_id}", settings.bulk_import_job_ttl_seconds)
+        await pipe.execute()
+    return job_id
+
+
+async def _job_field(job_id: str, field: str) -> str | None:
+    redis = get_redis()
+    if redis is None:
+        return (_local_jobs.get(job_id) or {}).get(field)
+    value = await redis.hget(f"{JOB_KEY_PREFIX}{job_id}", field)
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+async def load_bulk_job_rows(job_id: str) -> list[BulkRow] | None:
+    """Rows stashed for ``job_id``, or None once imported or expired."""
+    raw = await _job_field(job_id, "rows")
+    if raw is None:
+        return None
+    # Written by stash_bulk_job from rows read_bulk_rows already checked
+    return cast(list[BulkRow], await asyncio.to_thread(orjson.loads, raw))
+
+
+async def bulk_job_owner(job_id: str) -> int | None:
+    """User who started ``job_id`` (None for unknown or expired jobs)."""
+    raw = await _job_field(job_id, "owner")
+    return int(raw) if raw else None
+
+
+async def finish_bulk_job(job_id: str) -> None:
+    """Drop the imported rows; the owner is kept for status polling until the job expires."""
+    redis = get_redis()
+    if redis is None:
+        (_local_jobs.get(job_id) or {}).pop("rows", None)
+        return
+    await redis.hdel(f"{JOB_KEY_PREFIX}{job_id}", "rows")
+
+
+def validate_user_rows(
+    rows: Iterable[BulkRow],
+) -> tuple[list[tuple[int, UserCreate]], list[BulkRowError]]:
+    """Validate rows one by one; returns ``(valid (index, user) pairs, per-row errors)``."""
+    valid: list[tuple[int, UserCreate]] = []
+    errors: list[BulkRowError] = []
+    seen: set[str] = set()
+    for index, raw in enumerate(rows):
+        try:
+            user = UserCreate.model_validate(raw)
+        except ValidationError as e:
+            details = e.errors(include_url=False, include_context=False, include_input=False)
+            errors.append(BulkRowError(index=index, errors=[dict(d) for d in details]))
+            continue
+        if user.email in seen:
+            errors.append(
+                BulkRowError(
+                    index=index,
+                    errors=[{"loc": ["email"], "msg": "Duplicate email in payload"}],
+                )
+            )
+            continue
+        seen.add(user.email)
+        valid.append((index, user))
+    return valid, errors
+
+
+def _insert_users(dialect: str) -> Any:
+    # ON CONFLICT is dialect-specific in SQLAlchemy; both supported backends spell it the same.
+    if dialect == "postgresql":
+        return postgresql.insert(User)
+    return sqlite.insert(User)
+
+
+async def import_users(
+    db: AsyncSession,
+    rows: Sequence[BulkRow],
+    *,
+    actor_user_id: int | None,
+    request_id: str | None = None,
+    ip: str | None = None,
+    user_agent: str | None = None,
+) -> BulkImportResponse:
+    """
+    Validate and insert ``rows`` in batches of ``bulk_import_batch_size``.
+
+    Each batch is one ``INSERT ... ON CONFLICT (email) DO NOTHING RETURNING id, email``, one
+    multi-row insert of default role links (admin for ``ADMIN_EMAILS``, otherwise ``user``)
+    and one aggregated ``users.bulk_import`` audit event, committed together. Emails that
+    already exist are reported as skipped, invalid rows as errors. Rows are validated in a
+    worker thread, off the event loop.
+    """
+    valid, errors = await asyncio.to_thread(validate_user_rows, rows)
+    created: list[BulkUserRow] = []
+    skipped: list[BulkUserRow] = []
+    if not valid:
+        return BulkImportResponse(created=created, skipped=skipped, errors=errors)
+
+    dialect = db.get_bind().dialect.name
+    role_ids = dict(
+        (await db.execute(select(Role.name, Role.id).where(Role.name.in_(("admin", "user")))))
+        .tuples()
+        .all()
+    )
+    admin_emails = settings.admin_email_set()
+    batch_size = max(settings.bulk_import_batch_size, 1)
+
+    for start in range(0, len(valid), batch_size):
+        batch = valid[start : start + batch_size]
+        stmt = (
+            _insert_users(dialect)
+            .values([user.model_dump() for _, user in batch])
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User.email, User.id)
+        )
+        inserted = dict((await db.execute(stmt)).tuples().all())
+
+        links: list[dict[str, int]] = []
+        batch_ids: list[int] = []
+        for index, user in batch:
+            user_id = inserted.get(user.email)
+            if user_id is None:
+                skipped.append(BulkUserRow(index=index, email=user.email))
+                continue
+            created.append(BulkUserRow(index=index, email=user.email, id=user_id))
+            batch_ids.append(user_id)
+            role_id = role_ids.get("admin" if user.email.lower() in admin_emails else "user")
+            if role_id is not None:
+                links.append({"user_id": user_id, "role_id": role_id})
+        if links:
+            await db.execute(insert(user_roles).values(links))
+
+        audit_event(
+            db,
+            actor_user_id=actor_user_id,
+            action="users.bulk_import",
+            target_type="user",
+            target_id=None,
+            payload={
+                "created": len(batch_ids),
+                "skipped": len(batch) - len(batch_ids),
+                "user_ids": batch_ids,
+            },
+            request_id=request_id,
+            ip=ip,
+            user_agent=user_agent,
+        )
+        await db.commit()
+
+    logger.info(
+        "users_bulk_imported", created=len(created), skipped=len(skipped), invalid=len(errors)
+    )
+    return BulkImportResponse(created=created, skipped=skipped, errors=errors)
@@ -1,5 +1,11 @@
 """Redis cache configuration."""
 
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
 from redis import asyncio as aioredis
@@ -9,9 +15,60 @@ from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Shared Redis client created by init_cache(); None when Redis is not initialized (e.g. tests).
+_redis: aioredis.Redis | None = None
+
+
+class TTLCache[K: Hashable, V]:
+    """
+    Small in-process LRU cache with a per-entry TTL.
+
+    Intended for hot, per-worker lookups on the event loop (not thread-safe).
+    A ttl of 0 disables the cache: ``get`` always misses and ``set`` is a no-op.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def get_redis() -> aioredis.Redis | None:
+    """Return the shared Redis client (None if the cache has not been initialized)."""
+    return _redis
+
 
 async def init_cache() -> None:
     """Initialize Redis cache."""
+    global _redis
     try:
         redis = aioredis.from_url(  # type: ignore[no-untyped-call]
             settings.redis_url,
@@ -19,6 +76,7 @@ async def init_cache() -> None:
             decode_responses=True,
         )
         FastAPICache.init(RedisBackend(redis), prefix="fastapi-cache")
+        _redis = redis
         logger.info("cache_initialized", redis_url=settings.redis_url)
     except Exception as e:
         logger.error("cache_initialization_failed", error=str(e))
@@ -27,8 +85,12 @@ async def init_cache() -> None:
 
 async def close_cache() -> None:
     """Close Redis cache connection."""
+    global _redis
     try:
         await FastAPICache.clear()
+        if _redis is not None:
+            await _redis.aclose()
+            _redis = None
         logger.info("cache_closed")
     except Exception as e:
         logger.warning("cache_close_failed", error=str(e))
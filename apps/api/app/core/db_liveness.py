@@ -0,0 +1,80 @@
+"""Background liveness checks for idle pooled DB connections (replaces pool_pre_ping)."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import DB_LIVENESS_DEAD_CONNECTIONS
+from app.database import engine, replica_engines
+
+logger = get_logger(__name__)
+
+
+class ConnectionLivenessChecker:
+    """
+    Periodically pings the pool's idle connections so request checkouts need no pre-ping.
+
+    Connections are checked one at a time; QueuePool hands them out FIFO, so ``checkedin()``
+    sequential checkouts visit every idle connection while holding at most one of them.
+    A disconnect invalidates the connection (and, per SQLAlchemy's default, every connection
+    older than it), so the next checkout reconnects instead of failing a request.
+    """
+
+    def __init__(self, target: AsyncEngine, *, interval: float) -> None:
+        self.engine = target
+        self.interval = interval
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running and self.interval > 0:
+            self._task = asyncio.create_task(self._run(), name="db-liveness")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def check_once(self) -> int:
+        """Ping every idle connection once; returns how many were dead."""
+        pool = self.engine.sync_engine.pool
+        idle = pool.checkedin() if hasattr(pool, "checkedin") else 0
+        dead = 0
+        for _ in range(idle):
+            async with self.engine.connect() as conn:
+                try:
+                    await conn.exec_driver_sql("SELECT 1")
+                except DBAPIError as e:
+                    if not e.connection_invalidated:
+                        raise
+                    dead += 1
+        if dead:
+            DB_LIVENESS_DEAD_CONNECTIONS.inc(dead)
+            logger.warning("db_liveness_dead_connections", dead=dead, idle=idle)
+        return dead
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check_once()
+            except Exception as e:
+                logger.warning("db_liveness_check_failed", error=str(e))
+
+
+# One checker per pool: the primary and each read replica.
+liveness_checkers = [
+    ConnectionLivenessChecker(target, interval=settings.db_liveness_interval_seconds)
+    for target in (engine, *replica_engines)
+]
@@ -0,0 +1,154 @@
+"""Read-replica routing with read-your-writes stickiness.
+
+Sessions opened by ``get_read_db`` carry ``info["read_only"]`` and send their statements to a
+replica, unless the primary is required:
+
+- the current request already wrote (any session flushed or executed INSERT/UPDATE/DELETE);
+- the client wrote within ``db_replica_sticky_seconds`` (tracked with a short-lived cookie, so
+  it works across workers and pods without shared state).
+
+Flushes from a read-only session always go to the primary.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import ORMExecuteState, Session
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+STICKY_COOKIE = "db_primary_until"
+
+
+@dataclass(slots=True)
+class ReadYourWrites:
+    """Per-request routing state."""
+
+    sticky: bool = False
+    wrote: bool = False
+
+    @property
+    def primary_required(self) -> bool:
+        return self.sticky or self.wrote
+
+
+_state: ContextVar[ReadYourWrites | None] = ContextVar("read_your_writes", default=None)
+
+
+@contextmanager
+def routing_scope(*, sticky: bool = False) -> Iterator[ReadYourWrites]:
+    """Track writes for one unit of work (an HTTP request, a job) to route its reads."""
+    state = ReadYourWrites(sticky=sticky)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def primary_required() -> bool:
+    """Whether reads in the current context must go to the primary."""
+    state = _state.get()
+    return state is not None and state.primary_required
+
+
+def _mark_write() -> None:
+    state = _state.get()
+    if state is not None:
+        state.wrote = True
+
+
+@event.listens_for(Session, "after_flush")
+def _flushed(session: Session, flush_context: Any) -> None:
+    _mark_write()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _executed(orm_execute_state: ORMExecuteState) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_write()
+
+
+class RoutingSession(Session):
+    """
+    Session routing read-only work to a replica.
+
+    A read-only session sticks to one replica for its lifetime so its reads see one snapshot.
+    Everything else resolves binds as usual (the session's own bind, i.e. the primary).
+    """
+
+    replicas: Sequence[Engine] = ()
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kw: Any) -> Any:
+        if (
+            self.replicas
+            and self.info.get("read_only")
+            and not self._flushing
+            and not primary_required()
+        ):
+            replica = self.info.get("replica")
+            if replica is None:
+                replica = self.info["replica"] = random.choice(self.replicas)
+            return replica
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pure ASGI middleware tracking writes per request for replica routing.
+
+    A request that wrote gets a ``db_primary_until`` cookie, so the client's reads for the next
+    ``db_replica_sticky_seconds`` also hit the primary (covers replication lag).
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with routing_scope(sticky=self._is_sticky(scope)) as state:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start" and state.wrote:
+                    MutableHeaders(scope=message).append("Set-Cookie", self._sticky_cookie())
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _is_sticky(scope: Scope) -> bool:
+        raw = HTTPConnection(scope).cookies.get(STICKY_COOKIE)
+        if not raw:
+            return False
+        try:
+            return float(raw) > time.time()
+        except ValueError:
+            return False
+
+    @staticmethod
+    def _sticky_cookie() -> str:
+        seconds = settings.db_replica_sticky_seconds
+        parts = [
+            f"{STICKY_COOKIE}={time.time() + seconds:.3f}",
+            f"Max-Age={max(int(seconds), 1)}",
+            "Path=/",
+            "HttpOnly",
+            f"SameSite={settings.cookie_samesite}",
+        ]
+        if settings.cookie_secure:
+            parts.append("Secure")
+        return "; ".join(parts)
@@ -109,6 +109,7 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
             "status_code": exc.status_code,
             "code": error_code,
         },
+        headers=exc.headers,
     )
 
 
@@ -1,5 +1,7 @@
 """Custom business exceptions."""
 
+import math
+
 from fastapi import HTTPException, status
 
 
@@ -144,6 +146,20 @@ class PermissionNotFoundError(BaseBusinessException):
         )
 
 
+class PermissionIdNotFoundError(BaseBusinessException):
+    """Raised when a permission is not found by ID."""
+
+    def __init__(self, permission_id: int | None = None) -> None:
+        detail = "Permission not found"
+        if permission_id is not None:
+            detail = f"Permission with ID {permission_id} not found"
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=detail,
+            error_code="PERMISSION_ID_NOT_FOUND",
+        )
+
+
 class InactiveUserError(BaseBusinessException):
     """Raised when trying to authenticate with an inactive user."""
 
@@ -175,3 +191,72 @@ class TokenError(BaseBusinessException):
             detail=message,
             error_code="TOKEN_ERROR",
         )
+
+
+class InvalidCursorError(BaseBusinessException):
+    """Raised when a pagination cursor cannot be decoded."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+            error_code="INVALID_CURSOR",
+        )
+
+
+class InvalidBulkPayloadError(BaseBusinessException):
+    """Raised when a bulk request body cannot be parsed into rows."""
+
+    def __init__(self, message: str) -> None:
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=message,
+            error_code="INVALID_BULK_PAYLOAD",
+        )
+
+
+class BulkPayloadTooLargeError(BaseBusinessException):
+    """Raised when a bulk request has more rows (or bytes) than allowed."""
+
+    def __init__(self, limit: str) -> None:
+        super().__init__(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Bulk payload exceeds {limit}",
+            error_code="BULK_PAYLOAD_TOO_LARGE",
+        )
+
+
+class RateLimitExceededError(BaseBusinessException):
+    """Raised when a client exceeds the rate limit of a route."""
+
+    def __init__(self, limit: str, retry_after: float) -> None:
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit exceeded: {limit}",
+            error_code="RATE_LIMITED",
+        )
+        self.headers = {"Retry-After": str(max(1, math.ceil(retry_after)))}
+
+
+class LoginThrottledError(BaseBusinessException):
+    """Raised when login is temporarily locked after repeated failures."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts, please retry later",
+            error_code="LOGIN_THROTTLED",
+        )
+        self.headers = {"Retry-After": str(max(1, math.ceil(retry_after)))}
+
+
+class ServiceOverloadedError(BaseBusinessException):
+    """Raised when a bounded worker pool rejects work because its queue is full."""
+
+    def __init__(self, message: str = "Service is temporarily overloaded, please retry") -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=message,
+            error_code="SERVICE_OVERLOADED",
+        )
+        self.headers = {"Retry-After": "1"}
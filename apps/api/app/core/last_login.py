@@ -0,0 +1,160 @@
+"""Write-behind buffer for ``auth_identities.last_login_at`` (coalesced bulk UPDATEs)."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from collections.abc import Callable
+from datetime import datetime
+from typing import cast
+
+from sqlalchemy import DateTime, Integer, Table, Update, bindparam, column, or_, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.logging import get_logger
+from app.database import async_session
+from app.models.auth_identity import AuthIdentity
+
+logger = get_logger(__name__)
+
+# Rows per UPDATE statement (keeps bind parameters well below driver limits).
+_CHUNK_SIZE = 1000
+
+
+# One buffered login: (identity id, time)
+LoginRow = tuple[int, datetime]
+
+
+def _bulk_update(
+    dialect: str, rows: list[LoginRow]
+) -> tuple[Update, list[dict[str, object]] | None]:
+    """``(statement, parameters)`` setting ``last_login_at`` for ``(identity id, time)`` rows."""
+    identities = cast(Table, AuthIdentity.__table__)
+    if dialect == "postgresql":
+        seen = values(
+            column("id", Integer), column("last_login_at", DateTime(timezone=True)), name="v"
+        ).data(rows)
+        stmt = (
+            update(identities)
+            .where(identities.c.id == seen.c.id)
+            # A concurrent flush from another worker may already hold a newer time
+            .where(
+                or_(
+                    identities.c.last_login_at.is_(None),
+                    identities.c.last_login_at < seen.c.last_login_at,
+                )
+            )
+            .values(last_login_at=seen.c.last_login_at)
+        )
+        return stmt, None
+
+    # SQLite cannot name the columns of a VALUES subquery: one executemany instead
+    stmt = (
+        update(identities)
+        .where(identities.c.id == bindparam("identity_id"))
+        .where(
+            or_(
+                identities.c.last_login_at.is_(None),
+                identities.c.last_login_at < bindparam("seen_at"),
+            )
+        )
+        .values(last_login_at=bindparam("seen_at"))
+    )
+    return stmt, [{"identity_id": i, "seen_at": seen_at} for i, seen_at in rows]
+
+
+class LastLoginWriter:
+    """
+    Background writer that coalesces last-login timestamps and flushes them in bulk.
+
+    Logins only record ``identity id -> time`` in memory (repeat logins of a hot account
+    overwrite one entry). Every ``flush_interval`` seconds, the maximum staleness of
+    ``last_login_at``, the buffer is written with one ``UPDATE ... FROM (VALUES ...)`` per
+    chunk. ``stop()`` drains the buffer.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        *,
+        flush_interval: float,
+        max_pending: int,
+    ) -> None:
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._buffer: dict[int, datetime] = {}
+        self._task: asyncio.Task[None] | None = None
+        self._stop = asyncio.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def record(self, identity_id: int, seen_at: datetime) -> bool:
+        """Buffer a login; returns False (caller writes directly) when not running or full."""
+        if not self.running:
+            return False
+        current = self._buffer.get(identity_id)
+        if current is None and len(self._buffer) >= self.max_pending:
+            return False
+        if current is None or seen_at > current:
+            self._buffer[identity_id] = seen_at
+        return True
+
+    def start(self) -> None:
+        if not self.running:
+            self._stop = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="last-login-writer")
+
+    async def stop(self) -> None:
+        """Stop the background loop and flush everything still buffered."""
+        if self._task is not None:
+            self._stop.set()
+            await self._task
+            self._task = None
+        if self._buffer and not await self.flush():
+            logger.error("last_login_writer_drain_failed", dropped=len(self._buffer))
+            self._buffer.clear()
+
+    async def flush(self) -> bool:
+        """Write the whole buffer; returns False (entries kept for the retry) on failure."""
+        if not self._buffer:
+            return True
+        batch, self._buffer = self._buffer, {}
+        rows = sorted(batch.items())  # id order: concurrent flushes lock rows in the same order
+        try:
+            async with self.session_factory() as session:
+                dialect = session.get_bind().dialect.name
+                for start in range(0, len(rows), _CHUNK_SIZE):
+                    stmt, params = _bulk_update(dialect, rows[start : start + _CHUNK_SIZE])
+                    await session.execute(stmt, params)
+                await session.commit()
+        except Exception as e:
+            # Keep the newer time where a login arrived during the failed flush
+            for identity_id, seen_at in batch.items():
+                current = self._buffer.get(identity_id)
+                if current is None or seen_at > current:
+                    self._buffer[identity_id] = seen_at
+            logger.error("last_login_writer_flush_failed", rows=len(rows), error=str(e))
+            return False
+        logger.debug("last_login_flushed", rows=len(rows))
+        return True
+
+    async def _run(self) -> None:
+        while not self._stop.is_set():
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._stop.wait(), timeout=self.flush_interval)
+            await self.flush()
+
+
+last_login_writer = LastLoginWriter(
+    async_session,
+    flush_interval=settings.last_login_max_staleness_seconds,
+    max_pending=settings.last_login_max_pending,
+)
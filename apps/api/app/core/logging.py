@@ -12,10 +12,13 @@ def configure_logging() -> None:
     """Configure structured logging for the application."""
     # 根据环境变量设置日志级别
     log_level = getattr(logging, settings.log_level.upper(), logging.INFO)
+    # 延迟导入：query_stats 依赖本模块的 get_logger
+    from app.core.query_stats import add_query_stats
 
     structlog.configure(
         processors=[
             structlog.contextvars.merge_contextvars,
+            add_query_stats,
             structlog.processors.add_log_level,
             structlog.processors.StackInfoRenderer(),
             structlog.dev.set_exc_info,
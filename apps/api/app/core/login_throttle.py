@@ -0,0 +1,192 @@
+"""Login failure throttling with exponential backoff, checked before the DB lookup and bcrypt.
+
+Failures are counted per identifier (normalized email, hashed in keys) and per client IP.
+After ``free`` failures each further failure locks the key for ``base * 2^(n - 1)`` seconds
+(capped at ``login_throttle_max_seconds``); counters expire after a quiet window. A locked
+identifier or IP is rejected with one Redis round trip, so credential stuffing against it
+costs neither a query nor a bcrypt verification. A successful login clears the identifier's
+counter (not the IP's: a valid account must not reset an attacker's address).
+
+Without Redis the counters live in process memory.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import Any
+
+from app.config import settings
+from app.core.cache import TTLCache, get_redis
+from app.core.exceptions import LoginThrottledError
+from app.core.logging import get_logger
+from app.core.metrics import LOGIN_BCRYPT_SECONDS_SAVED, LOGIN_THROTTLED
+from app.core.security import password_pool
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "login:fail:"
+
+# KEYS: failure hashes. Returns {longest remaining lock in ms, 1-based index of that key};
+# {0, 0} when nothing is locked.
+CHECK_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local wait, locked = 0, 0
+for i, key in ipairs(KEYS) do
+  local locked_until = tonumber(redis.call('HGET', key, 'until'))
+  if locked_until ~= nil and locked_until - now > wait then
+    wait, locked = locked_until - now, i
+  end
+end
+return {wait, locked}
+"""
+
+# KEYS: failure hashes; ARGV[1..3]: window, base, max (ms); ARGV[3 + i]: free attempts of
+# KEYS[i]. Returns the longest lock just applied in ms.
+FAILURE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local window = tonumber(ARGV[1])
+local base = tonumber(ARGV[2])
+local cap = tonumber(ARGV[3])
+local longest = 0
+for i, key in ipairs(KEYS) do
+  local count = redis.call('HINCRBY', key, 'count', 1)
+  local free = tonumber(ARGV[3 + i])
+  local wait = 0
+  if count > free then
+    wait = math.min(base * 2 ^ (count - free - 1), cap)
+    redis.call('HSET', key, 'until', string.format('%d', now + wait))
+  end
+  redis.call('PEXPIRE', key, math.ceil(math.max(window, wait)))
+  if wait > longest then
+    longest = wait
+  end
+end
+return math.ceil(longest)
+"""
+
+
+def _keys(email: str, ip: str | None) -> list[tuple[str, str, int]]:
+    """``(scope, key, free attempts)`` per throttled subject."""
+    digest = hashlib.sha256(email.strip().lower().encode("utf-8")).hexdigest()[:32]
+    keys = [("identifier", f"{KEY_PREFIX}id:{digest}", settings.login_throttle_free_attempts)]
+    if ip:
+        keys.append(("ip", f"{KEY_PREFIX}ip:{ip}", settings.login_throttle_ip_free_attempts))
+    return keys
+
+
+def backoff_seconds(count: int, free: int) -> float:
+    """Lock applied by the ``count``-th consecutive failure (0 while within ``free``)."""
+    if count <= free:
+        return 0.0
+    return float(
+        min(
+            settings.login_throttle_base_seconds * 2 ** (count - free - 1),
+            settings.login_throttle_max_seconds,
+        )
+    )
+
+
+class LoginThrottle:
+    """Per-identifier and per-IP failure counters (Redis, or process memory as a fallback)."""
+
+    def __init__(self) -> None:
+        # key -> (failures, locked until (monotonic))
+        self._local: TTLCache[str, tuple[int, float]] = TTLCache(
+            maxsize=10_000,
+            ttl=max(settings.login_throttle_window_seconds, settings.login_throttle_max_seconds),
+        )
+        self._scripts: dict[str, Any] = {}
+        self._script_client: Any = None
+
+    def _script(self, redis: Any, name: str, source: str) -> Any:
+        if self._script_client is not redis:
+            self._scripts.clear()
+            self._script_client = redis
+        if name not in self._scripts:
+            self._scripts[name] = redis.register_script(source)
+        return self._scripts[name]
+
+    async def check(self, email: str, ip: str | None) -> None:
+        """Raise ``LoginThrottledError`` while the identifier or the IP is locked."""
+        if not settings.login_throttle_enabled:
+            return
+        keys = _keys(email, ip)
+        wait, scope = await self._locked_for(keys)
+        if wait <= 0:
+            return
+
+        LOGIN_THROTTLED.labels(scope=scope).inc()
+        LOGIN_BCRYPT_SECONDS_SAVED.inc(password_pool.mean_duration("verify"))
+        logger.info("login_throttled", scope=scope, retry_after=round(wait, 3))
+        raise LoginThrottledError(wait)
+
+    async def _locked_for(self, keys: list[tuple[str, str, int]]) -> tuple[float, str]:
+        redis = get_redis()
+        if redis is not None:
+            try:
+                script = self._script(redis, "check", CHECK_SCRIPT)
+                wait_ms, locked = await script(keys=[key for _, key, _ in keys])
+                if int(locked) == 0:
+                    return 0.0, ""
+                return int(wait_ms) / 1000, keys[int(locked) - 1][0]
+            except Exception as e:
+                logger.warning("login_throttle_check_failed", error=str(e))
+
+        now = time.monotonic()
+        longest, locked_scope = 0.0, ""
+        for scope, key, _ in keys:
+            entry = self._local.get(key)
+            if entry is not None and entry[1] - now > longest:
+                longest, locked_scope = entry[1] - now, scope
+        return longest, locked_scope
+
+    async def record_failure(self, email: str, ip: str | None) -> None:
+        """Count a failed attempt and lock the subjects that ran out of free attempts."""
+        if not settings.login_throttle_enabled:
+            return
+        keys = _keys(email, ip)
+        redis = get_redis()
+        if redis is not None:
+            try:
+                script = self._script(redis, "failure", FAILURE_SCRIPT)
+                await script(
+                    keys=[key for _, key, _ in keys],
+                    args=[
+                        settings.login_throttle_window_seconds * 1000,
+                        settings.login_throttle_base_seconds * 1000,
+                        settings.login_throttle_max_seconds * 1000,
+                        *(free for _, _, free in keys),
+                    ],
+                )
+                return
+            except Exception as e:
+                logger.warning("login_throttle_record_failed", error=str(e))
+
+        now = time.monotonic()
+        for _, key, free in keys:
+            count = (self._local.get(key) or (0, 0.0))[0] + 1
+            self._local.set(key, (count, now + backoff_seconds(count, free)))
+
+    async def reset(self, email: str) -> None:
+        """Forget the identifier's failures after a successful login."""
+        if not settings.login_throttle_enabled:
+            return
+        _, key, _ = _keys(email, None)[0]
+        self._local.pop(key)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.delete(key)
+        except Exception as e:
+            logger.warning("login_throttle_reset_failed", error=str(e))
+
+    def clear(self) -> None:
+        """Forget local counters (tests)."""
+        self._local.clear()
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,223 @@
+"""Prometheus metrics (HTTP, DB pool, queries, password hashing, caches).
+
+When ``PROMETHEUS_MULTIPROC_DIR`` is set (several uvicorn workers), prometheus_client writes
+samples to per-process files in that directory and ``/metrics`` aggregates them with
+``MultiProcessCollector``. The directory must be empty at startup.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.query_stats import current_query_stats
+
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+# HTTP
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by method, route template and status code.",
+    ["method", "route", "status"],
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method and route template.",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served (route is unknown until routing completes).",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+# Database
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out of the SQLAlchemy pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Configured SQLAlchemy pool size.", multiprocess_mode="livesum"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond pool_size (negative while the pool is still filling).",
+    multiprocess_mode="livesum",
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed per HTTP request.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_DISCONNECT_RETRIES = Counter(
+    "db_disconnect_retries_total",
+    "Statements retried once on a fresh connection after a disconnect.",
+)
+DB_LIVENESS_DEAD_CONNECTIONS = Counter(
+    "db_liveness_dead_connections_total",
+    "Idle pooled connections found dead (and discarded) by the liveness checker.",
+)
+
+# Password hashing (bcrypt pool)
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_wait_seconds",
+    "Time a bcrypt job waited for a pool worker.",
+    ["op"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt hash/verify time on a pool worker.",
+    ["op"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "bcrypt jobs rejected because the pool queue was full.",
+    ["op"],
+)
+PASSWORD_REHASH = Counter(
+    "password_rehash_total",
+    "Rehashes of outdated-cost bcrypt hashes after login, by result (updated/stale/failed).",
+    ["result"],
+)
+
+LOGIN_THROTTLED = Counter(
+    "login_throttled_total",
+    "Logins rejected by the failure throttle before the DB lookup and bcrypt, by locked key.",
+    ["scope"],
+)
+LOGIN_BCRYPT_SECONDS_SAVED = Counter(
+    "login_bcrypt_seconds_saved_total",
+    "Estimated bcrypt CPU seconds not spent on throttled logins (mean verify time each).",
+)
+
+# Caches
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss).",
+    ["cache", "result"],
+)
+
+
+# Rate limiting
+RATE_LIMIT_CHECKS = Counter(
+    "rate_limit_checks_total",
+    "Rate limit decisions by route, result (allowed/limited) and source "
+    "(redis, lease = pre-allocated local tokens, local = Redis unavailable).",
+    ["route", "result", "source"],
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def _route_label(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class PrometheusMiddleware:
+    """Pure ASGI middleware recording per-route latency, in-flight requests and status codes."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = HTTP_IN_PROGRESS.labels(method=method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            route = _route_label(scope)
+            HTTP_LATENCY.labels(method=method, route=route).observe(elapsed)
+            HTTP_REQUESTS.labels(method=method, route=route, status=str(status)).inc()
+            stats = current_query_stats()
+            if stats is not None:
+                DB_QUERIES_PER_REQUEST.labels(route=route).observe(stats.statements)
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout wait time."""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Attach pool gauges to an engine."""
+    pool = engine.sync_engine.pool
+    # Only queue pools keep counters (NullPool/StaticPool, e.g. in tests, do not)
+    if not isinstance(pool, QueuePool):
+        return
+    DB_POOL_SIZE.set(pool.size())
+
+    def _update_pool_gauges(*_: object) -> None:
+        DB_POOL_CHECKED_OUT.set(pool.checkedout())
+        DB_POOL_OVERFLOW.set(pool.overflow())
+
+    event.listen(pool, "checkout", _update_pool_gauges)
+    event.listen(pool, "checkin", _update_pool_gauges)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Expose metrics in the Prometheus text format."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+        data = generate_latest(registry)
+    else:
+        data = generate_latest()
+    return Response(content=data, media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead() -> None:
+    """Release this worker's live gauges (multiprocess mode) on shutdown."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())  # type: ignore[no-untyped-call]
@@ -0,0 +1,117 @@
+"""Keyset (cursor) pagination helpers: opaque cursors and cheap totals."""
+
+from __future__ import annotations
+
+import base64
+import json
+from collections.abc import Callable
+from typing import Any, Literal
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.config import settings
+from app.core.cache import TTLCache
+from app.core.exceptions import InvalidCursorError
+from app.core.metrics import record_cache
+
+TotalMode = Literal["none", "estimate", "exact"]
+
+_count_cache: TTLCache[tuple[object, ...], int] = TTLCache(
+    maxsize=1024, ttl=settings.pagination_count_cache_ttl_seconds
+)
+
+
+def encode_cursor(values: dict[str, Any]) -> str:
+    """Encode keyset values into an opaque, URL-safe cursor."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, **fields: Callable[[Any], Any]) -> dict[str, Any]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Each keyword maps a required key to a converter (e.g. ``id=int``); any malformed,
+    missing or unconvertible value raises InvalidCursorError.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return {key: convert(values[key]) for key, convert in fields.items()}
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        raise InvalidCursorError() from None
+
+
+# A partitioned parent is never analyzed by autovacuum (its reltuples stays -1), so sum the
+# leaf partitions instead; unanalyzed (-1) leaves are skipped, NULL if none was analyzed.
+_ESTIMATE_ROWS = text(
+    """
+    SELECT CASE WHEN c.relkind = 'p' THEN (
+        SELECT sum(leaf.reltuples) FILTER (WHERE leaf.reltuples >= 0)
+        FROM pg_partition_tree(c.oid) tree
+        JOIN pg_class leaf ON leaf.oid = tree.relid
+        WHERE tree.isleaf
+    ) ELSE c.reltuples END::bigint
+    FROM pg_class c
+    WHERE c.oid = to_regclass(:name)
+    """
+)
+
+
+async def _estimate_table_rows(db: AsyncSession, table_name: str) -> int | None:
+    """Planner row estimate for a whole table (Postgres only, None if never analyzed)."""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    estimate = (await db.execute(_ESTIMATE_ROWS, {"name": table_name})).scalar_one_or_none()
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+async def count_total(
+    db: AsyncSession,
+    model: Any,
+    filters: list[ColumnElement[bool]],
+    mode: TotalMode,
+) -> tuple[int | None, bool]:
+    """
+    Compute the total for a paginated listing.
+
+    Returns ``(total, is_estimate)``:
+    - ``none``: skip counting entirely.
+    - ``estimate``: ``pg_class.reltuples`` (summed over the partitions of a partitioned table)
+      when unfiltered on Postgres, otherwise an exact count cached for
+      ``pagination_count_cache_ttl_seconds``.
+    - ``exact``: ``SELECT count(*)`` with the same filters.
+    """
+    if mode == "none":
+        return None, False
+
+    stmt = select(func.count()).select_from(model)
+    if filters:
+        stmt = stmt.where(*filters)
+
+    if mode == "exact":
+        return (await db.execute(stmt)).scalar_one(), False
+
+    if not filters:
+        estimated = await _estimate_table_rows(db, model.__tablename__)
+        if estimated is not None:
+            return estimated, True
+
+    compiled = stmt.compile()
+    key = (str(compiled), tuple(sorted(compiled.params.items())))
+    cached = _count_cache.get(key)
+    record_cache("pagination_count", hit=cached is not None)
+    if cached is not None:
+        return cached, True
+    total = (await db.execute(stmt)).scalar_one()
+    _count_cache.set(key, total)
+    return total, False
+
+
+def clear_count_cache() -> None:
+    """Drop cached counts (tests)."""
+    _count_cache.clear()
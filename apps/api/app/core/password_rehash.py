@@ -0,0 +1,52 @@
+"""Rehash of outdated-cost bcrypt hashes after login, in-process (the plaintext never leaves it)."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logging import get_logger
+from app.core.metrics import PASSWORD_REHASH
+from app.core.security import hash_password, password_pool
+from app.database import async_session
+from app.models.auth_identity import AuthIdentity
+
+logger = get_logger(__name__)
+
+# Session factory for the rehash UPDATE; tests point it at the test database.
+session_factory: Callable[[], AsyncSession] = async_session
+
+
+async def rehash_password(identity_id: int, expected_hash: str, password: str) -> bool:
+    """
+    Replace ``expected_hash`` with a hash at the current cost; returns True if updated.
+
+    Runs as a BackgroundTask after the login response: hashing on ``password_pool``, then a
+    compare-and-set UPDATE, so a password changed since the login is left alone. Never raises;
+    a failure (e.g. the pool is full) only means the next login tries again.
+    """
+    try:
+        new_hash = await password_pool.run("rehash", hash_password, password)
+        async with session_factory() as db:
+            updated_id = (
+                await db.execute(
+                    update(AuthIdentity)
+                    .where(
+                        AuthIdentity.id == identity_id,
+                        AuthIdentity.hashed_password == expected_hash,
+                    )
+                    .values(hashed_password=new_hash)
+                    .returning(AuthIdentity.id)
+                )
+            ).scalar_one_or_none()
+            await db.commit()
+    except Exception as e:
+        PASSWORD_REHASH.labels(result="failed").inc()
+        logger.warning("password_rehash_failed", identity_id=identity_id, error=str(e))
+        return False
+
+    updated = updated_id is not None
+    PASSWORD_REHASH.labels(result="updated" if updated else "stale").inc()
+    return updated
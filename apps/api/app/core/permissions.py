@@ -0,0 +1,51 @@
+"""Compiled permission registry (permission codes -> bits, principals -> bitmasks)."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+from app.schemas.user import CurrentUserResponse
+
+
+class PermissionRegistry:
+    """
+    Per-process registry that compiles permission codes into integer bitmasks.
+
+    Each permission code gets a bit index the first time it is seen; indices are never
+    reassigned, so masks built at decoration time stay valid for the process lifetime.
+    Masks are process-local and must not be persisted or shared between workers. A user's
+    mask is compiled from the permission codes of their own principal snapshot, so it is
+    exactly as fresh as that snapshot (see app.core.principal_cache).
+    """
+
+    def __init__(self) -> None:
+        self._bits: dict[str, int] = {}
+        self._codes: list[str] = []
+
+    def bit(self, code: str) -> int:
+        """Return the bit value for a permission code, assigning a new index if needed."""
+        index = self._bits.get(code)
+        if index is None:
+            index = len(self._codes)
+            self._bits[code] = index
+            self._codes.append(code)
+        return 1 << index
+
+    def mask(self, codes: Iterable[str]) -> int:
+        """Compile permission codes into a bitmask."""
+        result = 0
+        for code in codes:
+            result |= self.bit(code)
+        return result
+
+    def codes(self, mask: int) -> list[str]:
+        """Decode a bitmask back into permission codes (registration order)."""
+        return [code for index, code in enumerate(self._codes) if mask >> index & 1]
+
+    def compile(self, principal: CurrentUserResponse) -> CurrentUserResponse:
+        """Store the mask of the principal's permission codes on it; returns the principal."""
+        principal.permission_mask = self.mask(principal.permissions)
+        return principal
+
+
+permission_registry = PermissionRegistry()
@@ -0,0 +1,342 @@
+"""Authenticated principal cache used by ``get_current_user``.
+
+Two tiers, both keyed by ``user_id`` and validated against the token's ``ver`` claim:
+
+- L1: per-worker in-process LRU with a short TTL (``principal_cache_local_ttl_seconds``).
+- L2: shared Redis (the client created by ``init_cache``) with a longer TTL.
+
+Mutations that change a user's snapshot, active flag, effective permissions or token version
+must call ``invalidate_principal`` / ``invalidate_principals`` / ``invalidate_all_principals``
+after committing. Invalidation replaces the user's *generation* (a random token in Redis; one
+global token for ``invalidate_all_principals``), deletes the L2 entry and publishes the user
+ids on ``INVALIDATION_CHANNEL``.
+
+A request that misses reads the generations before loading from the DB
+(``principal_generation``) and ``cache_principal`` stores the snapshot only if they are
+unchanged (compare-and-set in Lua), so a snapshot loaded before an invalidation can never be
+written after it. Every worker subscribes to the channel (``invalidation_listener``) and drops
+the named L1 entries, so a logout or role change reaches other workers within the pub/sub
+delay. L1 is bypassed while that subscription is down. Without Redis (tests) L1 is the only
+tier and invalidation is process-local.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import secrets
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import cast
+
+from pydantic import BaseModel, ValidationError
+from redis import asyncio as aioredis
+from redis.commands.core import AsyncScript
+
+from app.config import settings
+from app.core.cache import TTLCache, get_redis
+from app.core.logging import get_logger
+from app.core.metrics import record_cache
+from app.core.permissions import permission_registry
+from app.schemas.user import CurrentUserResponse
+
+logger = get_logger(__name__)
+
+REDIS_KEY_PREFIX = "principal:"
+# Outside REDIS_KEY_PREFIX, so invalidate_all_principals does not scan them away
+GENERATION_KEY_PREFIX = "principal-generation:"
+ALL_GENERATION_KEY = "principal-generation:all"
+INVALIDATION_CHANNEL = "principal:invalidate"
+
+# KEYS: entry, user generation, global generation.
+# ARGV: expected user generation, expected global generation, entry JSON, TTL (seconds).
+# A missing generation reads as "0". Returns 1 when the entry was written.
+CAS_SET_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+  return 0
+end
+if (redis.call('GET', KEYS[3]) or '0') ~= ARGV[2] then
+  return 0
+end
+redis.call('SET', KEYS[1], ARGV[3], 'EX', tonumber(ARGV[4]))
+return 1
+"""
+
+
+class CachedPrincipal(BaseModel):
+    """Cached snapshot of an authenticated user (RBAC flattened)."""
+
+    token_version: int
+    user: CurrentUserResponse
+
+
+@dataclass(frozen=True, slots=True)
+class PrincipalGeneration:
+    """Generations observed before a principal was loaded from the DB."""
+
+    # Invalidations this worker had seen (guards the L1 write)
+    local: int
+    # Redis generations; None when they could not be read (the snapshot is not stored)
+    user: str | None = None
+    everyone: str | None = None
+
+
+_local: TTLCache[int, CachedPrincipal] = TTLCache(
+    maxsize=settings.principal_cache_max_entries,
+    ttl=settings.principal_cache_local_ttl_seconds,
+)
+
+_cas_script: AsyncScript | None = None
+_cas_client: aioredis.Redis | None = None
+
+
+def _redis_key(user_id: int) -> str:
+    return f"{REDIS_KEY_PREFIX}{user_id}"
+
+
+def _generation_key(user_id: int) -> str:
+    return f"{GENERATION_KEY_PREFIX}{user_id}"
+
+
+class PrincipalInvalidationListener:
+    """
+    Per-worker subscriber to ``INVALIDATION_CHANNEL`` that evicts L1 entries.
+
+    L1 is used only while the subscription is live (or there is no Redis at all). When the
+    connection drops, L1 is cleared and bypassed until the listener has resubscribed, since
+    invalidations published in between are lost.
+    """
+
+    def __init__(self, *, retry_interval: float) -> None:
+        self.retry_interval = retry_interval
+        # Invalidations applied in this worker; an L1 write is dropped if it moved meanwhile
+        self.invalidations = 0
+        self._subscribed = False
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def active(self) -> bool:
+        """Whether L1 may be used."""
+        return self._subscribed or get_redis() is None
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name="principal-invalidation")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self._set_subscribed(False)
+
+    def evict(self, user_ids: Sequence[int] | None) -> None:
+        """Drop L1 entries of ``user_ids`` (all of them for None)."""
+        self.invalidations += 1
+        if user_ids is None:
+            _local.clear()
+            return
+        for user_id in user_ids:
+            _local.pop(user_id)
+
+    def handle_message(self, data: str) -> None:
+        """Apply one published invalidation: ``*`` or comma-separated user ids."""
+        self.evict(None if data == "*" else [int(part) for part in data.split(",")])
+
+    def _set_subscribed(self, subscribed: bool) -> None:
+        self._subscribed = subscribed
+        self.evict(None)
+
+    async def _run(self) -> None:
+        while True:
+            redis = get_redis()
+            if redis is not None:
+                try:
+                    await self._listen(redis)
+                except Exception as e:
+                    logger.warning("principal_invalidation_listener_failed", error=str(e))
+                self._set_subscribed(False)
+            await asyncio.sleep(self.retry_interval)
+
+    async def _listen(self, redis: aioredis.Redis) -> None:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            while True:
+                # The client decodes responses: channel payloads arrive as str
+                message = cast(dict[str, str] | None, await pubsub.get_message(timeout=None))
+                if message is None:
+                    continue
+                if message["type"] == "subscribe":
+                    self._set_subscribed(True)
+                elif message["type"] == "message":
+                    self.handle_message(message["data"])
+        finally:
+            await pubsub.aclose()  # type: ignore[no-untyped-call]
+
+
+invalidation_listener = PrincipalInvalidationListener(retry_interval=1.0)
+
+
+async def get_cached_principal(user_id: int, token_version: int) -> CurrentUserResponse | None:
+    """Return the cached principal for ``(user_id, token_version)``, or None on miss."""
+    if settings.principal_cache_ttl_seconds <= 0:
+        return None
+
+    use_local = invalidation_listener.active
+    if use_local:
+        cached = _local.get(user_id)
+        if cached is not None:
+            if cached.token_version == token_version:
+                record_cache("principal_local", hit=True)
+                return cached.user
+            # Stale version: token was issued before/after a revocation; fall through to DB.
+            _local.pop(user_id)
+            record_cache("principal_local", hit=False)
+            return None
+        record_cache("principal_local", hit=False)
+
+    redis = get_redis()
+    if redis is None:
+        return None
+    seen = invalidation_listener.invalidations
+    try:
+        raw = await redis.get(_redis_key(user_id))
+    except Exception as e:
+        logger.warning("principal_cache_get_failed", user_id=user_id, error=str(e))
+        return None
+
+    cached = None
+    if raw is not None:
+        try:
+            cached = CachedPrincipal.model_validate_json(raw)
+        except ValidationError:
+            cached = None
+    if cached is None or cached.token_version != token_version:
+        record_cache("principal_redis", hit=False)
+        return None
+    record_cache("principal_redis", hit=True)
+
+    # The mask is process-local and not part of the JSON: compile it for this worker
+    permission_registry.compile(cached.user)
+    if use_local and invalidation_listener.invalidations == seen:
+        _local.set(user_id, cached)
+    return cached.user
+
+
+async def principal_generation(user_id: int) -> PrincipalGeneration:
+    """Generations to pass to ``cache_principal``; read them before loading from the DB."""
+    local = invalidation_listener.invalidations
+    redis = get_redis()
+    if redis is None or settings.principal_cache_ttl_seconds <= 0:
+        return PrincipalGeneration(local)
+    try:
+        user, everyone = cast(
+            list[str | None], await redis.mget(_generation_key(user_id), ALL_GENERATION_KEY)
+        )
+    except Exception as e:
+        logger.warning("principal_generation_get_failed", user_id=user_id, error=str(e))
+        return PrincipalGeneration(local)
+    return PrincipalGeneration(local, user or "0", everyone or "0")
+
+
+async def cache_principal(
+    user_id: int,
+    token_version: int,
+    user: CurrentUserResponse,
+    generation: PrincipalGeneration,
+) -> None:
+    """Store a freshly loaded principal unless it was invalidated since ``generation``."""
+    global _cas_script, _cas_client
+    if settings.principal_cache_ttl_seconds <= 0:
+        return
+
+    cached = CachedPrincipal(token_version=token_version, user=user)
+    redis = get_redis()
+    if redis is not None:
+        if generation.user is None or generation.everyone is None:
+            return
+        try:
+            if _cas_script is None or _cas_client is not redis:
+                _cas_script = redis.register_script(CAS_SET_SCRIPT)
+                _cas_client = redis
+            # CAS_SET_SCRIPT returns 1 when written, 0 when a generation moved
+            stored = cast(
+                int,
+                await _cas_script(
+                    keys=[_redis_key(user_id), _generation_key(user_id), ALL_GENERATION_KEY],
+                    args=[
+                        generation.user,
+                        generation.everyone,
+                        cached.model_dump_json(),
+                        settings.principal_cache_ttl_seconds,
+                    ],
+                ),
+            )
+        except Exception as e:
+            logger.warning("principal_cache_set_failed", user_id=user_id, error=str(e))
+            return
+        if not stored:
+            logger.debug("principal_cache_set_skipped", user_id=user_id)
+            return
+
+    if invalidation_listener.active and invalidation_listener.invalidations == generation.local:
+        _local.set(user_id, cached)
+
+
+async def invalidate_principal(user_id: int) -> None:
+    """Drop a single user's cached principal (call after committing the change)."""
+    await invalidate_principals([user_id])
+
+
+async def invalidate_principals(user_ids: Sequence[int]) -> None:
+    """Drop several users' cached principals with one Redis round trip (bulk updates)."""
+    if not user_ids:
+        return
+    invalidation_listener.evict(user_ids)
+
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        async with redis.pipeline(transaction=True) as pipe:
+            for user_id in user_ids:
+                pipe.set(
+                    _generation_key(user_id),
+                    secrets.token_hex(8),
+                    ex=max(settings.principal_cache_ttl_seconds, 1),
+                )
+            pipe.delete(*(_redis_key(user_id) for user_id in user_ids))
+            pipe.publish(INVALIDATION_CHANNEL, ",".join(str(user_id) for user_id in user_ids))
+            await pipe.execute()
+    except Exception as e:
+        logger.warning("principal_cache_invalidate_failed", count=len(user_ids), error=str(e))
+
+
+async def invalidate_all_principals() -> None:
+    """Drop every cached principal (e.g. after a role's permissions change)."""
+    invalidation_listener.evict(None)
+
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.set(ALL_GENERATION_KEY, secrets.token_hex(8))
+            pipe.publish(INVALIDATION_CHANNEL, "*")
+            await pipe.execute()
+        keys = [key async for key in redis.scan_iter(match=f"{REDIS_KEY_PREFIX}*", count=500)]
+        if keys:
+            await redis.unlink(*keys)
+    except Exception as e:
+        logger.warning("principal_cache_invalidate_all_failed", error=str(e))
+
+
+def clear_local_principal_cache() -> None:
+    """Clear this worker's L1 cache (tests / shutdown)."""
+    _local.clear()
@@ -0,0 +1,151 @@
+"""Per-request SQL statistics: statement count, DB time and rows, plus N+1 detection.
+
+Engine events update every active ``QueryStats`` in the current context, so trackers nest
+(the request middleware and a test's ``query_budget`` both see the same statements).
+"""
+
+from __future__ import annotations
+
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from structlog.typing import EventDict, WrappedLogger
+
+from app.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_active: ContextVar[tuple[QueryStats, ...]] = ContextVar("query_stats", default=())
+
+# Key in Connection.info holding start times of in-flight cursor executions.
+_START_KEY = "query_stats_start"
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """Counters for the statements executed while a tracker is active."""
+
+    statements: int = 0
+    db_time: float = 0.0
+    # ORM instances loaded plus rows affected by INSERT/UPDATE/DELETE.
+    rows: int = 0
+    # SQL text -> executions; only filled when tracking with ``record=True``.
+    seen: Counter[str] | None = field(default=None)
+
+    @property
+    def db_time_ms(self) -> float:
+        return round(self.db_time * 1000, 2)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements executed at least ``threshold`` times (likely N+1 lazy loads)."""
+        if not self.seen or threshold <= 0:
+            return []
+        return [(sql, n) for sql, n in self.seen.most_common() if n >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.db_time_ms};desc="{self.statements} queries, {self.rows} rows"'
+
+
+def current_query_stats() -> QueryStats | None:
+    """Innermost active tracker, or None outside a tracked request."""
+    active = _active.get()
+    return active[-1] if active else None
+
+
+@contextmanager
+def track_queries(*, record: bool = False) -> Iterator[QueryStats]:
+    """Collect statistics for statements executed inside the block."""
+    stats = QueryStats(seen=Counter() if record else None)
+    token = _active.set((*_active.get(), stats))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+
+def instrument_queries(engine: AsyncEngine) -> None:
+    """Attach the statement/time/row listeners to an engine."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn: Any, cursor: Any, statement: str, *_: object) -> None:
+        if _active.get():
+            conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn: Any, cursor: Any, statement: str, *_: object) -> None:
+        active = _active.get()
+        if not active:
+            return
+        starts = conn.info.get(_START_KEY)
+        elapsed = time.perf_counter() - starts.pop() if starts else 0.0
+        # rowcount is -1 for SELECT on most drivers; loaded rows are counted by the ORM hook
+        affected = max(getattr(cursor, "rowcount", -1), 0)
+        for stats in active:
+            stats.statements += 1
+            stats.db_time += elapsed
+            stats.rows += affected
+            if stats.seen is not None:
+                stats.seen[statement] += 1
+
+
+@event.listens_for(Session, "loaded_as_persistent")
+def _count_loaded(session: Session, instance: object) -> None:
+    for stats in _active.get():
+        stats.rows += 1
+
+
+def add_query_stats(_: WrappedLogger, __: str, event_dict: EventDict) -> EventDict:
+    """structlog processor: add the current request's DB counters to every log line."""
+    stats = current_query_stats()
+    if stats is not None and stats.statements:
+        event_dict.setdefault("db_statements", stats.statements)
+        event_dict.setdefault("db_time_ms", stats.db_time_ms)
+        event_dict.setdefault("db_rows", stats.rows)
+    return event_dict
+
+
+class QueryStatsMiddleware:
+    """
+    Pure ASGI middleware tracking DB statements per HTTP request.
+
+    Adds a ``Server-Timing: db;dur=...`` header (statements run before the response starts)
+    and logs ``n_plus_one_suspected`` when one statement repeats ``query_n_plus_one_threshold``
+    times within a request.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        threshold = settings.query_n_plus_one_threshold
+        with track_queries(record=threshold > 0) as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start" and stats.statements:
+                    MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+            for sql, count in stats.repeated(threshold):
+                logger.warning(
+                    "n_plus_one_suspected",
+                    path=scope["path"],
+                    statement=sql,
+                    executions=count,
+                )
@@ -0,0 +1,210 @@
+"""Distributed rate limiting: GCRA buckets in Redis, decided by one atomic Lua call per check.
+
+GCRA (generic cell rate algorithm) keeps a single value per bucket, the *theoretical arrival
+time* (TAT). With a limit of ``count`` per ``period`` every request advances the TAT by
+``period / count``, and requests are allowed while the TAT stays within ``period`` of now.
+That behaves like a sliding window without storing per-request entries: one GET and one SET
+inside a Lua script (atomic, using the Redis clock so pods need not agree on time).
+
+Buckets are per route template and per client: ``user:<id>`` for a valid access token cookie,
+otherwise ``ip:<address>``. Without Redis (tests, outage) the same algorithm runs per process.
+
+Token pre-allocation (``rate_limit_local_batch`` > 1) lets a check reserve several tokens in
+the same round trip and spend the rest in-process for ``rate_limit_lease_seconds``. Tokens
+left when the lease ends are dropped, so batching can only make a limit stricter.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from fastapi import Request
+from jose import JWTError
+from redis import asyncio as aioredis
+
+from app.config import settings
+from app.core.cache import TTLCache, get_redis
+from app.core.exceptions import RateLimitExceededError
+from app.core.logging import get_logger
+from app.core.metrics import RATE_LIMIT_CHECKS
+from app.core.security import verify_token
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "ratelimit:"
+
+_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Guards floor() against float error, e.g. 60 / (60 / 7) == 6.999...
+_EPSILON = 1e-9
+
+# KEYS[1] bucket; ARGV: emission interval (ms), period (ms), tokens wanted.
+# Returns {granted, remaining, retry_after_ms}; granted is 0 when the request is limited.
+GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local want = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if tat == nil or tat < now then
+  tat = now
+end
+local available = math.floor((period - (tat - now)) / interval + 1e-9)
+local granted = math.min(want, available)
+if granted < 1 then
+  return {0, 0, math.ceil(tat + interval - period - now)}
+end
+local new_tat = tat + granted * interval
+redis.call('SET', KEYS[1], string.format('%.3f', new_tat), 'PX', math.ceil(new_tat - now))
+return {granted, available - granted, 0}
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    """``count`` requests per ``period`` seconds."""
+
+    count: int
+    period: float
+    text: str
+
+    @property
+    def interval(self) -> float:
+        return self.period / self.count
+
+
+@dataclass(frozen=True, slots=True)
+class Decision:
+    """Outcome of a check: ``granted`` tokens (0 = limited) and seconds until the next one."""
+
+    granted: int
+    remaining: int
+    retry_after: float
+
+
+@lru_cache(maxsize=64)
+def parse_rate_limit(text: str) -> RateLimit | None:
+    """Parse ``"10/minute"`` (unit may be plural); ``"unlimited"`` returns None."""
+    value = text.strip().lower()
+    if value == "unlimited":
+        return None
+    count, _, unit = value.partition("/")
+    period = _UNITS.get(unit.strip().removesuffix("s"))
+    if period is None or not count.strip().isdigit() or int(count) <= 0:
+        raise ValueError(f"Invalid rate limit {text!r}")
+    return RateLimit(count=int(count), period=float(period), text=text.strip())
+
+
+def gcra(tat: float, now: float, limit: RateLimit, want: int) -> tuple[Decision, float]:
+    """Python twin of ``GCRA_SCRIPT`` (seconds instead of ms); returns the decision and new TAT."""
+    tat = max(tat, now)
+    available = math.floor((limit.period - (tat - now)) / limit.interval + _EPSILON)
+    granted = min(want, available)
+    if granted < 1:
+        return Decision(0, 0, tat + limit.interval - limit.period - now), tat
+    return Decision(granted, available - granted, 0.0), tat + granted * limit.interval
+
+
+class RateLimiter:
+    """GCRA buckets in Redis with optional local token leases and a per-process fallback."""
+
+    def __init__(self, prefix: str = KEY_PREFIX) -> None:
+        self.prefix = prefix
+        self._local: TTLCache[str, float] = TTLCache(maxsize=10_000, ttl=86_400)
+        self._leases: TTLCache[str, tuple[int, float]] = TTLCache(maxsize=10_000, ttl=3600)
+        self._script: Any = None
+        self._script_client: aioredis.Redis | None = None
+
+    def _batch(self, limit: RateLimit) -> int:
+        # Never reserve more than 5% of a limit: strict limits (login) stay one call per request.
+        return max(1, min(settings.rate_limit_local_batch, limit.count // 20))
+
+    async def hit(self, key: str, limit: RateLimit) -> tuple[Decision, str]:
+        """Take one token from ``key``; returns the decision and its source (metrics label)."""
+        now = time.monotonic()
+        lease = self._leases.get(key)
+        if lease is not None and lease[0] > 0 and lease[1] > now:
+            self._leases.set(key, (lease[0] - 1, lease[1]))
+            return Decision(1, lease[0] - 1, 0.0), "lease"
+
+        redis = get_redis()
+        if redis is not None:
+            want = self._batch(limit)
+            try:
+                decision = await self._redis_hit(redis, key, limit, want)
+            except Exception as e:
+                logger.warning("rate_limit_redis_failed", error=str(e))
+            else:
+                if decision.granted > 1:
+                    expires = now + settings.rate_limit_lease_seconds
+                    self._leases.set(key, (decision.granted - 1, expires))
+                return decision, "redis"
+
+        decision, tat = gcra(self._local.get(key) or now, now, limit, 1)
+        if decision.granted:
+            self._local.set(key, tat)
+        return decision, "local"
+
+    async def _redis_hit(
+        self, redis: aioredis.Redis, key: str, limit: RateLimit, want: int
+    ) -> Decision:
+        if self._script is None or self._script_client is not redis:
+            # EVALSHA (EVAL once after a script cache flush): one round trip per check
+            self._script = redis.register_script(GCRA_SCRIPT)
+            self._script_client = redis
+        granted, remaining, retry_ms = await self._script(
+            keys=[f"{self.prefix}{key}"],
+            args=[limit.interval * 1000, limit.period * 1000, want],
+        )
+        return Decision(int(granted), int(remaining), int(retry_ms) / 1000)
+
+    def reset(self) -> None:
+        """Forget local buckets and leases (tests)."""
+        self._local.clear()
+        self._leases.clear()
+
+
+rate_limiter = RateLimiter()
+
+
+def client_key(request: Request) -> str:
+    """Bucket owner: the authenticated user (cached token verification), else the client IP."""
+    token = request.cookies.get("access_token")
+    if token:
+        try:
+            verified = verify_token(token)
+        except JWTError:
+            pass
+        else:
+            if verified.type == "access":
+                return f"user:{verified.user_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def enforce_rate_limit(request: Request) -> None:
+    """
+    App-wide dependency: charge the request to its ``"<METHOD> <route>"`` bucket.
+
+    The limit comes from ``rate_limit_routes`` (e.g. a stricter ``POST /api/v1/auth/login``),
+    falling back to ``rate_limit_default``. Raises ``RateLimitExceededError`` (429).
+    """
+    if not settings.rate_limit_enabled:
+        return
+    route = getattr(request.scope.get("route"), "path", None) or request.url.path
+    route_key = f"{request.method} {route}"
+    limit = parse_rate_limit(settings.rate_limit_routes.get(route_key, settings.rate_limit_default))
+    if limit is None:
+        return
+
+    decision, source = await rate_limiter.hit(f"{route_key}:{client_key(request)}", limit)
+    allowed = decision.granted > 0
+    RATE_LIMIT_CHECKS.labels(
+        route=route, result="allowed" if allowed else "limited", source=source
+    ).inc()
+    if not allowed:
+        raise RateLimitExceededError(limit.text, decision.retry_after)
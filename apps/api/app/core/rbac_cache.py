@@ -0,0 +1,200 @@
+"""Versioned response cache for read-mostly RBAC listings (roles, permissions).
+
+Every cached body is keyed by an RBAC *generation* stored in Redis: a counter plus a random
+epoch, in one hash. Mutations of roles/permissions call ``bump_rbac_generation`` after
+committing, which makes all previous entries unreachable (they expire on their own). Because
+a body is fully determined by ``(name, generation)``, the ETag is derived from the generation
+alone: a matching ``If-None-Match`` returns 304 after a single Redis read, without touching
+the DB or Pydantic. The epoch is drawn again whenever the hash is missing (Redis flushed or
+the key evicted), so a counter that restarts never reproduces an ETag or cache key a client
+or worker already holds.
+
+Bodies are stored pre-serialized in a per-worker LRU and in Redis. Without Redis (tests,
+cache not initialized) the generation lives in process memory, with an epoch per process.
+The listings are rendered here (``RBAC_LISTINGS``) so that both the API routes and the
+cache-warming task use them.
+"""
+
+from __future__ import annotations
+
+import secrets
+from collections.abc import Awaitable, Callable
+from typing import cast
+
+from fastapi import Request, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.config import settings
+from app.core.cache import TTLCache, get_redis
+from app.core.logging import get_logger
+from app.core.metrics import record_cache
+from app.models.rbac import Permission, Role
+from app.schemas.rbac import PermissionResponse, RoleResponse
+
+logger = get_logger(__name__)
+
+# Redis hash with the fields "epoch" (random token) and "counter" (bumped on every change)
+GENERATION_KEY = "rbac:generation"
+RESPONSE_KEY_PREFIX = "rbac:response:"
+
+_local_epoch = secrets.token_hex(8)
+_local_generation = 0
+_local: TTLCache[tuple[str, str], bytes] = TTLCache(maxsize=64, ttl=settings.rbac_cache_ttl_seconds)
+
+_roles_adapter = TypeAdapter(list[RoleResponse])
+_permissions_adapter = TypeAdapter(list[PermissionResponse])
+
+
+async def render_roles(db: AsyncSession) -> bytes:
+    """JSON body of GET /roles."""
+    result = await db.execute(
+        select(Role).options(selectinload(Role.permissions)).order_by(Role.id)
+    )
+    roles = result.scalars().all()
+    return _roles_adapter.dump_json([RoleResponse.model_validate(r) for r in roles])
+
+
+async def render_permissions(db: AsyncSession) -> bytes:
+    """JSON body of GET /permissions."""
+    result = await db.execute(select(Permission).order_by(Permission.id))
+    permissions = result.scalars().all()
+    return _permissions_adapter.dump_json(
+        [PermissionResponse.model_validate(p) for p in permissions]
+    )
+
+
+# Cached RBAC listings by cache name (pre-rendered by the cache-warming task).
+RBAC_LISTINGS = {"roles": render_roles, "permissions": render_permissions}
+
+
+async def get_rbac_generation() -> str | None:
+    """Current RBAC generation (``epoch.counter``), or None when Redis is unreachable."""
+    redis = get_redis()
+    if redis is None:
+        return f"{_local_epoch}.{_local_generation}"
+    try:
+        # The client decodes responses, so hash values come back as str
+        fields = cast(list[str | None], await redis.hmget(GENERATION_KEY, ["epoch", "counter"]))
+        if fields[0] is None:
+            # Fresh (or flushed) hash: the first worker to get here picks the epoch
+            await redis.hsetnx(GENERATION_KEY, "epoch", secrets.token_hex(8))
+            fields = cast(list[str | None], await redis.hmget(GENERATION_KEY, ["epoch", "counter"]))
+        epoch, counter = fields
+    except Exception as e:
+        logger.warning("rbac_generation_get_failed", error=str(e))
+        return None
+    return f"{epoch}.{counter or 0}"
+
+
+async def bump_rbac_generation() -> None:
+    """Invalidate every cached RBAC response (call after committing a role/permission change)."""
+    global _local_generation
+    _local_generation += 1
+    _local.clear()
+
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.hincrby(GENERATION_KEY, "counter", 1)
+    except Exception as e:
+        logger.warning("rbac_generation_bump_failed", error=str(e))
+
+
+def _etag(name: str, generation: str) -> str:
+    return f'"rbac-{name}-{generation}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates or "*" in candidates
+
+
+async def _load_body(name: str, generation: str) -> bytes | None:
+    body = _local.get((name, generation))
+    if body is not None:
+        return body
+
+    redis = get_redis()
+    if redis is None:
+        return None
+    try:
+        raw = cast(str | None, await redis.get(f"{RESPONSE_KEY_PREFIX}{name}:{generation}"))
+    except Exception as e:
+        logger.warning("rbac_cache_get_failed", name=name, error=str(e))
+        return None
+    if raw is None:
+        return None
+    body = raw.encode("utf-8")
+    _local.set((name, generation), body)
+    return body
+
+
+async def _store_body(name: str, generation: str, body: bytes) -> None:
+    _local.set((name, generation), body)
+
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.set(
+            f"{RESPONSE_KEY_PREFIX}{name}:{generation}",
+            body.decode("utf-8"),
+            ex=settings.rbac_cache_ttl_seconds,
+        )
+    except Exception as e:
+        logger.warning("rbac_cache_set_failed", name=name, error=str(e))
+
+
+async def cached_rbac_response(
+    request: Request, name: str, render: Callable[[], Awaitable[bytes]]
+) -> Response:
+    """
+    Serve ``name`` from the versioned cache, rendering (DB + serialization) only on a miss.
+
+    ``render`` must return the JSON body; it is not called for 304s or cache hits.
+    """
+    headers = {"Cache-Control": "private, no-cache"}
+    generation = await get_rbac_generation()
+    if generation is None or settings.rbac_cache_ttl_seconds <= 0:
+        return Response(await render(), media_type="application/json", headers=headers)
+
+    etag = _etag(name, generation)
+    headers["ETag"] = etag
+    if _not_modified(request, etag):
+        record_cache("rbac_response", hit=True)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    body = await _load_body(name, generation)
+    record_cache("rbac_response", hit=body is not None)
+    if body is None:
+        body = await render()
+        await _store_body(name, generation, body)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def warm_rbac_cache(name: str, render: Callable[[], Awaitable[bytes]]) -> bool:
+    """
+    Render and store ``name`` for the current generation unless it is already cached.
+
+    Used by the cache-warming task so the first request after a bump is not a miss.
+    Returns True when a body was rendered.
+    """
+    generation = await get_rbac_generation()
+    if generation is None or settings.rbac_cache_ttl_seconds <= 0:
+        return False
+    if await _load_body(name, generation) is not None:
+        return False
+    await _store_body(name, generation, await render())
+    return True
+
+
+def clear_local_rbac_cache() -> None:
+    """Clear this worker's cached bodies (tests)."""
+    _local.clear()
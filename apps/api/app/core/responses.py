@@ -0,0 +1,66 @@
+"""Fast JSON responses: orjson as the app-wide encoder, plus a path for already-typed bodies.
+
+By default FastAPI handles a returned model in three steps: it validates it again against
+``response_model``, converts it to plain dicts, and then encodes the result with the
+stdlib ``json``. Two responses here cut that cost:
+
+- ``ORJSONResponse`` is the app's ``default_response_class``. Every response that still
+  goes through ``response_model`` (and every handler returning a dict) is encoded with
+  orjson.
+- ``TypedJSONResponse`` is for handlers whose body is already built from the schema, such
+  as ``Model.model_validate(orm_obj)``. Because the handler returns a Response, FastAPI
+  skips the ``response_model`` pass. pydantic-core then serializes the models straight to
+  JSON bytes. The route's ``response_model`` still documents the schema in OpenAPI.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from functools import cache
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson (same compact, UTF-8 output as the stdlib path)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+@cache
+def _list_adapter(model: type[BaseModel]) -> TypeAdapter[Sequence[BaseModel]]:
+    return TypeAdapter(list[model])  # type: ignore[valid-type]
+
+
+class TypedJSONResponse(Response):
+    """
+    Response whose body is a validated Pydantic model, or a list of models of one type.
+
+    Only pass trusted values, meaning instances built by the response schema itself.
+    Nothing is validated again.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: BaseModel | Sequence[BaseModel],
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+        background: BackgroundTask | None = None,
+    ) -> None:
+        super().__init__(content, status_code, headers, background=background)
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        models: Sequence[BaseModel] = content
+        if not models:
+            return b"[]"
+        return _list_adapter(type(models[0])).dump_json(models)
@@ -1,26 +1,304 @@
 """Security utilities for authentication and authorization."""
 
+import asyncio
+import hashlib
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime, timedelta
+from typing import Any, NamedTuple, Protocol
 
 import bcrypt
 from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
 
 from app.config import settings
+from app.core.cache import TTLCache
+from app.core.exceptions import ServiceOverloadedError
+from app.core.logging import get_logger
+from app.core.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_REJECTED, PASSWORD_HASH_WAIT
 
+logger = get_logger(__name__)
 
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
+
+def hash_password(password: str, rounds: int | None = None) -> str:
+    """Hash a password using bcrypt (cost ``rounds``, default ``settings.bcrypt_rounds``)."""
     # Generate salt and hash password
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=rounds or settings.bcrypt_rounds)
     hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
     return hashed.decode("utf-8")
 
 
+def hash_rounds(hashed_password: str) -> int | None:
+    """Cost factor of a ``$2a$``/``$2b$``/``$2y$`` bcrypt hash; None if it is not one."""
+    parts = hashed_password.split("$")
+    if len(parts) != 4 or parts[1] not in ("2a", "2b", "2y") or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    Whether a stored hash should be replaced on the next successful login.
+
+    True when its cost differs from ``settings.bcrypt_rounds`` (raised for compliance or
+    lowered for latency), so the cost can change without forcing password resets.
+    """
+    return hash_rounds(hashed_password) != settings.bcrypt_rounds
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
     return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
 
+class PasswordHasherPool:
+    """
+    Bounded thread pool for bcrypt work (bcrypt releases the GIL while hashing).
+
+    At most ``max_workers`` jobs run concurrently and at most ``max_queue`` more wait;
+    anything beyond that is rejected with ``ServiceOverloadedError`` (HTTP 503).
+    Wait time (submit -> start) and hash time are recorded per operation.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+        self._stats: dict[str, dict[str, float]] = {}
+        self.rejected = 0
+
+    @property
+    def pending(self) -> int:
+        """Jobs currently queued or running."""
+        return self._pending
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    def _record(self, op: str, wait: float, duration: float) -> None:
+        stats = self._stats.setdefault(
+            op, {"count": 0, "wait_seconds": 0.0, "hash_seconds": 0.0, "max_wait_seconds": 0.0}
+        )
+        stats["count"] += 1
+        stats["wait_seconds"] += wait
+        stats["hash_seconds"] += duration
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait)
+        PASSWORD_HASH_WAIT.labels(op=op).observe(wait)
+        PASSWORD_HASH_DURATION.labels(op=op).observe(duration)
+        logger.debug(
+            "password_hash", op=op, wait_ms=round(wait * 1000, 2), hash_ms=round(duration * 1000, 2)
+        )
+
+    async def run[T](self, op: str, fn: Callable[..., T], *args: str) -> T:
+        """Run ``fn(*args)`` on the pool, rejecting if the queue is full."""
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            PASSWORD_HASH_REJECTED.labels(op=op).inc()
+            logger.warning("password_hash_pool_overloaded", op=op, pending=self._pending)
+            raise ServiceOverloadedError()
+
+        submitted = time.perf_counter()
+
+        def _job() -> tuple[T, float, float]:
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        self._pending += 1
+        loop = asyncio.get_running_loop()
+        job = self._get_executor().submit(_job)
+        # Free the slot when the thread is done, not when the caller stops waiting: cancelling
+        # the request (client disconnect) does not stop a bcrypt job that already started
+        job.add_done_callback(lambda _: self._release(loop))
+        result, wait, duration = await asyncio.wrap_future(job)
+        self._record(op, wait, duration)
+        return result
+
+    def _release(self, loop: asyncio.AbstractEventLoop) -> None:
+        # Called from the worker thread; _pending is only changed on the event loop
+        try:
+            loop.call_soon_threadsafe(self._finished)
+        except RuntimeError:  # the loop is already closed (shutdown)
+            self._finished()
+
+    def _finished(self) -> None:
+        self._pending -= 1
+
+    def mean_duration(self, op: str) -> float:
+        """Average hash time of ``op`` so far (0.0 before the first job)."""
+        stats = self._stats.get(op)
+        if not stats or not stats["count"]:
+            return 0.0
+        return stats["hash_seconds"] / stats["count"]
+
+    def stats(self) -> dict[str, object]:
+        """Snapshot of pool counters (per-op count, cumulative wait/hash seconds)."""
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "rejected": self.rejected,
+            "ops": {op: dict(values) for op, values in self._stats.items()},
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_pool = PasswordHasherPool(
+    max_workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the bounded worker pool (does not block the event loop)."""
+    return await password_pool.run("hash", hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the bounded worker pool (does not block the event loop)."""
+    return await password_pool.run("verify", verify_password, plain_password, hashed_password)
+
+
+_dummy_hash: str | None = None
+
+
+async def prepare_dummy_hash() -> str:
+    """Create the hash ``verify_dummy_password`` checks against, at the configured cost."""
+    global _dummy_hash
+    _dummy_hash = await hash_password_async("dummy-password-for-timing")
+    return _dummy_hash
+
+
+async def verify_dummy_password(plain_password: str) -> None:
+    """
+    Spend one bcrypt verification when there is no stored hash (unknown email).
+
+    Keeps "no such account" as slow as "wrong password", so response time does not reveal
+    which emails are registered. The dummy hash is built at startup (``prepare_dummy_hash``
+    in the lifespan), so no login pays for creating it; only without a lifespan (tests) is it
+    built on first use.
+    """
+    dummy_hash = _dummy_hash or await prepare_dummy_hash()
+    await password_pool.run("verify", verify_password, plain_password, dummy_hash)
+
+
+class JoseBackend(Protocol):
+    """JWT encode/decode implementation; ``decode`` must raise ``jose.JWTError`` on failure."""
+
+    def encode(self, claims: dict[str, Any], key: str, algorithm: str) -> str: ...
+
+    def decode(self, token: str, key: str, algorithms: Sequence[str]) -> dict[str, Any]: ...
+
+
+class PythonJoseBackend:
+    """Default backend (python-jose)."""
+
+    def encode(self, claims: dict[str, Any], key: str, algorithm: str) -> str:
+        return jwt.encode(claims, key, algorithm=algorithm)
+
+    def decode(self, token: str, key: str, algorithms: Sequence[str]) -> dict[str, Any]:
+        return jwt.decode(token, key, algorithms=list(algorithms))
+
+
+class PyJWTBackend:
+    """PyJWT backend (optional extra: ``uv sync --extra jwt``); errors map to JWTError."""
+
+    def __init__(self) -> None:
+        import jwt as pyjwt
+
+        self._jwt = pyjwt
+
+    def encode(self, claims: dict[str, Any], key: str, algorithm: str) -> str:
+        return self._jwt.encode(claims, key, algorithm=algorithm)
+
+    def decode(self, token: str, key: str, algorithms: Sequence[str]) -> dict[str, Any]:
+        try:
+            return self._jwt.decode(token, key, algorithms=list(algorithms))
+        except self._jwt.ExpiredSignatureError as e:
+            raise ExpiredSignatureError(str(e)) from None
+        except self._jwt.PyJWTError as e:
+            raise JWTError(str(e)) from None
+
+
+_JOSE_BACKENDS: dict[str, Callable[[], JoseBackend]] = {
+    "python-jose": PythonJoseBackend,
+    "pyjwt": PyJWTBackend,
+}
+
+jose_backend: JoseBackend = _JOSE_BACKENDS[settings.jwt_backend]()
+
+
+def set_jose_backend(backend: JoseBackend) -> None:
+    """Swap the JWT implementation (also clears the verified-token cache)."""
+    global jose_backend
+    jose_backend = backend
+    _verified_tokens.clear()
+
+
+class VerifiedToken(NamedTuple):
+    """Claims of a signature-checked token, as used by the auth dependencies."""
+
+    user_id: int
+    ver: int
+    type: str
+    exp: float
+
+
+# Verified tokens keyed by SHA-256 of the raw token (tokens themselves are not retained).
+# Entries never outlive the token's own ``exp``; the TTL only bounds how long we trust a
+# verification without re-checking the signature.
+_verified_tokens: TTLCache[bytes, VerifiedToken] = TTLCache(
+    maxsize=settings.jwt_cache_max_entries, ttl=settings.jwt_cache_ttl_seconds
+)
+
+
+def verify_token(token: str) -> VerifiedToken:
+    """
+    Verify a JWT and return its ``(user_id, ver, type, exp)`` claims.
+
+    Verified tokens are cached (bounded LRU keyed by token digest), so repeat requests with
+    the same token skip HMAC verification and JSON parsing.
+
+    Raises:
+        JWTError: If the token is invalid, expired or lacks the required claims
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    cached = _verified_tokens.get(key)
+    if cached is not None:
+        if cached.exp > time.time():
+            return cached
+        _verified_tokens.pop(key)
+        raise ExpiredSignatureError("Signature has expired.")
+
+    payload = decode_token(token)
+    try:
+        verified = VerifiedToken(
+            user_id=int(payload["sub"]),  # type: ignore[call-overload]
+            ver=int(payload["ver"]),  # type: ignore[call-overload]
+            type=str(payload["type"]),
+            exp=float(payload["exp"]),  # type: ignore[arg-type]
+        )
+    except (KeyError, TypeError, ValueError):
+        raise JWTClaimsError("Missing or invalid claims") from None
+    _verified_tokens.set(key, verified)
+    return verified
+
+
+def clear_verified_token_cache() -> None:
+    """Drop cached verifications (tests / key rotation)."""
+    _verified_tokens.clear()
+
+
 def create_access_token(user_id: int, token_version: int) -> str:
     """
     Create a JWT access token.
@@ -40,7 +318,7 @@ def create_access_token(user_id: int, token_version: int) -> str:
         "iat": datetime.now(UTC),
         "type": "access",
     }
-    return jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
+    return jose_backend.encode(to_encode, settings.secret_key, algorithm="HS256")
 
 
 def create_refresh_token(user_id: int, token_version: int) -> str:
@@ -62,7 +340,7 @@ def create_refresh_token(user_id: int, token_version: int) -> str:
         "iat": datetime.now(UTC),
         "type": "refresh",
     }
-    return jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
+    return jose_backend.encode(to_encode, settings.secret_key, algorithm="HS256")
 
 
 def decode_token(token: str) -> dict[str, object]:
@@ -78,4 +356,4 @@ def decode_token(token: str) -> dict[str, object]:
     Raises:
         JWTError: If token is invalid or expired
     """
-    return jwt.decode(token, settings.secret_key, algorithms=["HS256"])
+    return jose_backend.decode(token, settings.secret_key, algorithms=["HS256"])
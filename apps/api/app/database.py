@@ -1,27 +1,106 @@
 """Database configuration and session management."""
 
-from collections.abc import AsyncGenerator
+import asyncio
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from functools import partial
+from typing import Any
+from uuid import uuid4
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import QueuePool
 
 from app.config import settings
+from app.core.db_routing import RoutingSession
+from app.core.logging import get_logger
+from app.core.metrics import DB_DISCONNECT_RETRIES, InstrumentedAsyncPool, instrument_engine
+from app.core.query_stats import instrument_queries
+
+logger = get_logger(__name__)
+
+
+def _engine_kwargs() -> dict[str, Any]:
+    """Pool and driver options from Settings (shared by every engine the app creates)."""
+    kwargs: dict[str, Any] = {
+        "echo": settings.debug,
+        "future": True,
+        "pool_size": settings.db_pool_size,  # 连接池大小
+        "max_overflow": settings.db_max_overflow,  # 最大溢出连接
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        # 默认关闭：空闲连接由后台 liveness 检查，断连时首条语句重试一次
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_recycle": settings.db_pool_recycle_seconds,  # 连接回收时间（秒）
+        "poolclass": InstrumentedAsyncPool,  # 记录连接池 checkout 等待时间
+    }
+    if settings.db_pgbouncer:
+        # PgBouncer transaction pooling hands each transaction a different server connection,
+        # so asyncpg must not cache prepared statements and their names must be unique.
+        kwargs["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return kwargs
+
 
 # Create async engine with connection pool configuration
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    future=True,
-    pool_size=20,  # 连接池大小
-    max_overflow=10,  # 最大溢出连接
-    pool_pre_ping=True,  # 连接健康检查
-    pool_recycle=3600,  # 连接回收时间（秒）
-)
+engine = create_async_engine(settings.database_url, **_engine_kwargs())
+instrument_engine(engine)
+instrument_queries(engine)
+
+# Optional read replicas (pool gauges track the primary only)
+replica_engines = [
+    create_async_engine(url, **_engine_kwargs()) for url in settings.replica_url_list()
+]
+for _replica in replica_engines:
+    instrument_queries(_replica)
+RoutingSession.replicas = tuple(e.sync_engine for e in replica_engines)
+
+
+class RetryingAsyncSession(AsyncSession):
+    """
+    AsyncSession that retries once when a transaction's first statement hits a dead connection.
+
+    Without pool_pre_ping a checkout may return a connection the server already closed
+    (failover, idle timeout). Only the first statement of a transaction is retried, and only
+    while the session holds no pending changes: nothing has run on that connection yet, so
+    rolling back and re-executing is safe. With new/dirty/deleted objects the statement would
+    autoflush them first, and the rollback discards that flush, so it is never retried.
+    """
+
+    async def _retry_on_disconnect[T](self, call: Callable[[], Awaitable[T]]) -> T:
+        fresh = not (self.in_transaction() or self.new or self.dirty or self.deleted)
+        try:
+            return await call()
+        except DBAPIError as e:
+            if not (fresh and e.connection_invalidated):
+                raise
+            DB_DISCONNECT_RETRIES.inc()
+            logger.warning("db_disconnect_retry", error=str(e.orig))
+            await self.rollback()
+            return await call()
+
+    async def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._retry_on_disconnect(partial(super().execute, *args, **kwargs))
+
+    async def scalar(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._retry_on_disconnect(partial(super().scalar, *args, **kwargs))
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        return await self._retry_on_disconnect(partial(super().get, *args, **kwargs))
+
 
 # Create async session factory
 async_session = async_sessionmaker(
     engine,
-    class_=AsyncSession,
+    class_=RetryingAsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
 )
 
@@ -39,3 +118,68 @@ async def get_db() -> AsyncGenerator[AsyncSession]:
             yield session
         finally:
             await session.close()
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession]:
+    """
+    Dependency for read-only endpoints: routed to a replica when one is configured.
+
+    Falls back to the primary after a write in the same request or within the client's
+    read-your-writes window (see app.core.db_routing).
+    """
+    async with async_session(info={"read_only": True}) as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def pool_stats(target: AsyncEngine = engine) -> dict[str, Any]:
+    """Point-in-time statistics of an engine's connection pool."""
+    pool = target.sync_engine.pool
+    stats: dict[str, Any] = {
+        "pool_class": type(pool).__name__,
+        "size": None,
+        "max_overflow": settings.db_max_overflow,
+        "checked_in": None,
+        "checked_out": None,
+        "overflow": None,
+        "timeout_seconds": settings.db_pool_timeout_seconds,
+        "recycle_seconds": settings.db_pool_recycle_seconds,
+        "pre_ping": settings.db_pool_pre_ping,
+        "pgbouncer": settings.db_pgbouncer,
+    }
+    # Only queue pools expose counters (NullPool/StaticPool, e.g. in tests, do not)
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    return stats
+
+
+async def warm_up_pool(connections: int, target: AsyncEngine = engine) -> int:
+    """
+    Open up to ``connections`` pooled connections concurrently and return them to the pool.
+
+    Returns how many connections were opened; failures are logged, never raised, so a
+    database that is still starting does not block application startup.
+    """
+    count = min(connections, settings.db_pool_size)
+    if count <= 0:
+        return 0
+
+    async def _connect() -> None:
+        async with target.connect() as conn:
+            await conn.exec_driver_sql("SELECT 1")
+
+    results = await asyncio.gather(*(_connect() for _ in range(count)), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, BaseException)]
+    opened = count - len(errors)
+    if errors:
+        logger.warning("db_pool_warmup_failed", opened=opened, error=str(errors[0]))
+    else:
+        logger.info("db_pool_warmed_up", connections=opened)
+    return opened
@@ -3,33 +3,39 @@
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI
 from fastapi.exceptions import HTTPException, RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
-from slowapi.util import get_remote_address
 from sqlalchemy.exc import IntegrityError
 
 from app.api.v1.router import api_router
 from app.config import settings
+from app.core.audit import audit_writer
+from app.core.audit_partitions import ensure_audit_partitions
 from app.core.cache import close_cache, init_cache
+from app.core.db_liveness import liveness_checkers
+from app.core.db_routing import ReadYourWritesMiddleware
 from app.core.errors import (
     generic_exception_handler,
     http_exception_handler,
     integrity_error_handler,
     validation_exception_handler,
 )
+from app.core.last_login import last_login_writer
 from app.core.logging import configure_logging, get_logger
+from app.core.metrics import PrometheusMiddleware, mark_process_dead, metrics_endpoint
+from app.core.principal_cache import invalidation_listener
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.rate_limit import enforce_rate_limit
+from app.core.responses import ORJSONResponse
+from app.core.security import password_pool, prepare_dummy_hash
+from app.database import engine, warm_up_pool
 
 # Configure structured logging
 configure_logging()
 logger = get_logger(__name__)
 
-# Configure rate limiter
-limiter = Limiter(key_func=get_remote_address, default_limits=["200/minute"])
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
@@ -43,11 +49,42 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
 
     # 初始化缓存
     await init_cache()
+    # 订阅认证主体失效通知（其他 worker 的进程内缓存随之清除）
+    invalidation_listener.start()
+
+    # 预先生成未知邮箱登录使用的 bcrypt 哈希，避免首个此类请求多做一次哈希而暴露耗时差异
+    await prepare_dummy_hash()
+
+    # 预热数据库连接池，避免部署后首批请求承担建连开销
+    await warm_up_pool(settings.db_pool_warmup_connections)
+    for checker in liveness_checkers:
+        checker.start()
+
+    # 确保审计日志当月及后续月份的分区存在（仅 PostgreSQL）
+    try:
+        async with engine.begin() as conn:
+            await ensure_audit_partitions(
+                conn, months_ahead=settings.audit_partition_premake_months
+            )
+    except Exception as e:
+        logger.warning("audit_partitions_ensure_failed", error=str(e))
+
+    if settings.audit_async_enabled:
+        audit_writer.start()
+    if settings.last_login_write_behind_enabled:
+        last_login_writer.start()
 
     yield
 
     # Shutdown
+    for checker in liveness_checkers:
+        await checker.stop()
+    await audit_writer.stop()
+    await last_login_writer.stop()
+    await invalidation_listener.stop()
     await close_cache()
+    password_pool.shutdown()
+    mark_process_dead()
     logger.info("application_shutdown")
 
 
@@ -56,12 +93,11 @@ app = FastAPI(
     version=settings.app_version,
     debug=settings.debug,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+    # Shared (Redis) rate limit on every route; limits per route in settings.rate_limit_routes
+    dependencies=[Depends(enforce_rate_limit)],
 )
 
-# Add rate limiter state
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)  # type: ignore[arg-type]
-
 # Add error handlers
 app.add_exception_handler(RequestValidationError, validation_exception_handler)  # type: ignore[arg-type]
 app.add_exception_handler(IntegrityError, integrity_error_handler)  # type: ignore[arg-type]
@@ -80,13 +116,24 @@ app.add_middleware(
 # Add GZip compression
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# Replica routing: tracks writes per request and the client's read-your-writes window
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Prometheus metrics (outside everything but QueryStatsMiddleware, so latency includes
+# CORS, GZip and replica routing; QueryStats bookkeeping itself is not timed)
+app.add_middleware(PrometheusMiddleware)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+# Per-request DB statistics (Server-Timing header, log context); wraps the metrics middleware
+# so it can report statements per route
+app.add_middleware(QueryStatsMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix="/api")
 
 
 @app.get("/")
-@limiter.limit("10/minute")
-async def root(request: Request) -> dict[str, str]:
+async def root() -> dict[str, str]:
     """Root endpoint."""
     return {"message": "Welcome to Nexus Console API", "version": settings.app_version}
 
@@ -61,11 +61,15 @@ class Role(Base):
         back_populates="roles",
         lazy="selectin",
     )
+    # Back-references can hold every user / role: never load them implicitly. Use the
+    # paginated /roles/{id}/members and /permissions/{id}/roles endpoints instead.
+    # passive_deletes: rows in the association tables are removed by ON DELETE CASCADE.
     users: Mapped[list[User]] = relationship(
         "User",
         secondary=user_roles,
         back_populates="roles",
-        lazy="selectin",
+        lazy="raise",
+        passive_deletes=True,
     )
 
 
@@ -83,5 +87,6 @@ class Permission(Base):
         "Role",
         secondary=role_permissions,
         back_populates="permissions",
-        lazy="selectin",
+        lazy="raise",
+        passive_deletes=True,
     )
@@ -5,7 +5,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, func
+from sqlalchemy import DateTime, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -23,6 +23,19 @@ class User(Base):
 
     # 添加复合索引以优化常见查询
     __table_args__ = (
+        # pg_trgm GIN 索引：支持 ILIKE '%q%' 搜索与 similarity() 排序（仅 PostgreSQL）
+        Index(
+            "ix_users_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_users_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
         # 按创建时间和活跃状态查询的复合索引
         {"comment": "User table with optimized indexes"},
     )
@@ -1,9 +1,14 @@
 """Pydantic schemas."""
 
-from app.schemas.pagination import PaginatedResponse, PaginationParams
+from app.schemas.pagination import (
+    CursorPaginatedResponse,
+    PaginatedResponse,
+    PaginationParams,
+)
 from app.schemas.user import UserCreate, UserResponse, UserUpdate
 
 __all__ = [
+    "CursorPaginatedResponse",
     "PaginatedResponse",
     "PaginationParams",
     "UserCreate",
@@ -39,3 +39,20 @@ class PaginatedResponse[T](BaseModel):
             limit=limit,
             has_more=(skip + len(items)) < total,
         )
+
+
+class CursorPaginatedResponse[T](BaseModel):
+    """Keyset (cursor) paginated response model."""
+
+    items: list[T] = Field(description="List of items")
+    limit: int = Field(description="Number of items per page")
+    next_cursor: str | None = Field(
+        default=None, description="Opaque cursor for the next page (null on the last page)"
+    )
+    has_more: bool = Field(description="Whether there are more items")
+    total: int | None = Field(default=None, description="Total number of items, if requested")
+    total_is_estimate: bool = Field(
+        default=False, description="Whether total is an estimate rather than an exact count"
+    )
+
+    model_config = ConfigDict(from_attributes=True)
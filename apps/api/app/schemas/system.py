@@ -0,0 +1,18 @@
+"""System diagnostics schemas."""
+
+from pydantic import BaseModel
+
+
+class DatabasePoolStats(BaseModel):
+    """Connection pool statistics of the current worker."""
+
+    pool_class: str
+    size: int | None = None
+    max_overflow: int
+    checked_in: int | None = None
+    checked_out: int | None = None
+    overflow: int | None = None
+    timeout_seconds: float
+    recycle_seconds: int
+    pre_ping: bool
+    pgbouncer: bool
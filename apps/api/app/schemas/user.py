@@ -1,11 +1,17 @@
 """User schemas."""
 
 from datetime import datetime
+from typing import Annotated, Any
 
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, WithJsonSchema
 
 from app.schemas.rbac import RoleRefResponse, RoleResponse
 
+# Email read back from the database. It was validated as EmailStr on the way in, so response
+# models skip email-validator (the dominant cost of building a page of users) while the
+# OpenAPI schema stays identical.
+StoredEmail = Annotated[str, WithJsonSchema({"type": "string", "format": "email"})]
+
 
 class UserBase(BaseModel):
     """Base user schema."""
@@ -33,6 +39,7 @@ class UserUpdate(BaseModel):
 class UserResponse(UserBase):
     """Schema for user response."""
 
+    email: StoredEmail
     id: int
     is_active: bool
     created_at: datetime
@@ -46,7 +53,7 @@ class CurrentUserResponse(BaseModel):
     """Schema for current user with RBAC information."""
 
     id: int
-    email: EmailStr
+    email: StoredEmail
     name: str | None = None
     is_active: bool
     created_at: datetime
@@ -54,4 +61,55 @@ class CurrentUserResponse(BaseModel):
     roles: list[RoleResponse]
     permissions: list[str]
 
+    # Bitmask of ``permissions`` (app.core.permissions), compiled when the principal is built
+    # or loaded from Redis. Bit indices are per process, so it is never serialized.
+    permission_mask: int = Field(default=0, exclude=True, repr=False)
+
     model_config = ConfigDict(from_attributes=True)
+
+
+class BulkUserRow(BaseModel):
+    """A bulk-import row that was created (``id`` set) or skipped as already registered."""
+
+    index: int
+    email: StoredEmail
+    id: int | None = None
+
+
+class BulkRowError(BaseModel):
+    """Validation errors of one bulk-import row (``index`` is 0-based, header excluded)."""
+
+    index: int
+    errors: list[dict[str, Any]]
+
+
+class BulkImportResponse(BaseModel):
+    """Per-row outcome of a bulk import."""
+
+    created: list[BulkUserRow]
+    skipped: list[BulkUserRow]
+    errors: list[BulkRowError]
+
+
+class BulkImportJobResponse(BaseModel):
+    """Bulk import running as a background job; ``result`` is set once it succeeded."""
+
+    job_id: str
+    status: str
+    result: BulkImportResponse | None = None
+
+
+class BulkUserUpdate(BaseModel):
+    """Schema for activating/deactivating many users at once."""
+
+    ids: list[int] = Field(min_length=1, max_length=1000)
+    is_active: bool
+
+    model_config = ConfigDict(strict=True)
+
+
+class BulkUserUpdateResponse(BaseModel):
+    """Users changed by a bulk update, and requested IDs that do not exist."""
+
+    updated: list[int]
+    missing: list[int]
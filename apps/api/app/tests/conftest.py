@@ -1,8 +1,8 @@
 """Pytest configuration and fixtures."""
 
 import asyncio
-from collections.abc import AsyncGenerator
-from contextlib import suppress
+from collections.abc import AsyncGenerator, Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
 
 import pytest
 from fastapi_cache import FastAPICache
@@ -10,8 +10,16 @@ from fastapi_cache.backends.inmemory import InMemoryBackend
 from httpx import ASGITransport, AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
-from app.database import Base, get_db
+import app.core.password_rehash as password_rehash
+from app.core.login_throttle import login_throttle
+from app.core.pagination import clear_count_cache
+from app.core.principal_cache import clear_local_principal_cache
+from app.core.query_stats import QueryStats, instrument_queries, track_queries
+from app.core.rate_limit import rate_limiter
+from app.core.rbac_cache import clear_local_rbac_cache
+from app.database import Base, RetryingAsyncSession, async_session, get_db, get_read_db
 from app.main import app
+from app.worker import celery_app
 
 # Test database URL
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -19,10 +27,12 @@ TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 # Create test engine
 test_engine = create_async_engine(TEST_DATABASE_URL, echo=False)
 
+instrument_queries(test_engine)
+
 # Create test session factory
 TestSessionLocal = async_sessionmaker(
     test_engine,
-    class_=AsyncSession,
+    class_=RetryingAsyncSession,
     expire_on_commit=False,
 )
 
@@ -41,6 +51,10 @@ async def setup_database() -> AsyncGenerator[None]:
     """Create tables before each test and drop after."""
     # Initialize cache for tests
     FastAPICache.init(InMemoryBackend(), prefix="test-cache")
+    # IDs restart per test DB, so cached principals must not leak across tests
+    clear_local_principal_cache()
+    clear_count_cache()
+    clear_local_rbac_cache()
 
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
@@ -57,6 +71,9 @@ async def client() -> AsyncGenerator[AsyncClient]:
     """Create an async test client."""
     # Override database dependency
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    # Background tasks open their own sessions
+    password_rehash.session_factory = TestSessionLocal
 
     async with AsyncClient(
         transport=ASGITransport(app=app),
@@ -66,17 +83,63 @@ async def client() -> AsyncGenerator[AsyncClient]:
 
     # Clear overrides
     app.dependency_overrides.clear()
+    password_rehash.session_factory = async_session
+
+
+@pytest.fixture
+def query_budget() -> Callable[[int], AbstractContextManager[QueryStats]]:
+    """
+    Fail the test when the wrapped block executes more than ``max_statements`` SQL statements.
+
+    Usage::
+
+        with query_budget(3):
+            await client.get("/api/v1/rbac/roles")
+    """
+
+    @contextmanager
+    def budget(max_statements: int) -> Iterator[QueryStats]:
+        with track_queries(record=True) as stats:
+            yield stats
+        if stats.statements > max_statements:
+            assert stats.seen is not None
+            listing = "\n".join(f"  {n}x {sql}" for sql, n in stats.seen.most_common())
+            pytest.fail(
+                f"query budget exceeded: {stats.statements} statements > {max_statements}\n"
+                f"{listing}",
+                pytrace=False,
+            )
+
+    return budget
+
+
+@pytest.fixture
+def celery_eager() -> Iterator[None]:
+    """Run Celery tasks inline (in-memory broker) against the test database."""
+    import app.worker.db as worker_db
+
+    # create_celery_app() makes each new app current; shared tasks bind to the current app
+    celery_app.set_current()
+    saved = {
+        key: celery_app.conf[key] for key in ("task_always_eager", "broker_url", "result_backend")
+    }
+    celery_app.conf.update(
+        task_always_eager=True, broker_url="memory://", result_backend="cache+memory://"
+    )
+    worker_db.session_factory = TestSessionLocal
+    yield
+    celery_app.conf.update(saved)
+    worker_db.session_factory = async_session
 
 
 @pytest.fixture(autouse=True)
-def reset_rate_limit_storage() -> None:
-    """Ensure rate limiter storage is cleared before/after each test."""
-    storage = getattr(app.state.limiter, "_storage", None)
-    if storage is not None:
-        storage.reset()
+def reset_rate_limit_storage() -> Iterator[None]:
+    """Ensure per-process rate limit buckets and login failures are cleared around each test."""
+    rate_limiter.reset()
+    login_throttle.clear()
     yield
-    if storage is not None:
-        storage.reset()
+    rate_limiter.reset()
+    login_throttle.clear()
 
 
 def _dispose_test_engine() -> None:
@@ -84,30 +147,6 @@ def _dispose_test_engine() -> None:
     asyncio.run(test_engine.dispose())
 
 
-def _shutdown_rate_limiter_timers() -> None:
-    """Cancel lingering slowapi timers to avoid non-daemon threads."""
-    limiter = getattr(app.state, "limiter", None)
-    if limiter is None:
-        return
-
-    storages = [getattr(limiter, "_storage", None)]
-    fallback = getattr(limiter, "_fallback_limiter", None)
-    if fallback is not None:
-        storages.append(getattr(fallback, "_storage", None))
-
-    for storage in storages:
-        if storage is None:
-            continue
-        timer = getattr(storage, "timer", None)
-        if timer is None:
-            continue
-        timer.cancel()
-        with suppress(RuntimeError):
-            timer.join(timeout=1)
-        storage.timer = None
-
-
 def pytest_sessionfinish(session: pytest.Session, exitstatus: int) -> None:
     """Ensure pytest shuts down cleanly."""
     _dispose_test_engine()
-    _shutdown_rate_limiter_timers()
@@ -1,5 +1,7 @@
 """Tests for Audit log endpoints."""
 
+from pathlib import Path
+
 import pytest
 from httpx import AsyncClient
 
@@ -71,3 +73,209 @@ async def test_audit_logs_list_and_detail(client: AsyncClient) -> None:
     d = detail.json()
     assert d["id"] == hit["id"]
     assert d["action"] == "rbac.role.create"
+
+
+@pytest.mark.asyncio
+async def test_audit_logs_cursor_pagination(client: AsyncClient) -> None:
+    """Keyset pagination follows (created_at DESC, id DESC), including timestamp ties."""
+    from datetime import UTC, datetime, timedelta
+
+    from app.models.audit_log import AuditLog
+    from app.tests.conftest import TestSessionLocal
+
+    settings.admin_emails = "admin-cursor@example.com"
+    cookies = await _register_and_login(client, email="admin-cursor@example.com")
+
+    base = datetime(2025, 1, 1, tzinfo=UTC)
+    async with TestSessionLocal() as db:
+        for i in range(7):
+            db.add(
+                AuditLog(
+                    action="test.cursor",
+                    target_type="thing",
+                    target_id=i,
+                    # pairs of rows share a timestamp to exercise the id tie-breaker
+                    created_at=base + timedelta(minutes=i // 2),
+                )
+            )
+        await db.commit()
+
+    seen: list[int] = []
+    cursor = None
+    while True:
+        params: dict[str, str | int] = {"action": "test.cursor", "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        resp = await client.get("/api/v1/audit/logs/cursor", cookies=cookies, params=params)
+        assert resp.status_code == 200
+        data = resp.json()
+        seen.extend(x["target_id"] for x in data["items"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [6, 5, 4, 3, 2, 1, 0]
+
+
+@pytest.mark.asyncio
+async def test_async_audit_writer_batches_after_commit(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Non-strict events are bulk-inserted after commit; strict ones stay in the transaction."""
+    from sqlalchemy import select
+
+    from app.core.audit import audit_writer
+    from app.models.audit_log import AuditLog
+    from app.tests.conftest import TestSessionLocal
+
+    settings.admin_emails = "admin-async@example.com"
+    cookies = await _register_and_login(client, email="admin-async@example.com")
+
+    monkeypatch.setattr(audit_writer, "session_factory", TestSessionLocal)
+    monkeypatch.setattr(audit_writer, "flush_interval", 60.0)
+    audit_writer.start()
+    try:
+        create_role = await client.post(
+            "/api/v1/roles",
+            cookies=cookies,
+            json={"name": "tmp_async_role", "description": "tmp"},
+        )
+        assert create_role.status_code == 201
+        role_id = create_role.json()["id"]
+
+        # buffered, not yet written
+        assert audit_writer.pending == 1
+
+        # privilege changes are strict: written in the request transaction
+        set_perms = await client.put(
+            f"/api/v1/roles/{role_id}/permissions",
+            cookies=cookies,
+            json={"permission_codes": ["users:read"]},
+        )
+        assert set_perms.status_code == 200
+        assert audit_writer.pending == 1
+
+        # a rejected request adds nothing to the buffer
+        duplicate = await client.post(
+            "/api/v1/roles", cookies=cookies, json={"name": "tmp_async_role"}
+        )
+        assert duplicate.status_code == 400
+        assert audit_writer.pending == 1
+    finally:
+        await audit_writer.stop()
+
+    assert audit_writer.pending == 0
+    async with TestSessionLocal() as db:
+        actions = (
+            (await db.execute(select(AuditLog.action).where(AuditLog.target_id == role_id)))
+            .scalars()
+            .all()
+        )
+    assert sorted(actions) == ["rbac.role.create", "rbac.role.permissions.set"]
+
+
+@pytest.mark.asyncio
+async def test_audit_logs_export(client: AsyncClient) -> None:
+    """The export streams the same filtered rows as the listing, newest first."""
+    import csv
+    import io
+    import json
+    from datetime import UTC, datetime, timedelta
+
+    from app.models.audit_log import AuditLog
+    from app.tests.conftest import TestSessionLocal
+
+    settings.admin_emails = "admin-export@example.com"
+    cookies = await _register_and_login(client, email="admin-export@example.com")
+
+    base = datetime(2025, 1, 1, tzinfo=UTC)
+    async with TestSessionLocal() as db:
+        for i in range(4):
+            db.add(
+                AuditLog(
+                    action="test.export",
+                    target_type="thing",
+                    target_id=i,
+                    payload={"n": i},
+                    created_at=base + timedelta(minutes=i),
+                )
+            )
+        await db.commit()
+
+    ndjson = await client.get(
+        "/api/v1/audit/logs/export", cookies=cookies, params={"action": "test.export"}
+    )
+    assert ndjson.status_code == 200
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [r["target_id"] for r in rows] == [3, 2, 1, 0]
+    assert rows[0]["payload"] == {"n": 3}
+
+    csv_resp = await client.get(
+        "/api/v1/audit/logs/export",
+        cookies=cookies,
+        params={"action": "test.export", "target_id": 2, "format": "csv"},
+    )
+    assert csv_resp.status_code == 200
+    table = list(csv.DictReader(io.StringIO(csv_resp.text)))
+    assert [(r["target_id"], r["payload"]) for r in table] == [("2", '{"n":2}')]
+
+
+@pytest.mark.asyncio
+async def test_audit_logs_export_requires_permission(client: AsyncClient) -> None:
+    settings.admin_emails = ""
+    cookies = await _register_and_login(client, email="u-export@example.com")
+
+    resp = await client.get("/api/v1/audit/logs/export", cookies=cookies)
+    assert resp.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_audit_partition_helpers(tmp_path: Path) -> None:
+    """Monthly partition names/bounds roll over years; non-PostgreSQL databases are skipped."""
+    from datetime import UTC, date, datetime
+
+    from app.core.audit_partitions import (
+        AuditPartition,
+        add_months,
+        archive_audit_partitions,
+        ensure_audit_partitions,
+    )
+    from app.tests.conftest import test_engine
+
+    december = AuditPartition(add_months(date(2025, 11, 17), 1))
+    assert december.name == "audit_logs_p2025_12"
+    assert december.start == datetime(2025, 12, 1, tzinfo=UTC)
+    assert december.end == datetime(2026, 1, 1, tzinfo=UTC)
+    assert add_months(date(2026, 1, 31), -13) == date(2024, 12, 1)
+    assert AuditPartition.from_name("audit_logs_p2025_12") == december
+    assert AuditPartition.from_name("audit_logs_default") is None
+
+    async with test_engine.begin() as conn:
+        assert await ensure_audit_partitions(conn, months_ahead=3) == []
+    assert (
+        await archive_audit_partitions(test_engine, retention_months=1, archive_dir=tmp_path) == []
+    )
+
+
+def test_audit_archive_target_must_be_durable(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Partitions are only dropped into an absolute archive dir on a mounted volume."""
+    from app.core.audit_partitions import archive_target_error
+
+    assert settings.audit_retention_months == 0
+    assert archive_target_error(None) == "AUDIT_ARCHIVE_DIR is not set"
+    assert "absolute" in str(archive_target_error(Path("audit_archive")))
+
+    volume = tmp_path / "volume"
+    volume.mkdir()
+    mounts = {Path(tmp_path.anchor), volume}
+    monkeypatch.setattr(
+        "app.core.audit_partitions.os.path.ismount", lambda path: Path(path) in mounts
+    )
+    # Not created yet: judged by the nearest existing ancestor
+    assert archive_target_error(volume / "audit" / "archive") is None
+    assert "mounted volume" in str(archive_target_error(tmp_path / "local"))
+
+    monkeypatch.setattr(settings, "audit_archive_require_mount", False)
+    assert archive_target_error(tmp_path / "local") is None
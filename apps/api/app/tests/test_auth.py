@@ -1,12 +1,21 @@
 """Tests for authentication API endpoints."""
 
+from collections.abc import Callable, Sequence
+from contextlib import AbstractContextManager
+from typing import Any
+
 import pytest
 from httpx import AsyncClient
 from sqlalchemy import select
 
+from app.core.exceptions import ServiceOverloadedError
+from app.core.principal_cache import invalidate_principal
+from app.core.query_stats import QueryStats
 from app.models.auth_identity import AuthIdentity
 from app.models.user import User
 
+QueryBudget = Callable[[int], AbstractContextManager[QueryStats]]
+
 
 @pytest.mark.asyncio
 async def test_register_success(client: AsyncClient) -> None:
@@ -97,6 +106,88 @@ async def test_login_success(client: AsyncClient) -> None:
     assert "refresh_token" in response.cookies
 
 
+@pytest.mark.asyncio
+async def test_login_query_budget(client: AsyncClient, query_budget: QueryBudget) -> None:
+    """Login is one joined SELECT (identity, user, roles) plus one UPDATE ... RETURNING."""
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "budget@example.com", "password": "password123", "name": "Budget"},
+    )
+
+    with query_budget(2) as stats:
+        response = await client.post(
+            "/api/v1/auth/login", json={"email": "budget@example.com", "password": "password123"}
+        )
+    assert response.status_code == 200
+    assert stats.statements == 2
+    assert [role["name"] for role in response.json()["roles"]] == ["user"]
+
+    from app.tests.conftest import TestSessionLocal
+
+    async with TestSessionLocal() as db:
+        last_login_at = (
+            await db.execute(
+                select(AuthIdentity.last_login_at).where(
+                    AuthIdentity.identifier == "budget@example.com"
+                )
+            )
+        ).scalar_one()
+    assert last_login_at is not None
+
+    # The issued cookies carry the token version read by the UPDATE
+    me = await client.get("/api/v1/auth/me")
+    assert me.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_login_last_login_write_behind(
+    client: AsyncClient, query_budget: QueryBudget, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """With the writer running, logins only buffer last_login_at; stop() bulk-writes it."""
+    from app.core.last_login import last_login_writer
+    from app.tests.conftest import TestSessionLocal
+
+    for name in ("hot", "cold"):
+        await client.post(
+            "/api/v1/auth/register",
+            json={"email": f"{name}@example.com", "password": "password123", "name": name},
+        )
+
+    monkeypatch.setattr(last_login_writer, "session_factory", TestSessionLocal)
+    monkeypatch.setattr(last_login_writer, "flush_interval", 60.0)
+    last_login_writer.start()
+    try:
+        with query_budget(1):
+            response = await client.post(
+                "/api/v1/auth/login", json={"email": "hot@example.com", "password": "password123"}
+            )
+        assert response.status_code == 200
+        assert (await client.get("/api/v1/auth/me")).status_code == 200
+
+        for email in ("hot@example.com", "cold@example.com"):
+            response = await client.post(
+                "/api/v1/auth/login", json={"email": email, "password": "password123"}
+            )
+            assert response.status_code == 200
+        # Repeat logins of one account coalesce into a single entry
+        assert last_login_writer.pending == 2
+
+        async with TestSessionLocal() as db:
+            stored = (
+                await db.execute(select(AuthIdentity.last_login_at).order_by(AuthIdentity.id))
+            ).scalars()
+            assert list(stored) == [None, None]
+    finally:
+        await last_login_writer.stop()
+
+    assert last_login_writer.pending == 0
+    async with TestSessionLocal() as db:
+        stored = (
+            await db.execute(select(AuthIdentity.last_login_at).order_by(AuthIdentity.id))
+        ).scalars()
+        assert all(value is not None for value in stored)
+
+
 @pytest.mark.asyncio
 async def test_login_wrong_password(client: AsyncClient) -> None:
     """Test login with wrong password."""
@@ -135,6 +226,208 @@ async def test_login_nonexistent_user(client: AsyncClient) -> None:
     assert response.status_code == 401
 
 
+@pytest.mark.asyncio
+async def test_login_unknown_email_spends_dummy_bcrypt(client: AsyncClient) -> None:
+    """Unknown emails cost one bcrypt verification, like a wrong password."""
+    from app.core.security import password_pool, prepare_dummy_hash
+
+    def count(op: str) -> float:
+        ops = password_pool.stats()["ops"]
+        assert isinstance(ops, dict)
+        done: float = ops.get(op, {}).get("count", 0)
+        return done
+
+    # As in the lifespan: the first unknown email must not pay for building the dummy hash
+    await prepare_dummy_hash()
+    hashes, verifications = count("hash"), count("verify")
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "ghost@example.com", "password": "somepassword"},
+    )
+    assert response.status_code == 401
+    assert count("verify") == verifications + 1
+    assert count("hash") == hashes
+
+
+@pytest.mark.asyncio
+async def test_login_lockout_short_circuits_before_db(
+    client: AsyncClient, query_budget: QueryBudget, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Past the free attempts an identifier is locked: 429 without a query or bcrypt."""
+    from app.config import settings
+    from app.core.metrics import LOGIN_BCRYPT_SECONDS_SAVED, LOGIN_THROTTLED
+
+    monkeypatch.setattr(settings, "login_throttle_free_attempts", 2)
+    monkeypatch.setattr(settings, "login_throttle_base_seconds", 30.0)
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "locked@example.com", "password": "correctpassword", "name": "Locked"},
+    )
+
+    wrong = {"email": "locked@example.com", "password": "wrongpassword"}
+    statuses = [(await client.post("/api/v1/auth/login", json=wrong)).status_code for _ in range(3)]
+    assert statuses == [401, 401, 401]
+
+    throttled_before = LOGIN_THROTTLED.labels(scope="identifier")._value.get()
+    saved_before = LOGIN_BCRYPT_SECONDS_SAVED._value.get()
+    with query_budget(0):
+        response = await client.post(
+            "/api/v1/auth/login",
+            json={"email": "LOCKED@example.com", "password": "correctpassword"},
+        )
+    assert response.status_code == 429
+    assert response.json()["code"] == "LOGIN_THROTTLED"
+    assert 29 <= int(response.headers["retry-after"]) <= 30
+    assert LOGIN_THROTTLED.labels(scope="identifier")._value.get() == throttled_before + 1
+    assert LOGIN_BCRYPT_SECONDS_SAVED._value.get() > saved_before
+
+    # Other accounts behind the same IP are unaffected
+    other = await client.post(
+        "/api/v1/auth/login", json={"email": "other@example.com", "password": "whatever"}
+    )
+    assert other.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_login_ip_lockout_and_success_reset(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Failures across many emails lock the IP; a successful login only resets its email."""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "login_throttle_free_attempts", 2)
+    monkeypatch.setattr(settings, "login_throttle_ip_free_attempts", 4)
+    monkeypatch.setattr(settings, "login_throttle_base_seconds", 30.0)
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "real@example.com", "password": "correctpassword", "name": "Real"},
+    )
+
+    async def attempt(email: str, password: str = "wrongpassword") -> int:
+        response = await client.post(
+            "/api/v1/auth/login", json={"email": email, "password": password}
+        )
+        return response.status_code
+
+    # Two failures on the account, then a success clears its counter
+    assert [await attempt("real@example.com") for _ in range(2)] == [401, 401]
+    assert await attempt("real@example.com", "correctpassword") == 200
+    assert await attempt("real@example.com") == 401
+
+    # The IP has now failed 3 times; the 5th failure locks it for every email
+    assert [await attempt(f"spray{i}@example.com") for i in range(2)] == [401, 401]
+    response = await client.post(
+        "/api/v1/auth/login", json={"email": "fresh@example.com", "password": "x"}
+    )
+    assert response.status_code == 429
+
+
+async def _stored_hash(email: str) -> str | None:
+    from app.tests.conftest import TestSessionLocal
+
+    async with TestSessionLocal() as db:
+        stored: str | None = (
+            await db.execute(
+                select(AuthIdentity.hashed_password).where(AuthIdentity.identifier == email)
+            )
+        ).scalar_one()
+    return stored
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_outdated_cost(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Raising BCRYPT_ROUNDS upgrades the stored hash after the next successful login."""
+    from app.config import settings
+    from app.core.security import hash_rounds, needs_rehash
+
+    monkeypatch.setattr(settings, "bcrypt_rounds", 4)
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "cost@example.com", "password": "password123", "name": "Cost"},
+    )
+    old_hash = await _stored_hash("cost@example.com")
+    assert old_hash is not None
+    assert hash_rounds(old_hash) == 4
+    assert not needs_rehash(old_hash)
+
+    monkeypatch.setattr(settings, "bcrypt_rounds", 5)
+    assert needs_rehash(old_hash)
+    response = await client.post(
+        "/api/v1/auth/login", json={"email": "cost@example.com", "password": "password123"}
+    )
+    assert response.status_code == 200
+
+    new_hash = await _stored_hash("cost@example.com")
+    assert new_hash is not None
+    assert hash_rounds(new_hash) == 5
+
+    # The upgraded hash still logs in and is not rehashed again
+    response = await client.post(
+        "/api/v1/auth/login", json={"email": "cost@example.com", "password": "password123"}
+    )
+    assert response.status_code == 200
+    assert await _stored_hash("cost@example.com") == new_hash
+
+
+@pytest.mark.asyncio
+async def test_rehash_is_compare_and_set(client: AsyncClient) -> None:
+    """A password changed since the login is never overwritten by the rehash."""
+    from app.core.password_rehash import rehash_password
+    from app.core.security import hash_password, verify_password
+    from app.tests.conftest import TestSessionLocal
+
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "rehash@example.com", "password": "password123", "name": "Rehash"},
+    )
+    async with TestSessionLocal() as db:
+        identity = (await db.execute(select(AuthIdentity))).scalar_one()
+    old_hash = identity.hashed_password
+    assert old_hash is not None
+
+    assert await rehash_password(identity.id, hash_password("other"), "password123") is False
+    assert await _stored_hash("rehash@example.com") == old_hash
+
+    assert await rehash_password(identity.id, old_hash, "password123") is True
+    new_hash = await _stored_hash("rehash@example.com")
+    assert new_hash is not None
+    assert new_hash != old_hash
+    assert verify_password("password123", new_hash)
+
+
+@pytest.mark.asyncio
+async def test_login_survives_rehash_failure(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A full hashing pool only skips the upgrade; the login itself succeeds."""
+    from app.config import settings
+    from app.core.security import password_pool
+
+    monkeypatch.setattr(settings, "bcrypt_rounds", 4)
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "busy@example.com", "password": "password123", "name": "Busy"},
+    )
+    old_hash = await _stored_hash("busy@example.com")
+
+    original_run = password_pool.run
+
+    async def reject_rehash(op: str, *args: Any) -> Any:
+        if op == "rehash":
+            raise ServiceOverloadedError()
+        return await original_run(op, *args)
+
+    monkeypatch.setattr(password_pool, "run", reject_rehash)
+    monkeypatch.setattr(settings, "bcrypt_rounds", 5)
+    response = await client.post(
+        "/api/v1/auth/login", json={"email": "busy@example.com", "password": "password123"}
+    )
+    assert response.status_code == 200
+    assert await _stored_hash("busy@example.com") == old_hash
+
+
 @pytest.mark.asyncio
 async def test_get_me_authenticated(client: AsyncClient) -> None:
     """Test getting current user when authenticated."""
@@ -302,6 +595,9 @@ async def test_token_version_revocation(client: AsyncClient, setup_database: Non
         auth_identity.token_version += 1
         await db.commit()
 
+    # Out-of-band writes bypass the API, so drop the cached principal explicitly
+    await invalidate_principal(auth_identity.user_id)
+
     # Old token should now be invalid
     response2 = await client.get("/api/v1/auth/me", cookies=cookies1)
     assert response2.status_code == 401
@@ -679,3 +975,121 @@ async def test_change_password_invalidates_tokens(client: AsyncClient) -> None:
     # Old token should be invalid
     old_me_response = await client.get("/api/v1/users/me", cookies=cookies)
     assert old_me_response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_password_pool_rejects_when_queue_full() -> None:
+    """The bcrypt pool returns 503 instead of queueing beyond its limit."""
+    import asyncio
+    import threading
+
+    from app.core.exceptions import ServiceOverloadedError
+    from app.core.security import PasswordHasherPool
+
+    pool = PasswordHasherPool(max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    def _blocking(_: str) -> str:
+        release.wait(timeout=5)
+        return "done"
+
+    try:
+        running = asyncio.create_task(pool.run("hash", _blocking, "x"))
+        await asyncio.sleep(0)
+        assert pool.pending == 1
+
+        with pytest.raises(ServiceOverloadedError) as exc_info:
+            await pool.run("hash", _blocking, "y")
+        assert exc_info.value.status_code == 503
+
+        release.set()
+        assert await running == "done"
+        stats = pool.stats()
+        assert stats["rejected"] == 1
+        ops = stats["ops"]
+        assert isinstance(ops, dict)
+        assert ops["hash"]["count"] == 1
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_pool_counts_cancelled_jobs_until_they_finish() -> None:
+    """A cancelled caller does not free its slot while the bcrypt job is still running."""
+    import asyncio
+    import threading
+
+    from app.core.exceptions import ServiceOverloadedError
+    from app.core.security import PasswordHasherPool
+
+    pool = PasswordHasherPool(max_workers=1, max_queue=0)
+    started = threading.Event()
+    release = threading.Event()
+
+    def _blocking(_: str) -> str:
+        started.set()
+        release.wait(timeout=5)
+        return "done"
+
+    try:
+        running = asyncio.create_task(pool.run("hash", _blocking, "x"))
+        await asyncio.to_thread(started.wait, 5)
+        running.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await running
+
+        # The thread is still hashing: no room for another job
+        assert pool.pending == 1
+        with pytest.raises(ServiceOverloadedError):
+            await pool.run("hash", _blocking, "y")
+
+        release.set()
+        for _ in range(100):
+            if pool.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.pending == 0
+        assert await pool.run("hash", _blocking, "z") == "done"
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_verified_token_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verified tokens are served from the cache until their own exp."""
+    from jose import JWTError
+
+    from app.core import security
+
+    calls = 0
+    backend = security.PythonJoseBackend()
+
+    class CountingBackend:
+        def encode(self, claims: dict[str, Any], key: str, algorithm: str) -> str:
+            return backend.encode(claims, key, algorithm)
+
+        def decode(self, token: str, key: str, algorithms: Sequence[str]) -> dict[str, Any]:
+            nonlocal calls
+            calls += 1
+            return backend.decode(token, key, algorithms)
+
+    security.set_jose_backend(CountingBackend())
+    try:
+        token = security.create_access_token(42, 3)
+        first = security.verify_token(token)
+        second = security.verify_token(token)
+        assert first == second
+        assert (first.user_id, first.ver, first.type) == (42, 3, "access")
+        assert calls == 1
+
+        with pytest.raises(JWTError):
+            security.verify_token(token + "x")
+
+        # past exp the cached entry is rejected even though its TTL has not elapsed
+        now = first.exp + 1
+        monkeypatch.setattr("app.core.security.time.time", lambda: now)
+        with pytest.raises(JWTError):
+            security.verify_token(token)
+    finally:
+        security.set_jose_backend(backend)
@@ -1,5 +1,7 @@
 """Tests for main application endpoints."""
 
+from pathlib import Path
+
 import pytest
 from httpx import AsyncClient
 
@@ -46,13 +48,261 @@ async def test_api_version_not_found(client: AsyncClient) -> None:
 
 @pytest.mark.asyncio
 async def test_root_rate_limit(client: AsyncClient) -> None:
-    """Test root endpoint rate limiting (if applicable)."""
-    # Make multiple requests to test rate limiting
-    responses = []
-    for _ in range(15):  # Assuming limit is 10/minute
-        response = await client.get("/")
-        responses.append(response.status_code)
-
-    # All should succeed in test environment (rate limiting may not be enforced)
-    # But we verify the endpoint works
-    assert all(status == 200 for status in responses[:10])
+    """The root endpoint allows 10 requests per minute per client."""
+    responses = [(await client.get("/")).status_code for _ in range(11)]
+
+    assert responses[:10] == [200] * 10
+    assert responses[10] == 429
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client: AsyncClient) -> None:
+    """Requests are recorded per route template and exposed in Prometheus format."""
+    await client.get("/health")
+    await client.get("/api/v1/users/123")
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in body
+    # path parameters are collapsed into the route template
+    assert 'route="/api/v1/users/{user_id}"' in body
+    assert "db_pool_checkout_wait_seconds" in body
+    assert "password_hash_duration_seconds" in body
+
+
+@pytest.mark.asyncio
+async def test_query_stats_detect_repeated_statements() -> None:
+    """Repeated identical statements are reported as N+1 candidates; nested trackers agree."""
+    from sqlalchemy import select
+
+    from app.core.query_stats import add_query_stats, track_queries
+    from app.models.user import User
+    from app.tests.conftest import TestSessionLocal
+
+    async with TestSessionLocal() as session:
+        session.add_all(User(email=f"q{i}@example.com") for i in range(3))
+        await session.commit()
+
+        with track_queries() as outer, track_queries(record=True) as inner:
+            for user_id in (1, 2, 3):
+                await session.execute(select(User).where(User.id == user_id))
+            event = add_query_stats(None, "info", {"event": "x"})
+
+    # every User load also runs the User.roles selectin query
+    assert outer.statements == inner.statements == 6
+    assert inner.rows == 3
+    assert event["db_statements"] == 6
+    repeated = dict(inner.repeated(3))
+    assert len(repeated) == 2
+    assert set(repeated.values()) == {3}
+    assert outer.repeated(3) == []  # not recording
+
+
+@pytest.mark.asyncio
+async def test_health_has_no_server_timing(client: AsyncClient) -> None:
+    """Server-Timing is only added when the request touched the database."""
+    response = await client.get("/health")
+    assert "Server-Timing" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_db_pool_stats(client: AsyncClient) -> None:
+    """Pool statistics reflect Settings and require an RBAC reader."""
+    from app.config import settings
+
+    unauthenticated = await client.get("/api/v1/system/db-pool")
+    assert unauthenticated.status_code == 401
+
+    settings.admin_emails = "admin-pool@example.com"
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "admin-pool@example.com", "password": "password123", "name": "A"},
+    )
+    login = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin-pool@example.com", "password": "password123"},
+    )
+
+    response = await client.get("/api/v1/system/db-pool", cookies=login.cookies)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["pool_class"] == "InstrumentedAsyncPool"
+    assert data["size"] == settings.db_pool_size
+    assert data["max_overflow"] == settings.db_max_overflow
+    assert data["checked_out"] == 0
+    assert data["pgbouncer"] is False
+
+
+@pytest.mark.asyncio
+async def test_warm_up_pool_opens_connections() -> None:
+    """Warm-up opens connections concurrently and never raises."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.database import warm_up_pool
+    from app.tests.conftest import test_engine
+
+    assert await warm_up_pool(2, target=test_engine) == 2
+    assert await warm_up_pool(0, target=test_engine) == 0
+
+    unreachable = create_async_engine("sqlite+aiosqlite:////nonexistent/dir/db.sqlite")
+    try:
+        assert await warm_up_pool(2, target=unreachable) == 0
+    finally:
+        await unreachable.dispose()
+
+
+@pytest.mark.asyncio
+async def test_disconnect_retry_and_liveness_checker(tmp_path: Path) -> None:
+    """A dead connection is retried once on a fresh statement and found by the checker."""
+    import sqlite3
+
+    from sqlalchemy import event, select, text
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.core.db_liveness import ConnectionLivenessChecker
+    from app.database import Base, RetryingAsyncSession, warm_up_pool
+    from app.models.user import User
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'liveness.db'}")
+    failures = 0
+
+    @event.listens_for(engine.sync_engine, "do_execute")
+    def _drop_connection(*_: object) -> None:
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise sqlite3.OperationalError("server closed the connection unexpectedly")
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _mark_disconnect(ctx: object) -> None:
+        ctx.is_disconnect = True  # type: ignore[attr-defined]
+
+    try:
+        async with RetryingAsyncSession(engine) as session:
+            failures = 1
+            assert (await session.execute(text("SELECT 1"))).scalar_one() == 1
+
+            # mid-transaction statements are not retried
+            failures = 1
+            with pytest.raises(OperationalError):
+                await session.execute(text("SELECT 2"))
+
+        # nor is a statement that would autoflush pending changes: the rollback drops them
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.tables["users"].create)
+        async with RetryingAsyncSession(engine, expire_on_commit=False) as session:
+            user = User(email="pending@example.com")
+            session.add(user)
+            await session.commit()
+            user.name = "renamed"
+            failures = 1
+            with pytest.raises(OperationalError):
+                await session.execute(select(User))
+
+        await warm_up_pool(2, target=engine)
+        checker = ConnectionLivenessChecker(engine, interval=0)
+        failures = 1
+        assert await checker.check_once() == 1
+        assert await checker.check_once() == 0
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_replica_routing_read_your_writes(tmp_path: Path) -> None:
+    """Read-only sessions use the replica unless the unit of work wrote or is sticky."""
+    from sqlalchemy import Column, MetaData, String, Table, insert, select
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.core.db_routing import RoutingSession, routing_scope
+    from app.database import RetryingAsyncSession
+
+    metadata = MetaData()
+    origin = Table("origin", metadata, Column("name", String))
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    for target, name in ((primary, "primary"), (replica, "replica")):
+        async with target.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+            await conn.execute(insert(origin).values(name=name))
+
+    class ReplicaSession(RoutingSession):
+        replicas = (replica.sync_engine,)
+
+    factory = async_sessionmaker(
+        primary, class_=RetryingAsyncSession, sync_session_class=ReplicaSession
+    )
+
+    async def read(read_only: bool) -> str:
+        async with factory(info={"read_only": read_only}) as session:
+            name: str = (await session.execute(select(origin.c.name).limit(1))).scalar_one()
+            return name
+
+    try:
+        assert await read(read_only=True) == "replica"
+        assert await read(read_only=False) == "primary"
+
+        with routing_scope() as state:
+            assert await read(read_only=True) == "replica"
+            async with factory() as session:
+                await session.execute(insert(origin).values(name="written"))
+                await session.commit()
+            assert state.wrote
+            assert await read(read_only=True) == "primary"
+
+        with routing_scope(sticky=True):
+            assert await read(read_only=True) == "primary"
+    finally:
+        await primary.dispose()
+        await replica.dispose()
+
+
+def test_fast_json_responses_match_stdlib_encoding() -> None:
+    """orjson and pre-typed bodies produce the same bytes as the stock JSONResponse."""
+    from datetime import UTC, datetime
+
+    from fastapi.responses import JSONResponse
+
+    from app.core.responses import ORJSONResponse, TypedJSONResponse
+    from app.schemas.pagination import PaginatedResponse
+    from app.schemas.user import UserResponse
+
+    now = datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=UTC)
+    users = [
+        UserResponse(
+            id=i,
+            email=f"u{i}@example.com",
+            name="张三",
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(3)
+    ]
+    page = PaginatedResponse[UserResponse].create(items=users, total=3, skip=0, limit=10)
+    cases: list[tuple[PaginatedResponse[UserResponse] | list[UserResponse], object]] = [
+        (page, page.model_dump(mode="json")),
+        (users, [u.model_dump(mode="json") for u in users]),
+        ([], []),
+    ]
+
+    for value, data in cases:
+        expected = JSONResponse(data).body
+        assert ORJSONResponse(data).body == expected
+        assert TypedJSONResponse(value).body == expected
+
+
+@pytest.mark.asyncio
+async def test_typed_endpoints_keep_openapi_schema(client: AsyncClient) -> None:
+    """Handlers returning TypedJSONResponse still document their response_model."""
+    response = await client.get("/openapi.json")
+    assert response.status_code == 200
+    ok = response.json()["paths"]["/api/v1/users/page"]["get"]["responses"]["200"]
+    assert ok["content"]["application/json"]["schema"]["$ref"].endswith(
+        "PaginatedResponse_UserResponse_"
+    )
+    user = response.json()["components"]["schemas"]["UserResponse"]["properties"]["email"]
+    assert user["format"] == "email"
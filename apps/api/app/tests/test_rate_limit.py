@@ -0,0 +1,143 @@
+"""Tests for the shared rate limiter.
+
+The Redis tests run the Lua script against a real server when ``TEST_REDIS_URL`` is set,
+e.g. ``TEST_REDIS_URL=redis://localhost:6379/15`` (the database is flushed).
+"""
+
+import os
+from collections.abc import AsyncIterator
+
+import pytest
+from httpx import AsyncClient
+from redis import asyncio as aioredis
+
+import app.core.rate_limit as rate_limit_module
+from app.config import settings
+from app.core.rate_limit import RateLimiter, gcra, parse_rate_limit
+
+REDIS_URL = os.environ.get("TEST_REDIS_URL", "")
+
+requires_redis = pytest.mark.skipif(not REDIS_URL, reason="TEST_REDIS_URL not set")
+
+
+@pytest.mark.asyncio
+async def test_login_limit_is_stricter(client: AsyncClient) -> None:
+    """Login has its own 10/minute bucket; other routes keep the default."""
+    # Distinct emails, so the per-identifier failure lockout does not kick in first
+    statuses = [
+        (
+            await client.post(
+                "/api/v1/auth/login",
+                json={"email": f"nobody{i}@example.com", "password": "wrong-password"},
+            )
+        ).status_code
+        for i in range(11)
+    ]
+    assert statuses[:10] == [401] * 10
+    assert statuses[10] == 429
+
+    limited = await client.post(
+        "/api/v1/auth/login", json={"email": "nobody@example.com", "password": "wrong-password"}
+    )
+    assert limited.json()["code"] == "RATE_LIMITED"
+    assert int(limited.headers["retry-after"]) >= 1
+
+    assert (await client.get("/health")).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_authenticated_clients_have_own_buckets(client: AsyncClient) -> None:
+    for name in ("a", "b"):
+        await client.post(
+            "/api/v1/auth/register",
+            json={"email": f"{name}@example.com", "password": "password123", "name": name},
+        )
+
+    original = settings.rate_limit_default
+    settings.rate_limit_default = "3/minute"
+    try:
+        await client.post(
+            "/api/v1/auth/login", json={"email": "a@example.com", "password": "password123"}
+        )
+        as_a = [(await client.get("/api/v1/auth/me")).status_code for _ in range(4)]
+
+        await client.post(
+            "/api/v1/auth/login", json={"email": "b@example.com", "password": "password123"}
+        )
+        as_b = (await client.get("/api/v1/auth/me")).status_code
+
+        client.cookies.clear()
+        anonymous = (await client.get("/api/v1/auth/me")).status_code
+    finally:
+        settings.rate_limit_default = original
+
+    assert as_a == [200, 200, 200, 429]
+    assert as_b == 200
+    assert anonymous == 401
+
+
+def test_gcra_allows_burst_then_spaces_requests() -> None:
+    limit = parse_rate_limit("7/minute")
+    assert limit is not None
+    assert parse_rate_limit("unlimited") is None
+    with pytest.raises(ValueError):
+        parse_rate_limit("7/fortnight")
+
+    tat, now = 0.0, 1000.0
+    for _ in range(7):
+        decision, tat = gcra(tat, now, limit, 1)
+        assert decision.granted == 1
+    decision, tat = gcra(tat, now, limit, 1)
+    assert decision.granted == 0
+    assert decision.retry_after == pytest.approx(60 / 7)
+
+    # One emission interval later exactly one more request fits
+    decision, _ = gcra(tat, now + 60 / 7, limit, 5)
+    assert decision.granted == 1
+
+
+@pytest.fixture
+async def redis_client() -> AsyncIterator[aioredis.Redis]:
+    client = aioredis.from_url(REDIS_URL, decode_responses=True)
+    await client.flushdb()
+    yield client
+    await client.flushdb()
+    await client.aclose()
+
+
+@requires_redis
+@pytest.mark.asyncio
+async def test_redis_script_matches_local_algorithm(redis_client: aioredis.Redis) -> None:
+    limiter = RateLimiter(prefix="test:")
+    limit = parse_rate_limit("5/minute")
+    assert limit is not None
+
+    decisions = [await limiter._redis_hit(redis_client, "k", limit, 1) for _ in range(6)]
+    assert [d.granted for d in decisions] == [1, 1, 1, 1, 1, 0]
+    assert [d.remaining for d in decisions[:5]] == [4, 3, 2, 1, 0]
+    assert 0 < decisions[5].retry_after <= 12
+    assert 0 < await redis_client.pttl("test:k") <= 60_000
+
+    # Reservations take what is left, never more
+    assert (await limiter._redis_hit(redis_client, "other", limit, 3)).granted == 3
+    assert (await limiter._redis_hit(redis_client, "other", limit, 3)).granted == 2
+
+
+@requires_redis
+@pytest.mark.asyncio
+async def test_local_leases_batch_redis_calls(
+    redis_client: aioredis.Redis, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(rate_limit_module, "get_redis", lambda: redis_client)
+    monkeypatch.setattr(settings, "rate_limit_local_batch", 10)
+    limiter = RateLimiter(prefix="test:")
+    limit = parse_rate_limit("200/minute")
+    assert limit is not None
+
+    sources = [(await limiter.hit("k", limit))[1] for _ in range(20)]
+    assert sources.count("redis") == 2
+    assert sources.count("lease") == 18
+    # 20 tokens were taken from the shared bucket, in two round trips
+    tat = await redis_client.get("test:k")
+    assert tat is not None
+    assert float(tat) > 0
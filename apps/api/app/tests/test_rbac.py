@@ -1,9 +1,29 @@
 """Tests for RBAC endpoints and authorization."""
 
+import asyncio
+import os
+from datetime import UTC, datetime
+
 import pytest
 from httpx import AsyncClient
 
 from app.config import settings
+from app.schemas.user import CurrentUserResponse
+
+REDIS_URL = os.environ.get("TEST_REDIS_URL", "")
+
+
+def _principal(*codes: str) -> CurrentUserResponse:
+    now = datetime.now(UTC)
+    return CurrentUserResponse(
+        id=7,
+        email="p@example.com",
+        is_active=True,
+        created_at=now,
+        updated_at=now,
+        roles=[],
+        permissions=list(codes),
+    )
 
 
 @pytest.mark.asyncio
@@ -178,3 +198,330 @@ async def test_role_delete_guards(client: AsyncClient) -> None:
         cookies=login_admin.cookies,
     )
     assert del_system.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_rbac_changes_invalidate_cached_principal(client: AsyncClient) -> None:
+    """Role/permission changes take effect immediately despite the principal cache."""
+    settings.admin_emails = "admin-cache@example.com"
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "admin-cache@example.com", "password": "password123", "name": "A"},
+    )
+    login_admin = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin-cache@example.com", "password": "password123"},
+    )
+
+    settings.admin_emails = ""
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "u-cache@example.com", "password": "password123", "name": "U"},
+    )
+    login_user = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "u-cache@example.com", "password": "password123"},
+    )
+
+    # warm the cache for the normal user
+    me = await client.get("/api/v1/auth/me", cookies=login_user.cookies)
+    assert me.status_code == 200
+    user_id = me.json()["id"]
+    assert "users:read" not in me.json()["permissions"]
+    assert (await client.get("/api/v1/users/", cookies=login_user.cookies)).status_code == 403
+
+    # grant a permission through the user's role
+    roles = (await client.get("/api/v1/roles", cookies=login_admin.cookies)).json()
+    user_role = next(r for r in roles if r["name"] == "user")
+    granted = await client.put(
+        f"/api/v1/roles/{user_role['id']}/permissions",
+        json={"permission_codes": ["users:read"]},
+        cookies=login_admin.cookies,
+    )
+    assert granted.status_code == 200
+    assert (await client.get("/api/v1/users/", cookies=login_user.cookies)).status_code == 200
+
+    # removing all roles from the user revokes it again
+    cleared = await client.put(
+        f"/api/v1/users/{user_id}/roles",
+        json={"role_names": []},
+        cookies=login_admin.cookies,
+    )
+    assert cleared.status_code == 200
+    assert (await client.get("/api/v1/users/", cookies=login_user.cookies)).status_code == 403
+
+    # deactivating the user is visible on the next request
+    deactivated = await client.patch(
+        f"/api/v1/users/{user_id}",
+        json={"is_active": False},
+        cookies=login_admin.cookies,
+    )
+    assert deactivated.status_code == 200
+    assert (await client.get("/api/v1/auth/me", cookies=login_user.cookies)).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_principal_loaded_before_invalidation_is_not_cached() -> None:
+    """A snapshot overtaken by an invalidation is dropped instead of cached."""
+    from app.core import principal_cache
+
+    principal = _principal("users:read")
+    generation = await principal_cache.principal_generation(7)
+    await principal_cache.invalidate_principal(7)
+    await principal_cache.cache_principal(7, 0, principal, generation)
+    assert await principal_cache.get_cached_principal(7, 0) is None
+
+    generation = await principal_cache.principal_generation(7)
+    await principal_cache.cache_principal(7, 0, principal, generation)
+    assert await principal_cache.get_cached_principal(7, 0) == principal
+
+
+@pytest.mark.skipif(not REDIS_URL, reason="TEST_REDIS_URL not set")
+@pytest.mark.asyncio
+async def test_principal_cache_compare_and_set_and_pubsub(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Redis rejects overtaken writes; other workers' invalidations evict this L1."""
+    from redis import asyncio as aioredis
+
+    from app.core import principal_cache
+
+    redis = aioredis.from_url(REDIS_URL, decode_responses=True)
+    monkeypatch.setattr(principal_cache, "get_redis", lambda: redis)
+    listener = principal_cache.invalidation_listener
+    principal = _principal("users:read")
+    try:
+        await redis.flushdb()
+        generation = await principal_cache.principal_generation(7)
+        await principal_cache.invalidate_principal(7)
+        await principal_cache.cache_principal(7, 0, principal, generation)
+        assert await redis.get("principal:7") is None
+
+        # L1 stays off until the listener is subscribed
+        assert not listener.active
+        listener.start()
+        for _ in range(200):
+            if listener.active:
+                break
+            await asyncio.sleep(0.01)
+        assert listener.active
+
+        generation = await principal_cache.principal_generation(7)
+        await principal_cache.cache_principal(7, 0, principal, generation)
+        assert await redis.get("principal:7") is not None
+        await redis.delete("principal:7")
+        assert await principal_cache.get_cached_principal(7, 0) == principal  # from L1
+
+        # Published by another worker: this worker's L1 entry goes as well
+        await redis.publish(principal_cache.INVALIDATION_CHANNEL, "7")
+        for _ in range(200):
+            if await principal_cache.get_cached_principal(7, 0) is None:
+                break
+            await asyncio.sleep(0.01)
+        assert await principal_cache.get_cached_principal(7, 0) is None
+    finally:
+        await listener.stop()
+        await redis.flushdb()
+        await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_role_members_are_never_loaded_implicitly(client: AsyncClient) -> None:
+    """A role with 100k members is listed and fetched without loading Role.users."""
+    from sqlalchemy import insert, select
+    from sqlalchemy.exc import InvalidRequestError
+
+    from app.core.query_stats import track_queries
+    from app.models.rbac import Role, user_roles
+    from app.models.user import User
+    from app.tests.conftest import TestSessionLocal
+
+    settings.admin_emails = "admin-members@example.com"
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "admin-members@example.com", "password": "password123", "name": "A"},
+    )
+    login = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin-members@example.com", "password": "password123"},
+    )
+
+    members = 100_000
+    async with TestSessionLocal() as session:
+        role_id = (await session.execute(select(Role.id).where(Role.name == "user"))).scalar_one()
+        first_id = (
+            await session.execute(insert(User).returning(User.id), [{"email": "m0@example.com"}])
+        ).scalar_one()
+        await session.execute(
+            insert(User),
+            [{"id": first_id + i, "email": f"m{i}@example.com"} for i in range(1, members)],
+        )
+        await session.execute(
+            insert(user_roles),
+            [{"user_id": first_id + i, "role_id": role_id} for i in range(members)],
+        )
+        await session.commit()
+
+    # The back-reference raises instead of loading 100k users
+    async with TestSessionLocal() as session:
+        role = await session.get(Role, role_id)
+        assert role is not None
+        with pytest.raises(InvalidRequestError):
+            _ = role.users
+
+    with track_queries() as stats:
+        roles = await client.get("/api/v1/roles", cookies=login.cookies)
+    assert roles.status_code == 200
+    assert stats.rows < 100
+
+    page = await client.get(
+        f"/api/v1/roles/{role_id}/members?limit=50&total=exact", cookies=login.cookies
+    )
+    assert page.status_code == 200
+    data = page.json()
+    assert len(data["items"]) == 50
+    assert data["items"][0]["id"] == first_id
+    assert data["has_more"] is True
+    assert data["total"] == members
+
+    second = await client.get(
+        f"/api/v1/roles/{role_id}/members?limit=50&cursor={data['next_cursor']}",
+        cookies=login.cookies,
+    )
+    assert second.json()["items"][0]["id"] == first_id + 50
+
+    missing = await client.get("/api/v1/roles/99999/members", cookies=login.cookies)
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_list_permission_roles(client: AsyncClient) -> None:
+    settings.admin_emails = "admin-perm-roles@example.com"
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "admin-perm-roles@example.com", "password": "password123", "name": "A"},
+    )
+    login = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin-perm-roles@example.com", "password": "password123"},
+    )
+
+    perms = (await client.get("/api/v1/permissions", cookies=login.cookies)).json()
+    rbac_write = next(p for p in perms if p["code"] == "rbac:write")
+
+    resp = await client.get(
+        f"/api/v1/permissions/{rbac_write['id']}/roles?total=exact", cookies=login.cookies
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [r["name"] for r in data["items"]] == ["admin"]
+    assert data["total"] == 1
+    assert data["has_more"] is False
+    assert data["next_cursor"] is None
+
+    missing = await client.get("/api/v1/permissions/99999/roles", cookies=login.cookies)
+    assert missing.status_code == 404
+    assert missing.json()["code"] == "PERMISSION_ID_NOT_FOUND"
+
+
+@pytest.mark.asyncio
+async def test_rbac_listings_are_cached_with_etag(client: AsyncClient) -> None:
+    """GET /roles is served from the versioned cache; role mutations bump the ETag."""
+    from app.core.query_stats import track_queries
+
+    settings.admin_emails = "admin-etag@example.com"
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "admin-etag@example.com", "password": "password123", "name": "A"},
+    )
+    login = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "admin-etag@example.com", "password": "password123"},
+    )
+
+    first = await client.get("/api/v1/roles", cookies=login.cookies)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    # Repeat loads skip the DB entirely (the principal is cached as well)
+    with track_queries() as stats:
+        cached = await client.get("/api/v1/roles", cookies=login.cookies)
+        not_modified = await client.get(
+            "/api/v1/roles", cookies=login.cookies, headers={"If-None-Match": etag}
+        )
+    assert cached.content == first.content
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert stats.statements == 0
+
+    created = await client.post("/api/v1/roles", json={"name": "auditor"}, cookies=login.cookies)
+    assert created.status_code == 201
+
+    changed = await client.get(
+        "/api/v1/roles", cookies=login.cookies, headers={"If-None-Match": etag}
+    )
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert "auditor" in {r["name"] for r in changed.json()}
+
+    perms = await client.get("/api/v1/permissions", cookies=login.cookies)
+    assert perms.status_code == 200
+    assert perms.headers["ETag"] != changed.headers["ETag"]
+
+
+@pytest.mark.skipif(not REDIS_URL, reason="TEST_REDIS_URL not set")
+@pytest.mark.asyncio
+async def test_rbac_generation_survives_redis_flush(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A flushed generation restarts the counter under a new epoch, never an old ETag."""
+    from redis import asyncio as aioredis
+
+    import app.core.rbac_cache as rbac_cache
+
+    redis = aioredis.from_url(REDIS_URL, decode_responses=True)
+    monkeypatch.setattr(rbac_cache, "get_redis", lambda: redis)
+    try:
+        await redis.flushdb()
+        before = await rbac_cache.get_rbac_generation()
+        assert before == await rbac_cache.get_rbac_generation()
+        await rbac_cache.bump_rbac_generation()
+        bumped = await rbac_cache.get_rbac_generation()
+        assert bumped is not None
+        assert bumped.endswith(".1")
+
+        await redis.flushdb()
+        await rbac_cache.bump_rbac_generation()
+        after = await rbac_cache.get_rbac_generation()
+        assert after is not None
+        assert after.endswith(".1")
+        assert after not in (before, bumped)
+    finally:
+        await redis.flushdb()
+        await redis.aclose()
+
+
+def test_permission_registry_bitmasks() -> None:
+    """Principals carry the mask of their own codes; bit indices stay stable."""
+    from app.core.permissions import PermissionRegistry
+
+    registry = PermissionRegistry()
+    required = registry.mask(["users:read", "rbac:write"])
+    read_bit = registry.bit("users:read")
+
+    def principal(*codes: str) -> CurrentUserResponse:
+        return registry.compile(_principal(*codes))
+
+    reader = principal("users:read")
+    both = principal("users:read", "rbac:write")
+    assert reader.permission_mask & required != required
+    assert both.permission_mask & required == required
+    assert registry.codes(both.permission_mask) == ["users:read", "rbac:write"]
+
+    # A fresh snapshot (e.g. after a role change) gets its own mask; indices never move
+    assert principal("rbac:write").permission_mask & read_bit == 0
+    assert registry.bit("users:read") == read_bit
+
+    # The mask is process-local: it is not serialized and is recompiled after a round trip
+    restored = CurrentUserResponse.model_validate_json(both.model_dump_json())
+    assert "permission_mask" not in both.model_dump()
+    assert restored.permission_mask == 0
+    assert registry.compile(restored).permission_mask == both.permission_mask
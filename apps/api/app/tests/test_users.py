@@ -1,9 +1,18 @@
 """Tests for User API endpoints."""
 
+import csv
+import io
+import json
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+
 import pytest
 from httpx import AsyncClient
 
 from app.config import settings
+from app.core.query_stats import QueryStats
+
+QueryBudget = Callable[[int], AbstractContextManager[QueryStats]]
 
 
 @pytest.fixture(autouse=True)
@@ -34,6 +43,20 @@ async def test_create_user(client: AsyncClient) -> None:
     assert "id" in data
 
 
+@pytest.mark.asyncio
+async def test_writes_set_read_your_writes_cookie(client: AsyncClient) -> None:
+    """Mutations pin the client's next reads to the primary; reads do not."""
+    created = await client.post(
+        "/api/v1/users/",
+        json={"email": "ryw@example.com", "name": "RYW"},
+    )
+    assert "db_primary_until=" in created.headers.get("set-cookie", "")
+
+    client.cookies.delete("db_primary_until")
+    listed = await client.get("/api/v1/users/page")
+    assert "db_primary_until=" not in listed.headers.get("set-cookie", "")
+
+
 @pytest.mark.asyncio
 async def test_create_user_duplicate_email(client: AsyncClient) -> None:
     """Test creating a user with duplicate email."""
@@ -128,6 +151,30 @@ async def test_list_users_pagination(client: AsyncClient) -> None:
     assert len(data) == 2
 
 
+@pytest.mark.asyncio
+async def test_list_users_page_ranked_search(client: AsyncClient) -> None:
+    """search=ranked puts prefix matches (email or name word) before substring matches."""
+    for email, name in [
+        ("zed.sam@example.com", "Zed"),
+        ("sam@example.com", "Samuel"),
+        ("kim@example.com", "Kim Samson"),
+        ("nosam@example.com", "Other"),
+    ]:
+        await client.post("/api/v1/users/", json={"email": email, "name": name})
+
+    ranked = await client.get("/api/v1/users/page?q=sam&search=ranked")
+    assert ranked.status_code == 200
+    data = ranked.json()
+    assert data["total"] == 4
+    emails = [u["email"] for u in data["items"]]
+    assert set(emails[:2]) == {"sam@example.com", "kim@example.com"}
+    assert set(emails[2:]) == {"zed.sam@example.com", "nosam@example.com"}
+
+    # default mode keeps id order
+    plain = await client.get("/api/v1/users/page?q=sam")
+    assert [u["email"] for u in plain.json()["items"]][0] == "zed.sam@example.com"
+
+
 @pytest.mark.asyncio
 async def test_update_user(client: AsyncClient) -> None:
     """Test updating a user."""
@@ -149,6 +196,37 @@ async def test_update_user(client: AsyncClient) -> None:
     assert data["email"] == "update@example.com"  # Email unchanged
 
 
+@pytest.mark.asyncio
+async def test_update_user_query_budget(client: AsyncClient, query_budget: QueryBudget) -> None:
+    """PATCH /users/{id} does not re-query the user after commit."""
+    create_response = await client.post(
+        "/api/v1/users/",
+        json={"email": "budget@example.com", "name": "Budget"},
+    )
+    user_id = create_response.json()["id"]
+
+    # load user + roles, UPDATE, audit INSERT, refresh updated_at (principal is cached)
+    with query_budget(5):
+        response = await client.patch(f"/api/v1/users/{user_id}", json={"name": "Renamed"})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+    assert "Server-Timing" in response.headers
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+
+
+@pytest.mark.asyncio
+async def test_list_users_query_budget(client: AsyncClient, query_budget: QueryBudget) -> None:
+    """Listing users loads roles in one batched query regardless of page size."""
+    for i in range(20):
+        await client.post("/api/v1/users/", json={"email": f"n{i}@example.com", "name": "N"})
+
+    with query_budget(3) as stats:
+        response = await client.get("/api/v1/users/?limit=100")
+    assert response.status_code == 200
+    assert len(response.json()) == 21
+    assert stats.rows >= 21
+
+
 @pytest.mark.asyncio
 async def test_update_user_not_found(client: AsyncClient) -> None:
     """Test updating a non-existent user."""
@@ -367,3 +445,260 @@ async def test_create_user_very_long_name(client: AsyncClient) -> None:
     )
     # Should either be rejected or accepted depending on validation
     assert response.status_code in (201, 422)
+
+
+@pytest.mark.asyncio
+async def test_list_users_cursor_pagination(client: AsyncClient) -> None:
+    """Keyset pagination walks all users once, in id order."""
+    for i in range(5):
+        await client.post(
+            "/api/v1/users/",
+            json={"email": f"cursor{i}@example.com", "name": f"Cursor User {i}"},
+        )
+
+    seen: list[int] = []
+    cursor = None
+    while True:
+        params: dict[str, str | int] = {"limit": 2, "total": "exact"}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get("/api/v1/users/cursor", params=params)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 6  # admin + 5 created
+        assert data["total_is_estimate"] is False
+        seen.extend(u["id"] for u in data["items"])
+        cursor = data["next_cursor"]
+        assert data["has_more"] is (cursor is not None)
+        if cursor is None:
+            break
+
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen)) == 6
+
+    # total is skipped by default; filters apply
+    filtered = await client.get("/api/v1/users/cursor", params={"q": "cursor3"})
+    assert filtered.status_code == 200
+    assert filtered.json()["total"] is None
+    assert [u["email"] for u in filtered.json()["items"]] == ["cursor3@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_list_users_cursor_invalid(client: AsyncClient) -> None:
+    """Malformed cursors are rejected with 400."""
+    response = await client.get("/api/v1/users/cursor", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json()["code"] == "INVALID_CURSOR"
+
+
+@pytest.mark.asyncio
+async def test_export_users_ndjson_and_csv(client: AsyncClient) -> None:
+    """Exports stream every matching user across cursor batches, as NDJSON or CSV."""
+    for i in range(5):
+        await client.post(
+            "/api/v1/users/",
+            json={"email": f"export{i}@example.com", "name": f"Export, User {i}"},
+        )
+
+    original = settings.export_batch_size
+    settings.export_batch_size = 2  # several partitions for 5 rows
+    try:
+        ndjson = await client.get("/api/v1/users/export", params={"q": "export"})
+        csv_resp = await client.get(
+            "/api/v1/users/export",
+            params={"q": "export", "format": "csv"},
+            headers={"Accept-Encoding": "gzip"},
+        )
+    finally:
+        settings.export_batch_size = original
+
+    assert ndjson.status_code == 200
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert "attachment" in ndjson.headers["content-disposition"]
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [r["email"] for r in rows] == [f"export{i}@example.com" for i in range(5)]
+    assert rows[0]["roles"] == []
+
+    assert csv_resp.status_code == 200
+    assert csv_resp.headers["content-type"].startswith("text/csv")
+    assert csv_resp.headers["content-encoding"] == "gzip"
+    table = list(csv.DictReader(io.StringIO(csv_resp.text)))
+    assert len(table) == 5
+    assert table[0]["name"] == "Export, User 0"
+    assert table[0]["roles"] == "[]"
+
+
+@pytest.mark.asyncio
+async def test_export_users_empty_csv_has_header(client: AsyncClient) -> None:
+    response = await client.get("/api/v1/users/export", params={"q": "nobody", "format": "csv"})
+    assert response.status_code == 200
+    assert response.text.strip() == "email,name,id,is_active,created_at,updated_at,roles"
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_json_reports_rows(client: AsyncClient) -> None:
+    """Valid rows are inserted with the default role; duplicates and invalid rows are reported."""
+    await client.post("/api/v1/users/", json={"email": "exists@example.com", "name": "Exists"})
+
+    response = await client.post(
+        "/api/v1/users/bulk",
+        json=[
+            {"email": "bulk1@example.com", "name": "Bulk 1"},
+            {"email": "exists@example.com", "name": "Again"},
+            {"email": "not-an-email"},
+            {"email": "bulk2@example.com"},
+        ],
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [(r["index"], r["email"]) for r in data["created"]] == [
+        (0, "bulk1@example.com"),
+        (3, "bulk2@example.com"),
+    ]
+    assert data["skipped"] == [{"index": 1, "email": "exists@example.com", "id": None}]
+    assert [e["index"] for e in data["errors"]] == [2]
+    assert data["errors"][0]["errors"][0]["loc"] == ["email"]
+
+    user = (await client.get(f"/api/v1/users/{data['created'][0]['id']}")).json()
+    assert [r["name"] for r in user["roles"]] == ["user"]
+
+    logs = (await client.get("/api/v1/audit/logs", params={"action": "users.bulk_import"})).json()[
+        "items"
+    ]
+    assert len(logs) == 1
+    assert logs[0]["payload"]["created"] == 2
+    assert logs[0]["payload"]["skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_csv_one_audit_event_per_batch(client: AsyncClient) -> None:
+    body = '﻿email,name\ncsv1@example.com,"Csv, One"\ncsv2@example.com,\ncsv3@example.com,C3\n'
+
+    original = settings.bulk_import_batch_size
+    settings.bulk_import_batch_size = 2
+    try:
+        response = await client.post(
+            "/api/v1/users/bulk",
+            content=body.encode("utf-8"),
+            headers={"Content-Type": "text/csv"},
+        )
+    finally:
+        settings.bulk_import_batch_size = original
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["email"] for r in data["created"]] == [f"csv{i}@example.com" for i in (1, 2, 3)]
+    assert data["errors"] == []
+
+    page = (await client.get("/api/v1/users/page", params={"q": "csv"})).json()
+    names = {u["email"]: u["name"] for u in page["items"]}
+    assert names["csv1@example.com"] == "Csv, One"
+    assert names["csv2@example.com"] is None
+
+    logs = (await client.get("/api/v1/audit/logs", params={"action": "users.bulk_import"})).json()[
+        "items"
+    ]
+    assert sorted(log["payload"]["created"] for log in logs) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_rejects_bad_payloads(client: AsyncClient) -> None:
+    not_array = await client.post("/api/v1/users/bulk", json={"email": "a@example.com"})
+    assert not_array.status_code == 400
+
+    xml = await client.post(
+        "/api/v1/users/bulk", content=b"<users/>", headers={"Content-Type": "application/xml"}
+    )
+    assert xml.status_code == 400
+
+    original = settings.bulk_import_max_rows
+    settings.bulk_import_max_rows = 2
+    try:
+        too_many = await client.post(
+            "/api/v1/users/bulk", json=[{"email": f"x{i}@example.com"} for i in range(3)]
+        )
+    finally:
+        settings.bulk_import_max_rows = original
+    assert too_many.status_code == 413
+
+    original = settings.bulk_import_max_bytes
+    settings.bulk_import_max_bytes = 64
+    try:
+        too_big = await client.post(
+            "/api/v1/users/bulk", json=[{"email": f"big{i}@example.com"} for i in range(3)]
+        )
+    finally:
+        settings.bulk_import_max_bytes = original
+    assert too_big.status_code == 413
+    assert too_big.json()["detail"] == "Bulk payload exceeds 64 bytes"
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_large_payload_runs_as_job(
+    client: AsyncClient, celery_eager: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import app.api.v1.users as users_api
+
+    original = settings.bulk_import_sync_max_rows
+    settings.bulk_import_sync_max_rows = 1
+    try:
+        response = await client.post(
+            "/api/v1/users/bulk",
+            json=[{"email": "job1@example.com"}, {"email": "job2@example.com"}],
+        )
+    finally:
+        settings.bulk_import_sync_max_rows = original
+
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "PENDING"
+    location = response.headers["location"]
+    assert location == f"/api/v1/users/bulk/jobs/{job['job_id']}"
+
+    page = (await client.get("/api/v1/users/page", params={"q": "job"})).json()
+    assert {u["email"] for u in page["items"]} == {"job1@example.com", "job2@example.com"}
+
+    # Eager runs do not store results: report this job as finished
+    finished: dict[str, list[object]] = {"created": [], "skipped": [], "errors": []}
+    monkeypatch.setattr(users_api, "_bulk_job_status", lambda job_id: ("SUCCESS", finished))
+    done = (await client.get(location)).json()
+    assert done == {"job_id": job["job_id"], "status": "SUCCESS", "result": finished}
+
+    status = await client.get("/api/v1/users/bulk/jobs/unknown-job")
+    assert status.status_code == 200
+    assert status.json() == {"job_id": "unknown-job", "status": "PENDING", "result": None}
+
+    # Another admin cannot read the result: the job looks like an unknown one
+    settings.admin_emails = "admin@example.com,admin2@example.com"
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "admin2@example.com", "password": "password123", "name": "Admin 2"},
+    )
+    await client.post(
+        "/api/v1/auth/login", json={"email": "admin2@example.com", "password": "password123"}
+    )
+    other = await client.get(location)
+    assert other.json() == {"job_id": job["job_id"], "status": "PENDING", "result": None}
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_users(client: AsyncClient) -> None:
+    ids = [
+        (await client.post("/api/v1/users/", json={"email": f"upd{i}@example.com"})).json()["id"]
+        for i in range(2)
+    ]
+
+    response = await client.patch(
+        "/api/v1/users/bulk", json={"ids": [*ids, 99999], "is_active": False}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"updated": sorted(ids), "missing": [99999]}
+
+    for user_id in ids:
+        assert (await client.get(f"/api/v1/users/{user_id}")).json()["is_active"] is False
+
+    logs = (await client.get("/api/v1/audit/logs", params={"action": "users.bulk_update"})).json()[
+        "items"
+    ]
+    assert len(logs) == 1
+    assert logs[0]["payload"] == {"user_ids": sorted(ids), "after": {"is_active": False}}
@@ -0,0 +1,82 @@
+"""Tests for Celery background tasks (eager mode, in-memory broker)."""
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.config import settings
+from app.core.bulk_users import load_bulk_job_rows, stash_bulk_job
+from app.models.audit_log import AuditLog
+from app.models.user import User
+from app.tests.conftest import TestSessionLocal
+from app.worker import create_celery_app
+from app.worker.tasks import bulk_import_users, maintain_partitions, warm_caches
+
+
+@pytest.fixture(autouse=True)
+def _eager(celery_eager: None) -> None:
+    """Every task in this module runs inline."""
+
+
+def test_celery_app_configuration() -> None:
+    app = create_celery_app(worker_prefetch_multiplier=4)
+
+    assert app.conf.worker_prefetch_multiplier == 4
+    assert app.conf.worker_concurrency == settings.celery_worker_concurrency
+    assert app.conf.task_acks_late is settings.celery_task_acks_late
+    assert app.conf.task_default_queue == "default"
+    assert app.amqp.router.route({}, "users.bulk_import")["queue"].name == "bulk"
+    assert app.amqp.router.route({}, "audit.maintain_partitions")["queue"].name == "maintenance"
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_creates_skips_and_reports(client: AsyncClient) -> None:
+    await client.post(
+        "/api/v1/auth/register",
+        json={"email": "taken@example.com", "password": "password123", "name": "Taken"},
+    )
+
+    job_id = await stash_bulk_job(
+        [
+            {"email": "a@example.com", "name": "A"},
+            {"email": "taken@example.com", "name": "Taken again"},
+            {"email": "not-an-email", "name": "Bad"},
+            {"email": "a@example.com", "name": "A twice"},
+            {"email": "b@example.com", "name": "B"},
+        ],
+        owner_id=None,
+    )
+    result = bulk_import_users.delay(job_id, actor_user_id=None, request_id="req-bulk").get()
+    # The message only referenced the rows; they are dropped once imported
+    assert await load_bulk_job_rows(job_id) is None
+
+    assert [(r["index"], r["email"]) for r in result["created"]] == [
+        (0, "a@example.com"),
+        (4, "b@example.com"),
+    ]
+    assert result["skipped"] == [{"index": 1, "email": "taken@example.com", "id": None}]
+    assert [e["index"] for e in result["errors"]] == [2, 3]
+
+    async with TestSessionLocal() as db:
+        emails = set((await db.execute(select(User.email))).scalars())
+        logs = (
+            (await db.execute(select(AuditLog).where(AuditLog.action == "users.bulk_import")))
+            .scalars()
+            .all()
+        )
+    assert {"a@example.com", "b@example.com", "taken@example.com"} == emails
+    assert len(logs) == 1
+    assert logs[0].payload["created"] == 2
+    assert logs[0].payload["skipped"] == 1
+    assert logs[0].request_id == "req-bulk"
+
+
+@pytest.mark.asyncio
+async def test_cache_warm_renders_rbac_listings_once(client: AsyncClient) -> None:
+    assert warm_caches.delay().get() == ["roles", "permissions"]
+    assert warm_caches.delay().get() == []
+
+
+@pytest.mark.asyncio
+async def test_maintain_partitions_is_noop_without_postgres(client: AsyncClient) -> None:
+    assert maintain_partitions.delay().get() == {"created": [], "archived": []}
@@ -0,0 +1,11 @@
+"""Background job subsystem (Celery).
+
+Run a worker (all queues) and the beat scheduler with::
+
+    celery -A app.worker worker -Q default,maintenance,bulk
+    celery -A app.worker beat
+"""
+
+from app.worker.celery_app import celery_app, create_celery_app
+
+__all__ = ["celery_app", "create_celery_app"]
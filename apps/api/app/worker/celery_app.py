@@ -0,0 +1,96 @@
+"""Celery application factory, task routing and worker process hooks."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from app.config import settings
+
+# Queues by workload: short periodic jobs and large imports can be scaled or isolated
+# separately. Tasks are named "<area>.<job>".
+TASK_ROUTES: dict[str, dict[str, str]] = {
+    "audit.*": {"queue": "maintenance"},
+    "cache.*": {"queue": "maintenance"},
+    "users.*": {"queue": "bulk"},
+}
+
+BEAT_SCHEDULE: dict[str, dict[str, Any]] = {
+    "audit-maintain-partitions": {
+        "task": "audit.maintain_partitions",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "cache-warm": {
+        "task": "cache.warm",
+        "schedule": 60.0,
+    },
+}
+
+
+def create_celery_app(**overrides: Any) -> Celery:
+    """
+    Build the Celery app from Settings; ``overrides`` are applied to ``conf`` last.
+
+    Tests pass ``task_always_eager=True`` (or set CELERY_TASK_ALWAYS_EAGER) to run tasks
+    inline without a broker.
+    """
+    app = Celery(
+        "nexus",
+        broker=settings.celery_broker_url,
+        backend=settings.celery_result_backend,
+        include=["app.worker.tasks"],
+    )
+    app.conf.update(
+        task_serializer="json",
+        result_serializer="json",
+        accept_content=["json"],
+        timezone="UTC",
+        enable_utc=True,
+        task_default_queue="default",
+        task_routes=TASK_ROUTES,
+        beat_schedule=BEAT_SCHEDULE,
+        worker_concurrency=settings.celery_worker_concurrency,
+        worker_prefetch_multiplier=settings.celery_worker_prefetch_multiplier,
+        task_acks_late=settings.celery_task_acks_late,
+        # With acks_late, a task whose worker process died is redelivered rather than lost.
+        task_reject_on_worker_lost=settings.celery_task_acks_late,
+        # Only tasks that report back (e.g. bulk imports) keep results, for an hour.
+        task_ignore_result=True,
+        result_expires=3600,
+        task_always_eager=settings.celery_task_always_eager,
+        task_eager_propagates=True,
+        broker_connection_retry_on_startup=True,
+        # Logging is configured by app.core.logging (structlog).
+        worker_hijack_root_logger=False,
+    )
+    app.conf.update(overrides)
+    return app
+
+
+celery_app = create_celery_app()
+
+
+@worker_process_init.connect
+def _init_worker_process(**_: Any) -> None:
+    # Prefork children inherit the parent's engine objects: drop pooled connections without
+    # closing them (they belong to the parent) and open fresh ones per child.
+    from app.core.cache import init_cache
+    from app.database import engine, replica_engines
+    from app.worker.db import run_async
+
+    for target in (engine, *replica_engines):
+        target.sync_engine.dispose(close=False)
+    run_async(init_cache())
+
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**_: Any) -> None:
+    from app.core.cache import close_cache
+    from app.database import engine
+    from app.worker.db import run_async
+
+    run_async(close_cache())
+    run_async(engine.dispose())
@@ -0,0 +1,51 @@
+"""Async database access from (synchronous) Celery task bodies."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Coroutine
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from app.database import RetryingAsyncSession, async_session
+
+# Session factory used by tasks; tests point it at the test database.
+session_factory: async_sessionmaker[RetryingAsyncSession] = async_session
+
+_runner: asyncio.Runner | None = None
+
+
+def run_async[T](coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run ``coro`` to completion from a task body.
+
+    Each worker process keeps one event loop for its lifetime, so pooled asyncpg connections
+    (which are bound to the loop that opened them) are reused across tasks.
+    """
+    global _runner
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        if _runner is None:
+            _runner = asyncio.Runner()
+        return _runner.run(coro)
+    # Eager execution from async code (tests, local development): the calling loop is busy
+    # waiting for us, so run on a short-lived loop in a helper thread.
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+@asynccontextmanager
+async def task_session() -> AsyncIterator[AsyncSession]:
+    """Session for one task run (primary database; callers commit)."""
+    async with session_factory() as session:
+        yield session
+
+
+def task_engine() -> AsyncEngine:
+    """Engine behind ``task_session`` (for jobs that need raw connections)."""
+    bind: AsyncEngine = session_factory.kw["bind"]
+    return bind
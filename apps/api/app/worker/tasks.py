@@ -0,0 +1,59 @@
+"""Background tasks: audit partition maintenance, bulk user import, cache warming."""
+
+from __future__ import annotations
+
+from functools import partial
+from typing import Any
+
+from celery import shared_task
+
+from app.core.audit_partitions import maintain_audit_partitions
+from app.core.bulk_users import finish_bulk_job, import_users, load_bulk_job_rows
+from app.core.rbac_cache import RBAC_LISTINGS, warm_rbac_cache
+from app.worker.db import run_async, task_engine, task_session
+
+
+@shared_task(name="audit.maintain_partitions")
+def maintain_partitions() -> dict[str, list[str]]:
+    """Create upcoming audit partitions and archive expired ones (daily, via beat)."""
+    created, archived = run_async(maintain_audit_partitions(task_engine()))
+    return {"created": created, "archived": [str(path) for path in archived]}
+
+
+async def _bulk_import_users(
+    job_id: str, actor_user_id: int | None, request_id: str | None
+) -> dict[str, Any]:
+    rows = await load_bulk_job_rows(job_id)
+    if rows is None:
+        raise LookupError(f"No rows stashed for bulk import job {job_id} (expired?)")
+    async with task_session() as db:
+        result = await import_users(db, rows, actor_user_id=actor_user_id, request_id=request_id)
+    await finish_bulk_job(job_id)
+    return result.model_dump(mode="json")
+
+
+@shared_task(name="users.bulk_import", ignore_result=False)
+def bulk_import_users(
+    job_id: str, actor_user_id: int | None = None, request_id: str | None = None
+) -> dict[str, Any]:
+    """
+    Import the rows ``POST /users/bulk`` stashed for ``job_id`` (see ``stash_bulk_job``).
+
+    Returns a ``BulkImportResponse`` as JSON: created and skipped rows, per-row errors.
+    """
+    return run_async(_bulk_import_users(job_id, actor_user_id, request_id))
+
+
+async def _warm_caches() -> list[str]:
+    warmed: list[str] = []
+    async with task_session() as db:
+        for name, render in RBAC_LISTINGS.items():
+            if await warm_rbac_cache(name, partial(render, db)):
+                warmed.append(name)
+    return warmed
+
+
+@shared_task(name="cache.warm")
+def warm_caches() -> list[str]:
+    """Pre-render cached RBAC listings for the current generation; returns those rendered."""
+    return run_async(_warm_caches())
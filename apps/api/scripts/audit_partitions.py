@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Audit log partition maintenance: create upcoming months, archive expired ones.
+
+The Celery beat schedule runs the same job daily (``audit.maintain_partitions``); use this
+script where no worker runs, e.g. from cron against the primary database:
+
+    uv run python scripts/audit_partitions.py
+
+Settings: AUDIT_PARTITION_PREMAKE_MONTHS, AUDIT_RETENTION_MONTHS, AUDIT_ARCHIVE_DIR.
+Archives are gzip NDJSON files, one per month; ship them to object storage afterwards.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.audit_partitions import maintain_audit_partitions
+from app.database import engine
+
+
+async def maintain() -> None:
+    """Create missing partitions, then archive and drop the expired ones."""
+    try:
+        created, archived = await maintain_audit_partitions(engine)
+    finally:
+        await engine.dispose()
+
+    print(f"created: {', '.join(created) or '-'}")
+    print(f"archived: {', '.join(str(p) for p in archived) or '-'}")
+
+
+if __name__ == "__main__":
+    asyncio.run(maintain())
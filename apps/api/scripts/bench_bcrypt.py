@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Benchmark: login password check latency and throughput per bcrypt cost factor.
+
+For each cost, CONCURRENCY simulated logins at a time verify a password on a
+``PasswordHasherPool`` sized like production (``PASSWORD_HASH_WORKERS``), so the numbers
+include queueing behind the pool, not only the bare hash. Run on the target hardware before
+changing ``BCRYPT_ROUNDS``:
+
+    uv run python scripts/bench_bcrypt.py
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import bcrypt
+
+from app.config import settings
+from app.core.logging import configure_logging
+from app.core.security import PasswordHasherPool, verify_password
+
+COSTS = range(8, 15)
+CONCURRENCY = 16
+# Wall time budget per cost; higher costs run fewer logins
+SECONDS_PER_COST = 3.0
+MIN_LOGINS = 2 * CONCURRENCY
+PASSWORD = "correct horse battery staple"
+
+
+async def _run(cost: int, logins: int) -> tuple[list[float], float]:
+    hashed = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=cost)).decode("utf-8")
+    pool = PasswordHasherPool(
+        max_workers=settings.password_hash_workers, max_queue=CONCURRENCY + logins
+    )
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def _login() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await pool.run("verify", verify_password, PASSWORD, hashed)
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(_login() for _ in range(logins)))
+    finally:
+        pool.shutdown()
+    return latencies, time.perf_counter() - started
+
+
+async def bench() -> None:
+    """Measure each cost and print p50/p99 latency, logins/s and a latency bar chart."""
+    print(
+        f"concurrency {CONCURRENCY}, {settings.password_hash_workers} hash workers, "
+        f"configured BCRYPT_ROUNDS={settings.bcrypt_rounds}"
+    )
+    rows: list[tuple[int, float, float, float]] = []
+    for cost in COSTS:
+        # Calibrate on one hash, then size the run to the time budget
+        start = time.perf_counter()
+        bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=cost))
+        single = time.perf_counter() - start
+        budget = SECONDS_PER_COST * settings.password_hash_workers / single
+        logins = max(MIN_LOGINS, int(budget))
+
+        latencies, elapsed = await _run(cost, logins)
+        quantiles = statistics.quantiles(latencies, n=100)
+        rows.append((cost, quantiles[49], quantiles[98], len(latencies) / elapsed))
+
+    widest = max(p99 for _, _, p99, _ in rows)
+    for cost, p50, p99, rate in rows:
+        bar = "#" * max(1, round(40 * p50 / widest))
+        marker = " <- configured" if cost == settings.bcrypt_rounds else ""
+        print(
+            f"  cost {cost:2d}  p50 {p50 * 1000:8.1f} ms  p99 {p99 * 1000:8.1f} ms  "
+            f"{rate:8.1f} logins/s  {bar}{marker}"
+        )
+
+
+if __name__ == "__main__":
+    configure_logging()
+    asyncio.run(bench())
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: single-core JWT decodes/s, full verification vs. the verified-token cache.
+
+Runs each installed backend (PyJWT needs ``uv sync --extra jwt``).
+"""
+
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+# Add parent directory to path to import app module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core import security
+
+ROUNDS = 20_000
+
+
+def _rate(fn: Callable[[str], object], token: str) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(token)
+    return ROUNDS / (time.perf_counter() - start)
+
+
+def bench() -> None:
+    """Print decodes/s per backend for decode_token and the cached verify_token."""
+    print(f"{ROUNDS} decodes of one access token per measurement")
+    for name, factory in security._JOSE_BACKENDS.items():
+        try:
+            backend = factory()
+        except ImportError:
+            print(f"  {name:12s} not installed")
+            continue
+        security.set_jose_backend(backend)
+        token = security.create_access_token(1, 0)
+        uncached = _rate(security.decode_token, token)
+        security.clear_verified_token_cache()
+        cached = _rate(security.verify_token, token)
+        print(f"  {name:12s} backend {uncached:12,.0f}/s   cached {cached:12,.0f}/s")
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: set-based permission checks vs. compiled bitmask checks."""
+
+import sys
+import timeit
+from datetime import UTC, datetime
+from pathlib import Path
+
+# Add parent directory to path to import app module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.permissions import PermissionRegistry
+from app.schemas.rbac import PermissionResponse, RoleResponse
+from app.schemas.user import CurrentUserResponse
+
+NUM_ROLES = 4
+PERMS_PER_ROLE = 25
+REQUIRED = ("users:read", "rbac:write")
+NUMBER = 200_000
+
+
+def _build_roles() -> list[RoleResponse]:
+    roles = []
+    perm_id = 0
+    for role_id in range(1, NUM_ROLES + 1):
+        perms = []
+        for i in range(PERMS_PER_ROLE):
+            perm_id += 1
+            perms.append(PermissionResponse(id=perm_id, code=f"res{role_id}:action{i}"))
+        roles.append(RoleResponse(id=role_id, name=f"role{role_id}", permissions=perms))
+    roles[-1].permissions.extend(
+        PermissionResponse(id=perm_id + n, code=code) for n, code in enumerate(REQUIRED, 1)
+    )
+    return roles
+
+
+def bench() -> None:
+    """Run both paths against the same roles and print per-check timings."""
+    roles = _build_roles()
+
+    def set_based() -> bool:
+        codes: set[str] = set()
+        for role in roles:
+            for perm in role.permissions:
+                codes.add(perm.code)
+        return all(code in codes for code in REQUIRED)
+
+    registry = PermissionRegistry()
+    required_mask = registry.mask(REQUIRED)
+    now = datetime.now(UTC)
+    principal = registry.compile(
+        CurrentUserResponse(
+            id=1,
+            email="bench@example.com",
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+            roles=roles,
+            permissions=sorted({p.code for role in roles for p in role.permissions}),
+        )
+    )
+
+    def bitmask() -> bool:
+        return principal.permission_mask & required_mask == required_mask
+
+    assert set_based() and bitmask()
+
+    results = {
+        "set": timeit.timeit(set_based, number=NUMBER),
+        "bitmask": timeit.timeit(bitmask, number=NUMBER),
+    }
+    total_perms = NUM_ROLES * PERMS_PER_ROLE + len(REQUIRED)
+    print(f"{NUM_ROLES} roles, {total_perms} permissions, {NUMBER} checks")
+    for name, seconds in results.items():
+        print(f"  {name:8s} {seconds / NUMBER * 1e9:10.1f} ns/check")
+    print(f"  speedup  {results['set'] / results['bitmask']:10.1f}x")
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Throughput benchmark: JSON response paths for a 100-user listing (requests/s on one core).
+
+Compares the previous path (EmailStr re-validated on output, response_model pass, stdlib json)
+with the stored-email schema through the stock path, the same path encoded with orjson (app
+default response class), and TypedJSONResponse (no second pass).
+Requests go through the ASGI app in-process on one event loop, so results are per core.
+"""
+
+import asyncio
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add parent directory to path to import app module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI, Response
+from httpx import ASGITransport, AsyncClient
+from pydantic import EmailStr
+
+from app.core.responses import ORJSONResponse, TypedJSONResponse
+from app.schemas.pagination import PaginatedResponse
+from app.schemas.user import UserResponse
+
+USERS = 100
+REQUESTS = 3_000
+
+
+class EmailStrUserResponse(UserResponse):
+    """UserResponse as it was before: email-validator runs for every serialized user."""
+
+    email: EmailStr
+
+
+def _build_rows() -> list[SimpleNamespace]:
+    """ORM-like rows, so every path pays the same model_validate(from_attributes) cost."""
+    now = datetime.now(UTC)
+    roles = [SimpleNamespace(id=1, name="user", description="Default role")]
+    return [
+        SimpleNamespace(
+            id=i,
+            email=f"user{i}@example.com",
+            name=f"User {i}",
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+            roles=roles,
+        )
+        for i in range(1, USERS + 1)
+    ]
+
+
+def _build_app(
+    rows: list[SimpleNamespace],
+    typed: bool,
+    schema: type[UserResponse] = UserResponse,
+    **kwargs: object,
+) -> FastAPI:
+    app = FastAPI(**kwargs)  # type: ignore[arg-type]
+    page_model = PaginatedResponse[schema]  # type: ignore[valid-type]
+
+    def _page() -> PaginatedResponse[UserResponse]:
+        items = [schema.model_validate(r) for r in rows]
+        return page_model.create(items=items, total=USERS, skip=0, limit=USERS)
+
+    if typed:
+
+        @app.get("/users/page", response_model=page_model)
+        async def typed_page() -> Response:
+            return TypedJSONResponse(_page())
+
+    else:
+
+        @app.get("/users/page", response_model=page_model)
+        async def page() -> PaginatedResponse[UserResponse]:
+            return _page()
+
+    return app
+
+
+async def _rps(app: FastAPI) -> tuple[float, int]:
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        body = (await client.get("/users/page")).content
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            await client.get("/users/page")
+        elapsed = time.perf_counter() - start
+    return REQUESTS / elapsed, len(body)
+
+
+async def bench() -> None:
+    """Run each response path against the same rows and print requests/s."""
+    rows = _build_rows()
+    paths = {
+        "before": _build_app(rows, typed=False, schema=EmailStrUserResponse),
+        "stdlib json": _build_app(rows, typed=False),
+        "orjson default": _build_app(rows, typed=False, default_response_class=ORJSONResponse),
+        "TypedJSON (now)": _build_app(rows, typed=True, default_response_class=ORJSONResponse),
+    }
+    print(f"GET /users/page with {USERS} users, {REQUESTS} sequential requests, one core")
+    baseline = None
+    for name, app in paths.items():
+        rps, size = await _rps(app)
+        baseline = baseline or rps
+        print(f"  {name:15s} {rps:8.0f} req/s   x{rps / baseline:4.2f}   ({size} bytes)")
+
+
+if __name__ == "__main__":
+    asyncio.run(bench())